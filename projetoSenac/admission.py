@@ -0,0 +1,136 @@
+"""
+Controle de admissão para picos de acesso (ex.: quando a agenda de um
+profissional é aberta e centenas de clientes chegam ao mesmo tempo).
+
+- RateLimiter: um token bucket por cliente (IP) para as APIs públicas.
+  Cada cliente acumula até `burst` fichas, repostas a `rate` por segundo;
+  uma requisição sem ficha é recusada na hora (429) com o tempo até a
+  próxima ficha.
+- ConcurrencyGate: limite de requisições simultâneas em um trecho caro
+  (o POST de agendamento), com uma fila curta. Quem não cabe na fila, ou
+  espera mais que `queue_timeout`, é recusado na hora (503), em vez de
+  disputar conexões e bloqueios com quem já está sendo atendido.
+
+Os limites valem por processo.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class RateLimiter:
+    """
+    Token bucket por chave, com no máximo `max_clients` chaves em memória.
+    Com rate=0 não há limite.
+    """
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # chave -> [fichas, instante da última reposição]
+        self._lock = threading.Lock()
+        self.counters = {"allowed": 0, "rejected": 0}
+
+    def allow(self, key):
+        """
+        Consome uma ficha de `key`. Retorna 0.0 se a requisição pode
+        seguir, ou os segundos até haver uma ficha disponível.
+        """
+        if not self.rate:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now]
+                if len(self._buckets) > self.max_clients:
+                    # Esquece o cliente sem acesso há mais tempo (ele volta com o balde cheio)
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                self.counters["allowed"] += 1
+                return 0.0
+            self.counters["rejected"] += 1
+            return (1 - bucket[0]) / self.rate
+
+    def stats(self):
+        with self._lock:
+            data = dict(self.counters)
+            data.update(clients=len(self._buckets), rate=self.rate, burst=self.burst)
+        return data
+
+
+class ConcurrencyGate:
+    """
+    Até `limit` requisições ao mesmo tempo e até `queue_size` esperando
+    por no máximo `queue_timeout` segundos.
+    """
+
+    def __init__(self, limit, queue_size, queue_timeout):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiting = 0
+        self._cond = threading.Condition(threading.Lock())
+        self.counters = {
+            "admitted": 0,
+            "rejected_queue_full": 0,
+            "rejected_timeout": 0,
+            "queue_wait_seconds": 0.0,
+        }
+
+    def enter(self):
+        """
+        Ocupa uma vaga, esperando na fila se preciso. Retorna os segundos
+        de espera, ou None se a requisição foi recusada (a vaga não é ocupada).
+        """
+        started = time.monotonic()
+        with self._cond:
+            if self._active < self.limit and not self._waiting:
+                self._active += 1
+                self.counters["admitted"] += 1
+                return 0.0
+            if self._waiting >= self.queue_size:
+                self.counters["rejected_queue_full"] += 1
+                return None
+
+            self._waiting += 1
+            try:
+                deadline = started + self.queue_timeout
+                while self._active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counters["rejected_timeout"] += 1
+                        return None
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            self._active += 1
+            waited = time.monotonic() - started
+            self.counters["admitted"] += 1
+            self.counters["queue_wait_seconds"] += waited
+            return waited
+
+    def leave(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            data = dict(self.counters)
+            data.update(
+                limit=self.limit,
+                queue_size=self.queue_size,
+                active=self._active,
+                waiting=self._waiting,
+            )
+        return data
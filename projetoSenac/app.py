@@ -1,36 +1,390 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-import mysql.connector
-from mysql.connector import Error
+from flask import Blueprint, Flask, Response, render_template, request, redirect, url_for, flash, session, jsonify, g
+from flask import before_render_template, current_app, has_request_context, stream_with_context, template_rendered
+from flask.cli import AppGroup
+import click
+import csv
+import io
+import json
+from contextlib import ExitStack
 from datetime import datetime, date, time, timedelta
 from functools import wraps
-
-app = Flask(__name__)
-app.secret_key = "mude-esta-chave-secreta"
+import math
+import sys
+import threading
+from time import monotonic, perf_counter
+import uuid
+import zlib
+
+from markupsafe import Markup
+from werkzeug.local import LocalProxy
+
+from admission import ConcurrencyGate, RateLimiter
+from catalog import Catalog
+from config import from_env
+import daily_stats
+from db import ConnectionPool, ReplicaRouter, connector
+import importer
+from metrics import COUNT_BUCKETS, Registry
+from occupancy import OccupancyIndex
+from pagecache import PageCache
+import repository
+from rows import to_time
+from schedule import WEEKDAYS, SlotGrid
+from slotevents import SlotEvents, Subscription
+from validation import validate_booking
+
+# Valores padrão da configuração. As chaves de CONFIG_KEYS podem ser
+# trocadas por instância em create_app(config) ou pelas variáveis de
+# ambiente AGENDA_<CHAVE> (config.py), ex.: AGENDA_DB_PASSWORD, AGENDA_SECRET_KEY.
+SECRET_KEY = "mude-esta-chave-secreta"
 
 DB_HOST = "localhost"
+DB_PORT = 3306
 DB_USER = "root"
 DB_PASSWORD = ""
 DB_NAME = "agenda_online"
 
+# Pool de conexões: conexões mantidas abertas, conexões extras permitidas
+# em picos, tempo máximo de espera por uma conexão livre (segundos) e
+# idade máxima de uma conexão antes de ser reciclada (segundos).
+DB_POOL_SIZE = 5
+DB_POOL_MAX_OVERFLOW = 10
+DB_POOL_TIMEOUT = 5
+DB_POOL_RECYCLE = 1800
+DB_POOL_PRE_PING = True
+# Instruções preparadas guardadas por conexão do pool (0 desativa)
+DB_STATEMENT_CACHE_SIZE = 32
+
+# Réplicas de leitura do DB_HOST (primário). Cada item completa os dados de
+# conexão acima, ex.: [{"host": "10.0.0.2"}, {"host": "localhost", "port": 3307}].
+# APIs de horários, listagens e relatórios leem delas em rodízio; uma
+# réplica que não conecta em DB_REPLICA_CONNECT_TIMEOUT segundos fica
+# DB_REPLICA_RETRY_AFTER segundos fora do rodízio. Vazio: tudo no primário.
+DB_REPLICAS = []
+DB_REPLICA_CONNECT_TIMEOUT = 2
+DB_REPLICA_RETRY_AFTER = 30
+# Depois de uma gravação, as leituras do mesmo navegador ficam no primário
+# por este tempo (segundos), para não esbarrar no atraso da replicação.
+DB_PIN_PRIMARY_SECONDS = 5
+
+# Grade de horários de início: a agenda de cada profissional (horários
+# semanais e exceções, ver schedule.py) escolhe quais deles ele atende, e
+# cada serviço ocupa services.duration_slots horários seguidos.
 AVAILABLE_TIME_SLOTS = [
     "08:00", "09:00", "10:00", "11:00",
     "14:00", "15:00", "16:00", "17:00"
 ]
+# Duração (minutos) de cada horário da grade
+SLOT_MINUTES = 60
+
+# Índice em memória de horários ocupados: número máximo de pares
+# (profissional, data) guardados e validade de cada entrada (segundos).
+OCCUPANCY_CACHE_SIZE = 4096
+OCCUPANCY_CACHE_TTL = 30
+
+# Quantidade de agendamentos por página na listagem administrativa
+ADMIN_PAGE_SIZE = 50
+
+# Linhas lidas do banco por vez na exportação em streaming
+EXPORT_BATCH_SIZE = 1000
+
+# Linhas do CSV gravadas por transação na importação em lote e
+# quantidade máxima de erros exibidos na página de importação
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_ERRORS_SHOWN = 200
+
+# Arquivamento (flask db-archive): agendamentos com mais de
+# ARCHIVE_RETENTION_DAYS dias, e cancelados com mais de
+# ARCHIVE_CANCELLED_DAYS, vão para appointments_archive em lotes
+ARCHIVE_RETENTION_DAYS = 365
+ARCHIVE_CANCELLED_DAYS = 30
+ARCHIVE_BATCH_SIZE = 1000
+
+# Intervalo (segundos) entre conferências da versão do catálogo em cache
+CATALOG_CHECK_INTERVAL = 5
+
+# Maior intervalo (em dias) aceito por /api/disponibilidade
+AVAILABILITY_MAX_DAYS = 31
+
+# /api/proximos: até quantos dias à frente procurar, dias carregados do
+# banco por consulta e número padrão/máximo de horários devolvidos
+NEXT_SLOTS_HORIZON_DAYS = 60
+NEXT_SLOTS_WINDOW_DAYS = 7
+NEXT_SLOTS_DEFAULT = 5
+NEXT_SLOTS_MAX = 20
+
+# Cache HTTP das APIs JSON (ETag + Cache-Control): os serviços mudam pouco e
+# o navegador pode reaproveitá-los por um minuto; os horários livres são
+# sempre revalidados, e a revalidação (If-None-Match) é respondida com 304,
+# sem corpo. A ETag dos horários vem da ocupação, que é lida do banco quando
+# não está no índice em memória (OCCUPANCY_CACHE_TTL).
+SERVICES_CACHE_CONTROL = "public, max-age=60"
+SLOTS_CACHE_CONTROL = "no-cache"
+
+# /api/horarios/stream (SSE, slotevents.py): conexões abertas por processo,
+# intervalo (segundos) entre comentários de keep-alive e duração máxima de
+# uma conexão; depois dela o navegador reconecta sozinho (EventSource).
+SSE_MAX_SUBSCRIBERS = 1000
+SSE_HEARTBEAT_SECONDS = 15
+SSE_MAX_SECONDS = 300
+
+# Cache das páginas administrativas (pagecache.py): número máximo de
+# entradas e validade (segundos) dos dados e trechos renderizados do painel
+# e dos relatórios. Agendamentos, cancelamentos e importações deste
+# processo invalidam o cache na hora; os dos demais processos aparecem
+# depois no máximo dessa validade.
+PAGE_CACHE_SIZE = 256
+DASHBOARD_CACHE_TTL = 10
+REPORTS_CACHE_TTL = 60
+
+# Controle de admissão (admission.py) para picos de acesso. APIs públicas:
+# requisições por segundo de cada IP, rajada máxima e quantos IPs são
+# lembrados (atrás de um proxy reverso, configure o ProxyFix do Werkzeug
+# para que request.remote_addr seja o IP do cliente). POST /agendar:
+# agendamentos processados ao mesmo tempo, fila de espera e espera máxima
+# (segundos) na fila; acima disso a resposta é 503.
+API_RATE_LIMIT = 10  # 0 desativa
+API_RATE_BURST = 30
+API_RATE_LIMIT_CLIENTS = 10000
+BOOKING_MAX_CONCURRENT = None  # None: DB_POOL_SIZE
+BOOKING_QUEUE_SIZE = 50
+BOOKING_QUEUE_TIMEOUT = 2.0
+
+# Servidor de produção (flask --app app serve, server.py): endereço,
+# processos e threads das views do Flask em cada processo (asgi.py). Antes de
+# aceitar requisições, cada processo abre SERVE_WARMUP_CONNECTIONS conexões
+# e carrega o catálogo e a ocupação dos próximos SERVE_WARMUP_DAYS dias.
+SERVE_BIND = "0.0.0.0:8000"
+SERVE_WORKERS = 2
+SERVE_THREADS = None  # None: DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW
+SERVE_GRACEFUL_TIMEOUT = 30
+SERVE_WARMUP_CONNECTIONS = 2
+SERVE_WARMUP_DAYS = 7
+
+# Comandos SQL mais lentos que isto (ms) são registrados no log com o texto
+SLOW_QUERY_MS = 200
+
+# /admin/metrics exige login; com True, também aceita acessos vindos da
+# própria máquina (ex.: um agente do Prometheus local). Não ative atrás de
+# um proxy reverso local, pois todo acesso pareceria local.
+METRICS_ALLOW_LOCAL = False
+
+# Banco dedicado ao `flask db-explain`, que grava e apaga um agendamento de
+# teste: o comando só roda quando DB_NAME é este banco (e não o padrão).
+EXPLAIN_CHECK_DB = ""
+
+
+# Configuração lida por create_app. O código lê sempre app.config; as
+# constantes acima são só os valores padrão.
+CONFIG_KEYS = (
+    "SECRET_KEY",
+    "DB_HOST", "DB_PORT", "DB_USER", "DB_PASSWORD", "DB_NAME",
+    "DB_POOL_SIZE", "DB_POOL_MAX_OVERFLOW", "DB_POOL_TIMEOUT", "DB_POOL_RECYCLE",
+    "DB_POOL_PRE_PING", "DB_STATEMENT_CACHE_SIZE",
+    "DB_REPLICAS", "DB_REPLICA_CONNECT_TIMEOUT", "DB_REPLICA_RETRY_AFTER", "DB_PIN_PRIMARY_SECONDS",
+    "AVAILABLE_TIME_SLOTS", "SLOT_MINUTES",
+    "OCCUPANCY_CACHE_SIZE", "OCCUPANCY_CACHE_TTL", "CATALOG_CHECK_INTERVAL",
+    "ADMIN_PAGE_SIZE", "EXPORT_BATCH_SIZE", "IMPORT_CHUNK_SIZE", "IMPORT_ERRORS_SHOWN",
+    "ARCHIVE_RETENTION_DAYS", "ARCHIVE_CANCELLED_DAYS", "ARCHIVE_BATCH_SIZE",
+    "AVAILABILITY_MAX_DAYS",
+    "NEXT_SLOTS_HORIZON_DAYS", "NEXT_SLOTS_WINDOW_DAYS", "NEXT_SLOTS_DEFAULT", "NEXT_SLOTS_MAX",
+    "SERVICES_CACHE_CONTROL", "SLOTS_CACHE_CONTROL",
+    "SSE_MAX_SUBSCRIBERS", "SSE_HEARTBEAT_SECONDS", "SSE_MAX_SECONDS",
+    "PAGE_CACHE_SIZE", "DASHBOARD_CACHE_TTL", "REPORTS_CACHE_TTL",
+    "API_RATE_LIMIT", "API_RATE_BURST", "API_RATE_LIMIT_CLIENTS",
+    "BOOKING_MAX_CONCURRENT", "BOOKING_QUEUE_SIZE", "BOOKING_QUEUE_TIMEOUT",
+    "SERVE_BIND", "SERVE_WORKERS", "SERVE_THREADS", "SERVE_GRACEFUL_TIMEOUT",
+    "SERVE_WARMUP_CONNECTIONS", "SERVE_WARMUP_DAYS",
+    "SLOW_QUERY_MS", "METRICS_ALLOW_LOCAL", "EXPLAIN_CHECK_DB",
+)
+
+
+class Services:
+    """
+    Pools de conexão, caches, limites, grade de horários e métricas de uma
+    instância da aplicação (app.extensions["agenda"]), montados a partir de
+    app.config. Cada um é
+    criado no primeiro acesso (métodos _create_*), então criar a aplicação
+    não abre conexões nem carrega o driver do MySQL. Atribuir um atributo
+    (ex.: services().api_limiter = ...) substitui o serviço.
+    """
 
+    def __init__(self, config):
+        self.config = config
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        # Só chega aqui enquanto o serviço ainda não está no __dict__
+        factory = getattr(type(self), f"_create_{name}", None)
+        if factory is None:
+            raise AttributeError(name)
+        with self._lock:
+            if name not in self.__dict__:
+                self.__dict__[name] = factory(self)
+        return self.__dict__[name]
+
+    @property
+    def connect_args(self):
+        return {
+            "host": self.config["DB_HOST"],
+            "port": self.config["DB_PORT"],
+            "user": self.config["DB_USER"],
+            "password": self.config["DB_PASSWORD"],
+            "database": self.config["DB_NAME"],
+        }
+
+    def make_pool(self, connect_args):
+        return ConnectionPool(
+            connect_args,
+            size=self.config["DB_POOL_SIZE"],
+            max_overflow=self.config["DB_POOL_MAX_OVERFLOW"],
+            timeout=self.config["DB_POOL_TIMEOUT"],
+            recycle=self.config["DB_POOL_RECYCLE"],
+            pre_ping=self.config["DB_POOL_PRE_PING"],
+            statement_cache_size=self.config["DB_STATEMENT_CACHE_SIZE"],
+        )
 
-def get_db_connection():
-    """Abre uma nova conexão com o banco MySQL."""
-    try:
-        conn = mysql.connector.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
+    def _create_db_pool(self):
+        pool = self.make_pool(self.connect_args)
+        pool.listeners.append(on_query)
+        pool.checkout_listeners.append(on_checkout)
+        return pool
+
+    def _create_db_router(self):
+        replica_args = dict(
+            self.connect_args, connection_timeout=self.config["DB_REPLICA_CONNECT_TIMEOUT"]
         )
-        return conn
-    except Error as e:
-        print(f"Erro ao conectar ao MySQL: {e}")
-        return None
+        return ReplicaRouter(
+            self.db_pool,
+            [self.make_pool(dict(replica_args, **replica)) for replica in self.config["DB_REPLICAS"]],
+            retry_after=self.config["DB_REPLICA_RETRY_AFTER"],
+        )
+
+    def _create_slot_grid(self):
+        return SlotGrid(self.config["AVAILABLE_TIME_SLOTS"], self.config["SLOT_MINUTES"])
+
+    def _create_slots_etag_prefix(self):
+        # Prefixo das ETags de /api/horarios: muda junto com a grade de horários
+        return "h{:08x}".format(zlib.crc32(",".join(self.slot_grid.slots).encode()))
+
+    def _create_metrics(self):
+        return RequestMetrics()
+
+    def _create_catalog(self):
+        return Catalog(
+            self.db_pool.connection, self.slot_grid,
+            check_interval=self.config["CATALOG_CHECK_INTERVAL"],
+        )
+
+    def _create_occupancy(self):
+        index = OccupancyIndex(
+            self.slot_grid,
+            max_entries=self.config["OCCUPANCY_CACHE_SIZE"],
+            ttl=self.config["OCCUPANCY_CACHE_TTL"],
+        )
+        index.listeners.append(publish_slot_change)
+        return index
+
+    def _create_page_cache(self):
+        return PageCache(max_entries=self.config["PAGE_CACHE_SIZE"])
+
+    def _create_api_limiter(self):
+        return RateLimiter(
+            self.config["API_RATE_LIMIT"],
+            self.config["API_RATE_BURST"],
+            max_clients=self.config["API_RATE_LIMIT_CLIENTS"],
+        )
+
+    def _create_booking_gate(self):
+        return ConcurrencyGate(
+            self.config["BOOKING_MAX_CONCURRENT"] or self.config["DB_POOL_SIZE"],
+            self.config["BOOKING_QUEUE_SIZE"],
+            self.config["BOOKING_QUEUE_TIMEOUT"],
+        )
+
+    def _create_slot_events(self):
+        return SlotEvents(max_subscribers=self.config["SSE_MAX_SUBSCRIBERS"])
+
+
+def serve_threads(config):
+    """Threads das views do Flask por processo (SERVE_THREADS); ValueError se menor que 1."""
+    threads = config["SERVE_THREADS"]
+    if threads is None:
+        threads = config["DB_POOL_SIZE"] + config["DB_POOL_MAX_OVERFLOW"]
+    if isinstance(threads, bool) or not isinstance(threads, int) or threads < 1:
+        raise ValueError(f"SERVE_THREADS deve ser um inteiro maior que zero, não {threads!r}.")
+    return threads
+
+
+def services():
+    """
+    Serviços da aplicação atual. Fora de um contexto da aplicação (ex.:
+    scripts, threads próprias), use `with app.app_context():`.
+    """
+    return current_app.extensions["agenda"]
+
+
+# Atalhos para os serviços da aplicação atual (ex.: occupancy.get(...),
+# db_pool.stats()), válidos dentro de um contexto da aplicação
+db_pool = LocalProxy(lambda: services().db_pool)
+db_router = LocalProxy(lambda: services().db_router)
+catalog = LocalProxy(lambda: services().catalog)
+occupancy = LocalProxy(lambda: services().occupancy)
+page_cache = LocalProxy(lambda: services().page_cache)
+api_limiter = LocalProxy(lambda: services().api_limiter)
+booking_gate = LocalProxy(lambda: services().booking_gate)
+slot_events = LocalProxy(lambda: services().slot_events)
+slot_grid = LocalProxy(lambda: services().slot_grid)
+metrics = LocalProxy(lambda: services().metrics)
+
+
+def db_connection():
+    """
+    Empresta uma conexão do pool dentro de um bloco `with`.
+    A conexão é sempre devolvida ao pool ao final do bloco.
+    """
+    return db_pool.connection()
+
+
+def pin_primary():
+    """
+    Mantém no primário as leituras desta requisição e, por
+    DB_PIN_PRIMARY_SECONDS, as do mesmo navegador (ex.: a página de
+    sucesso logo após o agendamento). Chamada depois de cada gravação.
+    """
+    if db_router.replicas and has_request_context():
+        g.db_pinned = True
+        session["db_pin_until"] = (
+            datetime.now().timestamp() + current_app.config["DB_PIN_PRIMARY_SECONDS"]
+        )
+
+
+def db_read_connection():
+    """
+    Como db_connection(), para consultas só de leitura: usa uma réplica
+    (ver DB_REPLICAS), exceto logo após uma gravação (pin_primary).
+    """
+    if db_router.replicas and has_request_context() and (
+        g.get("db_pinned") or session.get("db_pin_until", 0) > datetime.now().timestamp()
+    ):
+        return db_pool.connection()
+    return db_router.read_connection()
+
+
+def invalidate_admin_pages():
+    """Descarta painel e relatórios em cache após gravações em agendamentos."""
+    page_cache.invalidate("dashboard", "reports")
+
+
+def cached_fragment(*key, ttl, caller):
+    """
+    Trecho de template guardado no page_cache, usado com `call`:
+
+        {% call cached_fragment("dashboard", "upcoming", today, ttl=10) %}...{% endcall %}
+
+    O primeiro elemento da chave é o grupo invalidado junto com os dados.
+    """
+    return Markup(page_cache.get_or_compute(key, ttl, lambda: str(caller())))
 
 
 def login_required(f):
@@ -39,7 +393,7 @@ def login_required(f):
     def decorated_function(*args, **kwargs):
         if "user_id" not in session:
             flash("Faça login para acessar esta página.", "warning")
-            return redirect(url_for("admin_login"))
+            return redirect(url_for("admin.admin_login"))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -85,599 +439,1298 @@ def normalize_time(value):
     return value
 
 
-@app.context_processor
+def json_response(payload, etag=None, cache_control=None):
+    """
+    Resposta JSON com validador: se o navegador já tem esta versão
+    (If-None-Match com a mesma ETag), responde 304 sem corpo.
+    """
+    if etag is not None and request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(payload)
+    if etag is not None:
+        response.set_etag(etag)
+    if cache_control:
+        response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def slot_label(value):
+    """Converte um horário vindo do banco para o formato "HH:MM" dos slots."""
+    t = normalize_time(to_time(value))
+    if hasattr(t, "strftime"):
+        return t.strftime("%H:%M")
+    return None
+
+
+class RequestMetrics(Registry):
+    """Métricas por rota de uma instância (services().metrics), exportadas em /admin/metrics."""
+
+    def __init__(self):
+        super().__init__()
+        self.request_seconds = self.histogram(
+            "agenda_request_duration_seconds", "Tempo total de cada requisição.")
+        self.request_db_seconds = self.histogram(
+            "agenda_request_db_seconds", "Tempo gasto em comandos SQL por requisição.")
+        self.request_db_queries = self.histogram(
+            "agenda_request_db_queries", "Comandos SQL executados por requisição.",
+            buckets=COUNT_BUCKETS)
+        self.request_connect_seconds = self.histogram(
+            "agenda_request_connect_seconds",
+            "Tempo para obter conexões do pool (espera e abertura) por requisição.")
+        self.request_render_seconds = self.histogram(
+            "agenda_request_render_seconds", "Tempo de renderização de templates por requisição.")
+        self.slow_queries = self.counter(
+            "agenda_slow_queries_total", "Comandos SQL mais lentos que SLOW_QUERY_MS.")
+        self.admission_queue_seconds = self.histogram(
+            "agenda_admission_queue_seconds",
+            "Espera na fila do controle de admissão por requisição admitida.", label="gate")
+
+
+def current_timing():
+    """Acumuladores de tempo da requisição atual, ou None fora de uma requisição."""
+    if has_request_context():
+        return g.get("timing")
+    return None
+
+
+def on_query(sql, params, elapsed):
+    """Ouvinte do pool chamado a cada comando SQL executado."""
+    timing = current_timing()
+    if timing is not None:
+        timing["queries"] += 1
+        timing["db"] += elapsed
+    if elapsed * 1000 >= current_app.config["SLOW_QUERY_MS"]:
+        route = (request.endpoint or "-") if has_request_context() else "-"
+        metrics.slow_queries.inc(route)
+        current_app.logger.warning(
+            "Consulta lenta (%.1f ms) em %s: %s", elapsed * 1000, route, " ".join(sql.split())
+        )
+
+
+def on_checkout(elapsed, connected):
+    """Ouvinte do pool chamado a cada conexão retirada."""
+    timing = current_timing()
+    if timing is not None:
+        timing["connect"] += elapsed
+
+
+def start_render_timing(sender, template, context, **extra):
+    timing = current_timing()
+    if timing is not None:
+        timing["render_started"] = perf_counter()
+
+
+def stop_render_timing(sender, template, context, **extra):
+    timing = current_timing()
+    if timing is not None and "render_started" in timing:
+        timing["render"] += perf_counter() - timing.pop("render_started")
+
+
+def start_timing():
+    g.timing = {"started": perf_counter(), "queries": 0, "db": 0.0, "connect": 0.0, "render": 0.0}
+
+
+def record_timing(timing):
+    """Registra os tempos da requisição nos histogramas (uma única vez)."""
+    if "total" not in timing:
+        route = request.endpoint or "nao_encontrada"
+        timing["total"] = perf_counter() - timing["started"]
+        route_metrics = services().metrics
+        route_metrics.request_seconds.observe(route, timing["total"])
+        route_metrics.request_db_seconds.observe(route, timing["db"])
+        route_metrics.request_db_queries.observe(route, timing["queries"])
+        route_metrics.request_connect_seconds.observe(route, timing["connect"])
+        route_metrics.request_render_seconds.observe(route, timing["render"])
+    return timing
+
+
+def add_server_timing(response):
+    """Informa ao navegador (aba Rede) onde o tempo da requisição foi gasto."""
+    timing = g.get("timing")
+    if timing is not None:
+        record_timing(timing)
+        response.headers["Server-Timing"] = ", ".join([
+            f'db;dur={timing["db"] * 1000:.1f};desc="{timing["queries"]} consultas"',
+            f'conn;dur={timing["connect"] * 1000:.1f}',
+            f'render;dur={timing["render"] * 1000:.1f}',
+            f'total;dur={timing["total"] * 1000:.1f}',
+        ])
+    return response
+
+
+def finish_timing(exc):
+    # Requisições que terminaram em exceção não passam por after_request
+    timing = g.get("timing")
+    if timing is not None:
+        record_timing(timing)
+
+
+RATE_LIMITED_MESSAGE = "Muitas requisições. Tente novamente em alguns segundos."
+
+
+def rate_limited(f):
+    """Decorator das APIs públicas: recusa com 429 quem esgotou as fichas do seu IP."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        retry_after = api_limiter.allow(request.remote_addr)
+        if retry_after:
+            response = jsonify({"error": RATE_LIMITED_MESSAGE})
+            response.status_code = 429
+            response.headers["Retry-After"] = str(math.ceil(retry_after))
+            return response
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def booking_admission(f):
+    """
+    Decorator do POST de agendamento: no máximo BOOKING_MAX_CONCURRENT ao
+    mesmo tempo (booking_gate); os demais esperam na fila ou recebem 503 na hora.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if request.method != "POST":
+            return f(*args, **kwargs)
+        waited = booking_gate.enter()
+        if waited is None:
+            response = current_app.make_response((render_template("busy.html"), 503))
+            response.headers["Retry-After"] = str(math.ceil(booking_gate.queue_timeout))
+            return response
+        metrics.admission_queue_seconds.observe("agendar", waited)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            booking_gate.leave()
+    return decorated_function
+
+
 def inject_now():
     """Disponibiliza o ano atual em todos os templates."""
     return {"current_year": datetime.now().year}
 
 
-@app.route("/")
+# Rotas: páginas públicas de agendamento, APIs JSON e área administrativa
+booking = Blueprint("booking", __name__)
+api = Blueprint("api", __name__, url_prefix="/api")
+admin = Blueprint("admin", __name__, url_prefix="/admin")
+
+
+@booking.route("/")
 def index():
     return render_template("index.html")
 
 
-@app.route("/agendar", methods=["GET", "POST"])
+@booking.route("/agendar", methods=["GET", "POST"])
+@booking_admission
 def agendar():
-    conn = get_db_connection()
-    if conn is None:
+    snapshot = catalog.get()
+    if snapshot is None:
         flash("Erro ao conectar ao banco de dados.", "danger")
-        return redirect(url_for("index"))
-
-    # Carrega profissionais ativos para o formulário
-    professionals = []
-    try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(
-            """
-            SELECT id, name
-            FROM professionals
-            WHERE active = 1
-            ORDER BY name
-            """
-        )
-        professionals = cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
+        return redirect(url_for("booking.index"))
 
     if request.method == "POST":
-        name = request.form.get("name", "").strip()
-        email = request.form.get("email", "").strip()
-        phone = request.form.get("phone", "").strip()
-        date_str = request.form.get("date", "").strip()
-        time_str = request.form.get("time", "").strip()
-        professional_id = request.form.get("professional_id", "").strip()
-        service_id = request.form.get("service_id", "").strip()
+        idempotency_key = request.form.get("idempotency_key", "").strip()[:64] or None
+
+        # Mesmas regras da importação em lote (validation.py)
+        booking, error = validate_booking(request.form, snapshot, slot_grid.slots)
+        if error:
+            flash(error, "danger")
+            return redirect(url_for("booking.agendar"))
+
+        name = booking["name"]
+        email = booking["email"]
+        phone = booking["phone"]
+        appointment_date = booking["appointment_date"]
+        time_str = booking["time"]
+        professional_id = booking["professional_id"]
+        service_id = booking["service_id"]
+        duration = booking["duration_slots"]
+        key = (professional_id, appointment_date)
+
+        # Toda a reserva acontece em uma única transação: o cliente criado
+        # só é gravado se o agendamento também for. As reservas de cada
+        # profissional são serializadas e a sobreposição é conferida com as
+        # durações gravadas; uc_appointment cobre a corrida no horário inicial.
+        with db_connection() as conn:
+            if conn is None:
+                flash("Erro ao conectar ao banco de dados.", "danger")
+                return redirect(url_for("booking.agendar"))
 
-        if not (name and date_str and time_str and professional_id and service_id):
-            flash("Preencha nome, data, horário, profissional e módulo.", "danger")
-            return redirect(url_for("agendar"))
+            try:
+                # Cria o cliente ou reaproveita o já cadastrado com o mesmo e-mail
+                client_id = repository.upsert_client(conn, name, email or None, phone)
+
+                # A restrição só cobre o horário inicial, e um agendamento já
+                # gravado pode ocupar vários horários mesmo que o serviço dele
+                # tenha mudado ou saído do catálogo: a conferência usa sempre
+                # a duração de cada linha (duration_slots).
+                repository.lock_professional(conn, professional_id)
+                existing_id = idempotency_key and repository.appointment_id_by_key(
+                    conn, idempotency_key
+                )
+                if existing_id:
+                    conn.rollback()
+                    pin_primary()
+                    return redirect(url_for("booking.agendar_sucesso", appointment_id=existing_id))
+                occupied = occupancy.bitmap_from_spans(
+                    (slot_label(t), n)
+                    for t, n in repository.booked_slots(conn, appointment_date, professional_id)
+                )
+                if occupied & slot_grid.span_mask(time_str, duration):
+                    conn.rollback()
+                    occupancy.put(key, occupied)
+                    flash("Este horário já está agendado para este profissional. Escolha outro horário.", "warning")
+                    return redirect(url_for("booking.agendar"))
 
-        try:
-            appointment_date = datetime.strptime(date_str, "%d/%m/%Y").date()
-        except ValueError:
-            flash("Data inválida. Use o formato dd/mm/aaaa.", "danger")
-            return redirect(url_for("agendar"))
+                try:
+                    appointment_id = repository.insert_appointment(
+                        conn, client_id, professional_id, service_id,
+                        appointment_date, time_str, idempotency_key, duration,
+                    )
+                except connector.IntegrityError as e:
+                    if e.errno != connector.errorcode.ER_DUP_ENTRY:
+                        raise
+                    appointment_id = None
+
+                if appointment_id is None and idempotency_key:
+                    # Formulário enviado de novo: mostra o agendamento já feito
+                    existing_id = repository.appointment_id_by_key(conn, idempotency_key)
+                    if existing_id:
+                        conn.rollback()
+                        pin_primary()
+                        return redirect(url_for("booking.agendar_sucesso", appointment_id=existing_id))
+
+                if appointment_id is None:
+                    # Horário já ocupado por um agendamento ativo
+                    conn.rollback()
+                    occupancy.mark(key, time_str)
+                    flash("Este horário já está agendado para este profissional. Escolha outro horário.", "warning")
+                    return redirect(url_for("booking.agendar"))
+
+                repository.record_booking(conn, appointment_date, professional_id, service_id)
+                conn.commit()
+            except connector.DatabaseError as e:
+                # Disputa intensa pelo mesmo horário pode gerar deadlock/timeout
+                if e.errno not in (connector.errorcode.ER_LOCK_DEADLOCK, connector.errorcode.ER_LOCK_WAIT_TIMEOUT):
+                    raise
+                conn.rollback()
+                flash("Não foi possível concluir o agendamento agora. Tente novamente.", "warning")
+                return redirect(url_for("booking.agendar"))
+
+        occupancy.mark(key, time_str, duration)
+        invalidate_admin_pages()
+        pin_primary()
+        return redirect(url_for("booking.agendar_sucesso", appointment_id=appointment_id))
 
-        if time_str not in AVAILABLE_TIME_SLOTS:
-            flash("Horário inválido.", "danger")
-            return redirect(url_for("agendar"))
+    # GET
+    today = date.today().strftime("%d/%m/%Y")
+    return render_template(
+        "booking.html",
+        today=today,
+        professionals=snapshot.active_professionals,
+        idempotency_key=uuid.uuid4().hex,
+        slot_refresh_seconds=current_app.config["SSE_HEARTBEAT_SECONDS"],
+    )
 
-        try:
-            professional_id = int(professional_id)
-            service_id = int(service_id)
-        except ValueError:
-            flash("Profissional ou módulo inválido.", "danger")
-            return redirect(url_for("agendar"))
 
-        conn = get_db_connection()
+@booking.route("/agendar/sucesso/<int:appointment_id>")
+def agendar_sucesso(appointment_id: int):
+    appointment = None
+    with db_read_connection() as conn:
         if conn is None:
             flash("Erro ao conectar ao banco de dados.", "danger")
-            return redirect(url_for("agendar"))
+            return redirect(url_for("booking.index"))
 
-        try:
-            cursor = conn.cursor(dictionary=True)
-
-            # Verifica se o serviço realmente pertence ao profissional
-            cursor.execute(
-                """
-                SELECT 1
-                FROM professional_services
-                WHERE professional_id = %s AND service_id = %s
-                """,
-                (professional_id, service_id),
-            )
-            if cursor.fetchone() is None:
-                flash("Este profissional não atende o módulo selecionado.", "danger")
-                return redirect(url_for("agendar"))
-
-            # Verifica se já existe cliente com esse e-mail
-            client_id = None
-            if email:
-                cursor.execute(
-                    "SELECT id FROM clients WHERE email = %s",
-                    (email,),
-                )
-                row = cursor.fetchone()
-                if row:
-                    client_id = row["id"]
-
-            # Se não existir, cria o cliente
-            if client_id is None:
-                cursor.execute(
-                    "INSERT INTO clients (name, email, phone) VALUES (%s, %s, %s)",
-                    (name, email, phone),
-                )
-                conn.commit()
-                client_id = cursor.lastrowid
-
-            # Verifica se o horário já está ocupado para aquele profissional
-            cursor.execute(
-                """
-                SELECT id FROM appointments
-                WHERE appointment_date = %s
-                  AND appointment_time = %s
-                  AND professional_id = %s
-                  AND status = 'scheduled'
-                """,
-                (appointment_date, time_str, professional_id),
-            )
-            existing = cursor.fetchone()
-            if existing:
-                flash("Este horário já está agendado para este profissional. Escolha outro horário.", "warning")
-                return redirect(url_for("agendar"))
-
-            # Cria o agendamento
-            cursor.execute(
-                """
-                INSERT INTO appointments
-                    (client_id, professional_id, service_id,
-                     appointment_date, appointment_time, status)
-                VALUES (%s, %s, %s, %s, %s, 'scheduled')
-                """,
-                (client_id, professional_id, service_id, appointment_date, time_str),
-            )
-            conn.commit()
-            appointment_id = cursor.lastrowid
-        finally:
-            cursor.close()
-            conn.close()
+        appointment = repository.appointment_detail(conn, appointment_id)
 
-        return redirect(url_for("agendar_sucesso", appointment_id=appointment_id))
+    if not appointment:
+        flash("Agendamento não encontrado.", "warning")
+        return redirect(url_for("booking.index"))
 
-    # GET
-    today = date.today().strftime("%d/%m/%Y")
-    return render_template("booking.html", today=today, professionals=professionals)
+    return render_template("booking_success.html", appointment=appointment)
 
 
-@app.route("/agendar/sucesso/<int:appointment_id>")
-def agendar_sucesso(appointment_id: int):
-    conn = get_db_connection()
-    if conn is None:
-        flash("Erro ao conectar ao banco de dados.", "danger")
-        return redirect(url_for("index"))
+def occupied_bitmap(professional_id, day, connection=db_read_connection):
+    """
+    Bitmap dos horários ocupados do profissional na data: do índice em
+    memória ou, se ausente, lido do banco e guardado. None se o banco
+    estiver indisponível.
+    """
+    key = (professional_id, day)
+    bitmap = occupancy.get(key)
+    if bitmap is None:
+        token = occupancy.load_token()
+        with connection() as conn:
+            if conn is None:
+                return None
+            booked = repository.booked_slots(conn, day, professional_id)
+
+        bitmap = occupancy.bitmap_from_spans((slot_label(t), n) for t, n in booked)
+        occupancy.put(key, bitmap, token)
+    return bitmap
+
+
+def horarios_payload(args, cached_only=False):
+    """
+    Horários de início livres para a data e profissional informados,
+    dentro da agenda do profissional; com service_id, só os horários em que
+    cabe a duração do serviço.
+    Retorna (dados, etag); a ETag vem do bitmap de horários da resposta.
+
+    Com cached_only=True não acessa o banco: retorna None quando a resposta
+    depende de uma consulta (usado pelas rotas assíncronas de asgi.py).
+    """
+    date_str = args.get("date")
+    professional_id = args.get("professional_id", type=int)
+    service_id = args.get("service_id", type=int)
+
+    if not (date_str and professional_id):
+        return {"slots": []}, None
 
-    appointment = None
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(
-            """
-            SELECT a.id,
-                   a.appointment_date,
-                   a.appointment_time,
-                   a.status,
-                   c.name,
-                   c.email,
-                   c.phone,
-                   p.name AS professional_name,
-                   s.name AS service_name
-            FROM appointments a
-            JOIN clients c ON a.client_id = c.id
-            JOIN professionals p ON a.professional_id = p.id
-            JOIN services s ON a.service_id = s.id
-            WHERE a.id = %s
-            """,
-            (appointment_id,),
-        )
-        appointment = cursor.fetchone()
-    finally:
-        cursor.close()
-        conn.close()
+        appointment_date = datetime.strptime(date_str, "%d/%m/%Y").date()
+    except ValueError:
+        return {"slots": []}, None
 
-    if not appointment:
-        flash("Agendamento não encontrado.", "warning")
-        return redirect(url_for("index"))
+    snapshot = catalog.peek() if cached_only else catalog.get()
+    if snapshot is None:
+        return None if cached_only else ({"slots": []}, None)
+    duration = snapshot.service_duration(service_id) if service_id else 1
 
-    # Normaliza tipos antes de mandar para o template
-    appointment["appointment_date"] = normalize_date(appointment["appointment_date"])
-    appointment["appointment_time"] = normalize_time(appointment["appointment_time"])
+    if cached_only:
+        bitmap = occupancy.get((professional_id, appointment_date))
+        if bitmap is None:
+            return None
+    else:
+        bitmap = occupied_bitmap(professional_id, appointment_date)
+        if bitmap is None:
+            return {"slots": []}, None
 
-    return render_template("booking_success.html", appointment=appointment)
+    starts = snapshot.schedules.free_starts(professional_id, appointment_date, bitmap, duration)
+    return {"slots": slot_grid.labels(starts)}, f"{services().slots_etag_prefix}-{starts:x}"
 
 
-@app.route("/api/horarios")
+@api.route("/horarios")
+@rate_limited
 def api_horarios():
     """Retorna uma lista de horários livres para a data e profissional informados."""
-    date_str = request.args.get("date")
-    professional_id = request.args.get("professional_id", type=int)
+    payload, etag = horarios_payload(request.args)
+    return json_response(payload, etag, current_app.config["SLOTS_CACHE_CONTROL"])
+
+
+def slot_state(snapshot, professional_id, day, bitmap):
+    """
+    Evento do stream de horários: os horários de início livres da data
+    para cada duração de serviço atendida pelo profissional ("1", "2"...).
+    """
+    durations = {1} | {
+        service["duration_slots"]
+        for service in snapshot.services_by_professional.get(professional_id, [])
+    }
+    free_starts = snapshot.schedules.free_starts
+    return {
+        "professional_id": professional_id,
+        "date": day.strftime("%d/%m/%Y"),
+        "free": {
+            str(n): slot_grid.labels(free_starts(professional_id, day, bitmap, n))
+            for n in sorted(durations)
+        },
+    }
+
+
+def current_slot_state(key, connection=db_read_connection):
+    """slot_state() da chave (professional_id, data), ou None sem banco/catálogo."""
+    snapshot = catalog.get()
+    if snapshot is None:
+        return None
+    bitmap = occupied_bitmap(*key, connection=connection)
+    if bitmap is None:
+        return None
+    return slot_state(snapshot, key[0], key[1], bitmap)
 
-    if not (date_str and professional_id):
-        return jsonify({"slots": []})
 
+def publish_slot_change(key):
+    """
+    Ouvinte do índice de ocupação: após um agendamento ou cancelamento
+    confirmado, envia o novo estado aos assinantes da chave. A leitura
+    (quando a chave não está no índice) é feita uma vez, no primário, que
+    já tem a gravação, e o evento vale para todos os assinantes.
+    """
+    if not slot_events.has_subscribers(key):
+        return
+    state = current_slot_state(key, connection=db_connection)
+    if state is not None:
+        slot_events.publish(key, state)
+
+
+def slot_stream_key(args):
+    """Chave (professional_id, data) de uma assinatura do stream, ou None se inválida."""
+    professional_id = args.get("professional_id", type=int)
     try:
-        appointment_date = datetime.strptime(date_str, "%d/%m/%Y").date()
+        day = datetime.strptime(args.get("date", ""), "%d/%m/%Y").date()
     except ValueError:
-        return jsonify({"slots": []})
+        return None
+    if not professional_id:
+        return None
+    return professional_id, day
+
 
-    conn = get_db_connection()
-    if conn is None:
-        return jsonify({"slots": []})
+def sse_message(event):
+    return f"data: {json.dumps(event, separators=(',', ':'))}\n\n"
 
-    used_times = set()
+
+@api.route("/horarios/stream")
+@rate_limited
+def api_horarios_stream():
+    """
+    Server-Sent Events com os horários livres de um profissional em uma
+    data (professional_id, date): o estado atual ao conectar e um novo
+    evento a cada agendamento ou cancelamento deste processo.
+    """
+    key = slot_stream_key(request.args)
+    if key is None:
+        return jsonify({"error": "Informe professional_id e date (dd/mm/aaaa)."}), 400
+
+    # O gerador roda depois que o contexto da requisição foi encerrado:
+    # usa o próprio objeto da aplicação, não o atalho slot_events
+    events = services().slot_events
+    subscription = Subscription()
+    # Assina antes de ler o estado inicial para não perder uma mudança no meio
+    if not events.subscribe(key, subscription.push):
+        response = jsonify({"error": "Muitas conexões abertas. Tente novamente mais tarde."})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(current_app.config["SSE_HEARTBEAT_SECONDS"])
+        return response
     try:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT appointment_time
-            FROM appointments
-            WHERE appointment_date = %s
-              AND professional_id = %s
-              AND status = 'scheduled'
-            """,
-            (appointment_date, professional_id),
-        )
-        for (time_value,) in cursor.fetchall():
-            t = normalize_time(time_value)
-            if hasattr(t, "strftime"):
-                used_times.add(t.strftime("%H:%M"))
-    finally:
-        cursor.close()
-        conn.close()
+        initial = current_slot_state(key)
+    except Exception:
+        events.unsubscribe(key, subscription.push)
+        raise
 
-    free_slots = [t for t in AVAILABLE_TIME_SLOTS if t not in used_times]
-    return jsonify({"slots": free_slots})
+    heartbeat = current_app.config["SSE_HEARTBEAT_SECONDS"]
+    max_seconds = current_app.config["SSE_MAX_SECONDS"]
 
+    def generate():
+        try:
+            yield "retry: 3000\n\n"  # reconexão do EventSource em 3 s
+            if initial is not None:
+                yield sse_message(initial)
+            deadline = monotonic() + max_seconds
+            while monotonic() < deadline:
+                event = subscription.wait(heartbeat)
+                yield sse_message(event) if event is not None else ": ping\n\n"
+        finally:
+            events.unsubscribe(key, subscription.push)
 
-@app.route("/api/servicos")
-def api_servicos():
-    """Retorna módulos/serviços atendidos por um profissional."""
-    professional_id = request.args.get("professional_id", type=int)
-    if not professional_id:
-        return jsonify({"services": []})
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def parse_id_list(values):
+    """Converte valores como ["1", "2,3"] em [1, 2, 3], ignorando inválidos."""
+    ids = []
+    for value in values:
+        for part in value.split(","):
+            part = part.strip()
+            if part.isdigit() and int(part) not in ids:
+                ids.append(int(part))
+    return ids
+
+
+def load_occupancy_range(conn, professional_ids, start_date, end_date):
+    """
+    Carrega no índice de ocupação todos os pares (profissional, data) do
+    intervalo com uma única consulta agrupada.
+    Retorna um dicionário {(professional_id, data): bitmap}.
+    """
+    token = occupancy.load_token()
+    used = {}
+    for professional_id, appointment_date, spans in repository.booked_slots_by_day(
+        conn, professional_ids, start_date, end_date
+    ):
+        used[(professional_id, normalize_date(appointment_date))] = [
+            (slot, int(length))
+            for slot, length in (item.split("/") for item in spans.split(","))
+        ]
+
+    bitmaps = {}
+    days = (end_date - start_date).days + 1
+    for professional_id in professional_ids:
+        for offset in range(days):
+            key = (professional_id, start_date + timedelta(days=offset))
+            bitmap = occupancy.bitmap_from_spans(used.get(key, ()))
+            occupancy.put(key, bitmap, token)
+            bitmaps[key] = bitmap
+    return bitmaps
+
+
+def after_fork():
+    """
+    Chamada em cada processo filho logo após o fork (server.py): recria os
+    pools de conexão, que não podem ser compartilhados entre processos.
+    """
+    db_router.after_fork()
 
-    conn = get_db_connection()
-    if conn is None:
-        return jsonify({"services": []})
 
-    services = []
+def warm_up(days=None, connections=None):
+    """
+    Prepara o processo antes da primeira requisição: abre conexões no pool
+    e carrega o catálogo e a ocupação dos profissionais ativos de hoje até
+    `days` dias à frente (limitada ao tamanho do índice de ocupação).
+    Sem argumentos, usa SERVE_WARMUP_DAYS e SERVE_WARMUP_CONNECTIONS.
+    Retorna um resumo com o tempo gasto.
+    """
+    if days is None:
+        days = current_app.config["SERVE_WARMUP_DAYS"]
+    if connections is None:
+        connections = current_app.config["SERVE_WARMUP_CONNECTIONS"]
+    started = perf_counter()
+    summary = {"connections": 0, "professionals": 0, "days": 0}
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(
-            """
-            SELECT s.id, s.name
-            FROM services s
-            JOIN professional_services ps
-              ON ps.service_id = s.id
-             AND ps.professional_id = %s
-            WHERE s.active = 1
-            ORDER BY s.name
-            """,
-            (professional_id,),
-        )
-        services = cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
+        summary["connections"] = db_pool.fill(connections)
+    except connector.Error as e:
+        current_app.logger.error("Erro ao conectar ao MySQL: %s", e)
+
+    snapshot = catalog.get(fresh=True)
+    if snapshot is not None and days > 0:
+        professional_ids = [p["id"] for p in snapshot.active_professionals]
+        if professional_ids:
+            days = min(days, occupancy.max_entries // len(professional_ids))
+        if professional_ids and days:
+            today = datetime.now().date()
+            with db_read_connection() as conn:
+                if conn is not None:
+                    load_occupancy_range(
+                        conn, professional_ids, today, today + timedelta(days=days - 1)
+                    )
+                    summary.update(professionals=len(professional_ids), days=days)
+
+    summary["catalog"] = snapshot is not None
+    summary["seconds"] = perf_counter() - started
+    return summary
+
+
+def cached_bitmaps(professional_ids, dates):
+    """
+    Bitmaps de ocupação já no índice para cada (profissional, data).
+    Retorna ({(professional_id, data): bitmap}, profissionais com alguma data fora do cache).
+    """
+    bitmaps = {}
+    missing = []
+    for professional_id in professional_ids:
+        for d in dates:
+            bitmap = occupancy.get((professional_id, d))
+            if bitmap is None:
+                missing.append(professional_id)
+                break
+            bitmaps[(professional_id, d)] = bitmap
+    return bitmaps, missing
+
+
+def disponibilidade_payload(args, cached_only=False):
+    """
+    Horários livres de vários dias e profissionais de uma só vez.
+
+    Parâmetros: start e end (dd/mm/aaaa) e, opcionalmente, professional_id
+    (um ou vários, separados por vírgula) ou service_id. Em "free", cada
+    profissional tem um número por data: o bit i indica que um atendimento
+    pode começar em slots[i] (dentro da agenda dele e, com service_id,
+    cabendo a duração do serviço).
+    Retorna (dados, None): a resposta não tem ETag.
+    Com cached_only=True, retorna None se precisar consultar o banco.
+    """
+    empty = {"slots": slot_grid.slots, "dates": [], "professionals": [], "free": []}
+
+    try:
+        start_date = datetime.strptime(args.get("start", ""), "%d/%m/%Y").date()
+        end_date = datetime.strptime(
+            args.get("end") or args.get("start", ""), "%d/%m/%Y"
+        ).date()
+    except ValueError:
+        return empty, None
+
+    days = (end_date - start_date).days + 1
+    if days < 1 or days > current_app.config["AVAILABILITY_MAX_DAYS"]:
+        return empty, None
+
+    professional_ids = parse_id_list(args.getlist("professional_id"))
+    service_id = args.get("service_id", type=int)
+
+    snapshot = catalog.peek() if cached_only else catalog.get()
+    if snapshot is None:
+        return None if cached_only else (empty, None)
+
+    if service_id:
+        professionals = snapshot.professionals_by_service.get(service_id, [])
+        if professional_ids:
+            professionals = [p for p in professionals if p["id"] in professional_ids]
+    elif professional_ids:
+        professionals = [
+            p for p in snapshot.active_professionals if p["id"] in professional_ids
+        ]
+    else:
+        professionals = snapshot.active_professionals
+
+    dates = [start_date + timedelta(days=offset) for offset in range(days)]
+    bitmaps, missing = cached_bitmaps([p["id"] for p in professionals], dates)
+
+    if missing:
+        if cached_only:
+            return None
+        with db_read_connection() as conn:
+            if conn is None:
+                return empty, None
+            bitmaps.update(load_occupancy_range(conn, missing, start_date, end_date))
+
+    duration = snapshot.service_duration(service_id) if service_id else 1
+    free_starts = snapshot.schedules.free_starts
+    return {
+        "slots": slot_grid.slots,
+        "dates": [d.strftime("%d/%m/%Y") for d in dates],
+        "professionals": professionals,
+        "free": [
+            [free_starts(p["id"], d, bitmaps[(p["id"], d)], duration) for d in dates]
+            for p in professionals
+        ],
+    }, None
+
+
+@api.route("/disponibilidade")
+@rate_limited
+def api_disponibilidade():
+    """Retorna, de uma só vez, os horários livres de vários dias e profissionais."""
+    payload, _ = disponibilidade_payload(request.args)
+    return jsonify(payload)
+
+
+def proximos_payload(args, cached_only=False):
+    """
+    Primeiros horários livres para um serviço, com qualquer profissional
+    que o atenda, a partir de hoje (ou de `start`, dd/mm/aaaa).
+
+    A busca avança em janelas de NEXT_SLOTS_WINDOW_DAYS dias, até
+    NEXT_SLOTS_HORIZON_DAYS: em cada janela, a ocupação vem do índice em
+    memória e o que faltar é lido com uma única consulta agrupada
+    (load_occupancy_range). Profissionais que não atendem em nenhum dia da
+    janela não são consultados. Os horários saem em ordem de data, horário
+    e nome do profissional; os de hoje só a partir do horário atual.
+    Retorna (dados, None). Com cached_only=True, retorna None se precisar
+    consultar o banco.
+    """
+    service_id = args.get("service_id", type=int)
+    config = current_app.config
+    limit = min(
+        max(args.get("limit", config["NEXT_SLOTS_DEFAULT"], type=int), 1), config["NEXT_SLOTS_MAX"]
+    )
+    empty = {"service": None, "slots": [], "searched_until": None}
+    if not service_id:
+        return empty, None
+
+    now = datetime.now()
+    today = now.date()
+    start_date = today
+    if args.get("start"):
+        try:
+            start_date = max(datetime.strptime(args["start"], "%d/%m/%Y").date(), today)
+        except ValueError:
+            return empty, None
+
+    snapshot = catalog.peek() if cached_only else catalog.get()
+    if snapshot is None:
+        return None if cached_only else (empty, None)
+
+    service = snapshot.services_by_id.get(service_id)
+    professionals = snapshot.professionals_by_service.get(service_id, [])
+    if service is None or not professionals:
+        return empty, None
+    duration = service.duration_slots
+    schedules = snapshot.schedules
+
+    # Horários de hoje que já passaram não entram na busca
+    past_today = 0
+    for i, minutes in enumerate(slot_grid.starts):
+        if minutes <= now.hour * 60 + now.minute:
+            past_today |= 1 << i
+
+    found = []
+    end_date = start_date + timedelta(days=config["NEXT_SLOTS_HORIZON_DAYS"] - 1)
+    searched_until = None
+    window_start = start_date
+    with ExitStack() as stack:
+        conn = None  # aberta só se alguma janela não estiver no cache
+        while window_start <= end_date and len(found) < limit:
+            window_end = min(window_start + timedelta(days=config["NEXT_SLOTS_WINDOW_DAYS"] - 1), end_date)
+            dates = [
+                window_start + timedelta(days=offset)
+                for offset in range((window_end - window_start).days + 1)
+            ]
+            working = [
+                p for p in professionals
+                if any(schedules.working_mask(p["id"], d) for d in dates)
+            ]
+
+            bitmaps, missing = cached_bitmaps([p["id"] for p in working], dates)
+            if missing:
+                if cached_only:
+                    return None
+                if conn is None:
+                    conn = stack.enter_context(db_read_connection())
+                    if conn is None:
+                        return empty, None
+                bitmaps.update(load_occupancy_range(conn, missing, window_start, window_end))
+
+            for d in dates:
+                day_slots = []
+                for p in working:
+                    starts = schedules.free_starts(p["id"], d, bitmaps[(p["id"], d)], duration)
+                    if d == today:
+                        starts &= ~past_today
+                    for slot in slot_grid.labels(starts):
+                        day_slots.append((slot, p["name"], p["id"]))
+                day_slots.sort()
+                for slot, name, professional_id in day_slots[:limit - len(found)]:
+                    found.append({
+                        "date": d.strftime("%d/%m/%Y"),
+                        "time": slot,
+                        "professional_id": professional_id,
+                        "professional_name": name,
+                    })
+                searched_until = d
+                if len(found) >= limit:
+                    break
+            window_start = window_end + timedelta(days=1)
+
+    return {
+        "service": {"id": service.id, "name": service.name, "duration_slots": duration},
+        "slots": found,
+        "searched_until": searched_until.strftime("%d/%m/%Y") if searched_until else None,
+    }, None
+
+
+@api.route("/proximos")
+@rate_limited
+def api_proximos():
+    """Retorna os primeiros horários livres de um serviço, com qualquer profissional."""
+    payload, _ = proximos_payload(request.args)
+    return jsonify(payload)
+
+
+def servicos_payload(args, cached_only=False):
+    """
+    Módulos/serviços atendidos por um profissional.
+    Retorna (dados, etag); a ETag é a versão do catálogo usada na resposta.
+    Com cached_only=True, retorna None se o catálogo precisar ser conferido.
+    """
+    professional_id = args.get("professional_id", type=int)
+    if not professional_id:
+        return {"services": []}, None
+
+    snapshot = catalog.peek() if cached_only else catalog.get()
+    if snapshot is None:
+        return None if cached_only else ({"services": []}, None)
+
+    services = snapshot.services_by_professional.get(professional_id, [])
+    return {"services": services}, f"c{snapshot.version}"
 
-    return jsonify({"services": services})
+
+@api.route("/servicos")
+@rate_limited
+def api_servicos():
+    """Retorna módulos/serviços atendidos por um profissional."""
+    payload, etag = servicos_payload(request.args)
+    return json_response(payload, etag, current_app.config["SERVICES_CACHE_CONTROL"])
 
 
-@app.route("/admin/login", methods=["GET", "POST"])
+@admin.route("/login", methods=["GET", "POST"])
 def admin_login():
     if request.method == "POST":
         email = request.form.get("email", "").strip()
         password = request.form.get("password", "").strip()
 
-        conn = get_db_connection()
-        if conn is None:
-            flash("Erro ao conectar ao banco de dados.", "danger")
-            return redirect(url_for("admin_login"))
+        with db_connection() as conn:
+            if conn is None:
+                flash("Erro ao conectar ao banco de dados.", "danger")
+                return redirect(url_for("admin.admin_login"))
 
-        try:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute(
-                """
-                SELECT id, name, email, role
-                FROM users
-                WHERE email = %s AND password = %s
-                """,
-                (email, password),
-            )
-            user = cursor.fetchone()
-        finally:
-            cursor.close()
-            conn.close()
+            user = repository.find_user(conn, email, password)
 
         if not user:
             flash("Usuário ou senha inválidos.", "danger")
-            return redirect(url_for("admin_login"))
+            return redirect(url_for("admin.admin_login"))
 
         session["user_id"] = user["id"]
         session["user_name"] = user["name"]
         session["user_role"] = user["role"]
 
         flash("Login realizado com sucesso.", "success")
-        return redirect(url_for("admin_dashboard"))
+        return redirect(url_for("admin.admin_dashboard"))
 
     return render_template("admin_login.html")
 
 
-@app.route("/admin/logout")
+@admin.route("/logout")
 def admin_logout():
     session.clear()
     flash("Logout realizado com sucesso.", "success")
-    return redirect(url_for("admin_login"))
+    return redirect(url_for("admin.admin_login"))
 
 
-@app.route("/admin/dashboard")
+@admin.route("/dashboard")
 @login_required
 def admin_dashboard():
     today = date.today()
 
-    conn = get_db_connection()
-    if conn is None:
-        flash("Erro ao conectar ao banco de dados.", "danger")
-        return redirect(url_for("admin_login"))
-
-    total_today = 0
-    upcoming = []
-    try:
-        cursor = conn.cursor(dictionary=True)
-
-        # total de agendamentos do dia
-        cursor.execute(
-            """
-            SELECT COUNT(*) AS total
-            FROM appointments
-            WHERE appointment_date = %s
-              AND status = 'scheduled'
-            """,
-            (today,),
-        )
-        row = cursor.fetchone()
-        if row:
-            total_today = row["total"]
-
-        # próximos agendamentos
-        cursor.execute(
-            """
-            SELECT a.id,
-                   a.appointment_date,
-                   a.appointment_time,
-                   a.status,
-                   c.name AS client_name,
-                   p.name AS professional_name,
-                   s.name AS service_name
-            FROM appointments a
-            JOIN clients c ON a.client_id = c.id
-            JOIN professionals p ON a.professional_id = p.id
-            JOIN services s ON a.service_id = s.id
-            WHERE a.appointment_date >= %s
-              AND a.status = 'scheduled'
-            ORDER BY a.appointment_date, a.appointment_time
-            LIMIT 10
-            """,
-            (today,),
-        )
-        upcoming = cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
+    def load():
+        with db_read_connection() as conn:
+            if conn is None:
+                return None
+            # total de agendamentos do dia e próximos agendamentos
+            return (
+                repository.scheduled_total(conn, today),
+                repository.upcoming_appointments(conn, today, limit=10),
+            )
 
-    # Normaliza dados para o template
-    for u in upcoming:
-        u["appointment_date"] = normalize_date(u["appointment_date"])
-        u["appointment_time"] = normalize_time(u["appointment_time"])
+    # Vários gestores com o painel aberto dividem a mesma leitura
+    data = page_cache.get_or_compute(("dashboard", today), current_app.config["DASHBOARD_CACHE_TTL"], load)
+    if data is None:
+        flash("Erro ao conectar ao banco de dados.", "danger")
+        return redirect(url_for("admin.admin_login"))
+    total_today, upcoming = data
 
     return render_template(
         "admin_dashboard.html",
         total_today=total_today,
         upcoming=upcoming,
         today=today,
+        cache_ttl=current_app.config["DASHBOARD_CACHE_TTL"],
     )
 
 
-@app.route("/admin/agendamentos")
-@login_required
-def admin_agendamentos():
-    date_str = request.args.get("date")
+def encode_page_cursor(appointment):
+    """Cursor de paginação: posição (data, horário, id) do último item da página."""
+    return "{}_{}_{}".format(
+        appointment.appointment_date.isoformat(),
+        appointment.appointment_time.strftime("%H:%M:%S"),
+        appointment.id,
+    )
 
-    conn = get_db_connection()
-    if conn is None:
-        flash("Erro ao conectar ao banco de dados.", "danger")
-        return redirect(url_for("admin_dashboard"))
 
-    appointments = []
-    filter_date = None
+def decode_page_cursor(value):
+    """Inverso de encode_page_cursor; retorna None se o cursor for inválido."""
     try:
-        cursor = conn.cursor(dictionary=True)
+        date_part, time_part, id_part = value.split("_")
+        return (
+            datetime.strptime(date_part, "%Y-%m-%d").date(),
+            datetime.strptime(time_part, "%H:%M:%S").time(),
+            int(id_part),
+        )
+    except (AttributeError, ValueError):
+        return None
 
-        if date_str:
-            try:
-                filter_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-            except ValueError:
-                filter_date = None
-
-        if filter_date:
-            cursor.execute(
-                """
-                SELECT a.id,
-                       a.appointment_date,
-                       a.appointment_time,
-                       a.status,
-                       c.name AS client_name,
-                       c.phone,
-                       p.name AS professional_name,
-                       s.name AS service_name
-                FROM appointments a
-                JOIN clients c ON a.client_id = c.id
-                JOIN professionals p ON a.professional_id = p.id
-                JOIN services s ON a.service_id = s.id
-                WHERE a.appointment_date = %s
-                ORDER BY a.appointment_time
-                """,
-                (filter_date,),
-            )
-        else:
-            cursor.execute(
-                """
-                SELECT a.id,
-                       a.appointment_date,
-                       a.appointment_time,
-                       a.status,
-                       c.name AS client_name,
-                       c.phone,
-                       p.name AS professional_name,
-                       s.name AS service_name
-                FROM appointments a
-                JOIN clients c ON a.client_id = c.id
-                JOIN professionals p ON a.professional_id = p.id
-                JOIN services s ON a.service_id = s.id
-                ORDER BY a.appointment_date DESC, a.appointment_time DESC
-                LIMIT 50
-                """
-            )
 
-        appointments = cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
+def parse_iso_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+@admin.route("/agendamentos")
+@login_required
+def admin_agendamentos():
+    """
+    Lista agendamentos com filtros e paginação por cursor (keyset) sobre
+    (appointment_date, appointment_time, id): cada página é lida a partir
+    da posição da anterior, sem OFFSET, com o mesmo custo em qualquer ponto.
+    """
+    # "date" filtra um único dia (mantido por compatibilidade)
+    single_date = parse_iso_date(request.args.get("date"))
+    date_from = single_date or parse_iso_date(request.args.get("date_from"))
+    date_to = single_date or parse_iso_date(request.args.get("date_to"))
+    professional_id = request.args.get("professional_id", type=int)
+    service_id = request.args.get("service_id", type=int)
+    status = request.args.get("status")
+    if status not in ("scheduled", "cancelled"):
+        status = None
+    after = decode_page_cursor(request.args.get("after"))
+
+    filters = {
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+        "professional_id": professional_id,
+        "service_id": service_id,
+        "status": status,
+    }
+    filters = {k: v for k, v in filters.items() if v}
+
+    # Um único dia é listado em ordem crescente de horário; demais, mais recentes primeiro
+    ascending = date_from is not None and date_from == date_to
+    page_size = current_app.config["ADMIN_PAGE_SIZE"]
+
+    with db_read_connection() as conn:
+        if conn is None:
+            flash("Erro ao conectar ao banco de dados.", "danger")
+            return redirect(url_for("admin.admin_dashboard"))
+
+        appointments = repository.list_appointments(
+            conn,
+            professional_id=professional_id,
+            service_id=service_id,
+            status=status,
+            date_from=date_from,
+            date_to=date_to,
+            after=after,
+            ascending=ascending,
+            limit=page_size + 1,
+        )
+
+    has_next = len(appointments) > page_size
+    appointments = appointments[:page_size]
 
-    # Normaliza dados para o template
-    for a in appointments:
-        a["appointment_date"] = normalize_date(a["appointment_date"])
-        a["appointment_time"] = normalize_time(a["appointment_time"])
+    next_cursor = encode_page_cursor(appointments[-1]) if has_next else None
 
+    snapshot = catalog.get()
     return render_template(
         "admin_appointments.html",
         appointments=appointments,
-        filter_date=filter_date,
+        filters=filters,
+        next_cursor=next_cursor,
+        is_first_page=after is None,
+        professionals=snapshot.professionals if snapshot else [],
+        services=snapshot.services if snapshot else [],
     )
 
 
-@app.route("/admin/agendamentos/<int:appointment_id>/cancelar", methods=["POST"])
+@admin.route("/agendamentos/<int:appointment_id>/cancelar", methods=["POST"])
 @login_required
 def admin_cancelar_agendamento(appointment_id: int):
-    conn = get_db_connection()
-    if conn is None:
-        flash("Erro ao conectar ao banco de dados.", "danger")
-        return redirect(url_for("admin_agendamentos"))
+    with db_connection() as conn:
+        if conn is None:
+            flash("Erro ao conectar ao banco de dados.", "danger")
+            return redirect(url_for("admin.admin_agendamentos"))
 
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE appointments SET status = 'cancelled' WHERE id = %s",
-            (appointment_id,),
-        )
+        row = repository.lock_scheduled(conn, appointment_id)
+        if row:
+            repository.cancel_appointment(conn, appointment_id)
+            repository.record_cancellation(conn, row[2], row[0], row[1])
         conn.commit()
-    finally:
-        cursor.close()
-        conn.close()
+
+    if row:
+        professional_id, _service_id, appointment_date, appointment_time, duration = row
+        occupancy.release(
+            (professional_id, normalize_date(appointment_date)),
+            slot_label(appointment_time),
+            duration,
+        )
+        invalidate_admin_pages()
+        pin_primary()
 
     flash("Agendamento cancelado com sucesso.", "success")
-    return redirect(url_for("admin_agendamentos"))
+    return redirect(url_for("admin.admin_agendamentos"))
 
 
-@app.route("/admin/relatorios")
+EXPORT_COLUMNS = [
+    "id", "appointment_date", "appointment_time", "status", "notes", "created_at",
+    "client_id", "client_name", "client_email", "client_phone",
+    "professional_id", "professional_name", "service_id", "service_name",
+]
+
+
+def open_export(date_from, date_to):
+    """
+    Obtém as conexões da exportação antes de a resposta começar, para que
+    um banco indisponível não vire um arquivo vazio. Retorna None ou
+    (lotes, stack): os lotes de linhas de agendamentos (com cliente,
+    profissional e serviço) são lidos em streaming (ver
+    repository.export_batches), e fechar o `stack` (ExitStack) encerra a
+    leitura e devolve as conexões ao pool. Quando o período alcança
+    agendamentos arquivados, uma segunda conexão lê appointments_archive
+    ao mesmo tempo.
+    """
+    with ExitStack() as stack:
+        conn = stack.enter_context(db_read_connection())
+        if conn is None:
+            return None
+        archive_conn = None
+        last_archived = repository.archive_last_date(conn)
+        if last_archived is not None and not (date_from and date_from > last_archived):
+            archive_conn = stack.enter_context(db_read_connection())
+            if archive_conn is None:
+                return None
+        batches = repository.export_batches(
+            conn, date_from, date_to, current_app.config["EXPORT_BATCH_SIZE"],
+            archive_conn=archive_conn,
+        )
+        stack.callback(batches.close)
+        return batches, stack.pop_all()
+
+
+def export_values(row):
+    """Converte uma linha exportada em valores serializáveis (texto/números)."""
+    values = list(row)
+    values[1] = normalize_date(values[1]).isoformat()
+    values[2] = slot_label(values[2])
+    if values[5] is not None:
+        values[5] = values[5].isoformat(sep=" ")
+    return values
+
+
+@admin.route("/exportar")
 @login_required
-def admin_relatorios():
-    conn = get_db_connection()
-    if conn is None:
+def admin_exportar():
+    """Exporta agendamentos em CSV ou NDJSON, em streaming, com filtro de período."""
+    export_format = request.args.get("format", "csv")
+    if export_format not in ("csv", "ndjson"):
+        export_format = "csv"
+    date_from = parse_iso_date(request.args.get("date_from"))
+    date_to = parse_iso_date(request.args.get("date_to"))
+
+    export = open_export(date_from, date_to)
+    if export is None:
         flash("Erro ao conectar ao banco de dados.", "danger")
-        return redirect(url_for("admin_dashboard"))
+        return redirect(url_for("admin.admin_agendamentos"))
+    batches, connections = export
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue()
+        for rows in batches:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(export_values(row) for row in rows)
+            yield buffer.getvalue()
+
+    def generate_ndjson():
+        for rows in batches:
+            yield "".join(
+                json.dumps(dict(zip(EXPORT_COLUMNS, export_values(row))), ensure_ascii=False) + "\n"
+                for row in rows
+            )
 
-    stats = []
-    try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(
-            """
-            SELECT appointment_date,
-                   COUNT(*) AS total
-            FROM appointments
-            WHERE status = 'scheduled'
-            GROUP BY appointment_date
-            ORDER BY appointment_date DESC
-            LIMIT 30
-            """
+    filename = "agendamentos"
+    if date_from or date_to:
+        filename += f"_{date_from or 'inicio'}_{date_to or 'fim'}"
+
+    # O contexto da requisição acompanha o streaming (log de consultas lentas)
+    if export_format == "ndjson":
+        body, mimetype = stream_with_context(generate_ndjson()), "application/x-ndjson"
+    else:
+        body, mimetype = stream_with_context(generate_csv()), "text/csv"
+
+    response = Response(
+        body,
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}.{export_format}"},
+    )
+    # Chamado pelo servidor ao fim do envio, inclusive se o download for
+    # interrompido ou nem chegar a começar
+    response.call_on_close(connections.close)
+    return response
+
+
+@admin.route("/importar", methods=["GET", "POST"])
+@login_required
+def admin_importar():
+    report = None
+    if request.method == "POST":
+        upload = request.files.get("file")
+        if not upload or not upload.filename:
+            flash("Selecione um arquivo CSV.", "danger")
+            return redirect(url_for("admin.admin_importar"))
+
+        snapshot = catalog.get(fresh=True)
+        if snapshot is None:
+            flash("Erro ao conectar ao banco de dados.", "danger")
+            return redirect(url_for("admin.admin_importar"))
+
+        # Lido em streaming, sem carregar o arquivo inteiro em memória
+        stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+        with db_connection() as conn:
+            if conn is None:
+                flash("Erro ao conectar ao banco de dados.", "danger")
+                return redirect(url_for("admin.admin_importar"))
+            try:
+                report = importer.import_csv(
+                    conn, stream, snapshot, slot_grid.slots,
+                    chunk_size=current_app.config["IMPORT_CHUNK_SIZE"], occupancy=occupancy,
+                )
+            except UnicodeDecodeError:
+                flash("O arquivo precisa estar codificado em UTF-8.", "danger")
+                return redirect(url_for("admin.admin_importar"))
+            except ValueError as e:
+                flash(str(e), "danger")
+                return redirect(url_for("admin.admin_importar"))
+
+        invalidate_admin_pages()
+        pin_primary()
+        flash(
+            f"{report.imported} de {report.rows} linha(s) importada(s) "
+            f"({report.rows_per_s:.0f} linhas/s).",
+            "warning" if report.errors else "success",
         )
-        stats = cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
 
-    # Normaliza datas
-    for row in stats:
-        row["appointment_date"] = normalize_date(row["appointment_date"])
+    return render_template(
+        "admin_import.html",
+        report=report,
+        errors=report.errors[:current_app.config["IMPORT_ERRORS_SHOWN"]] if report else [],
+        columns=", ".join(importer.REQUIRED_COLUMNS + ("notes",)),
+    )
+
+
+@admin.route("/relatorios")
+@login_required
+def admin_relatorios():
+    def load():
+        with db_read_connection() as conn:
+            if conn is None:
+                return None
+            # Lê os totais mantidos em appointment_daily_stats (daily_stats.py)
+            return repository.daily_totals(conn, days=30)
+
+    totals = page_cache.get_or_compute(("reports", "daily_totals"), current_app.config["REPORTS_CACHE_TTL"], load)
+    if totals is None:
+        flash("Erro ao conectar ao banco de dados.", "danger")
+        return redirect(url_for("admin.admin_dashboard"))
+
+    stats = [
+        {"appointment_date": normalize_date(day), "total": total}
+        for day, total in totals
+    ]
 
     max_total = max((row["total"] for row in stats), default=0)
 
-    return render_template("admin_reports.html", stats=stats, max_total=max_total)
+    return render_template(
+        "admin_reports.html", stats=stats, max_total=max_total,
+        cache_ttl=current_app.config["REPORTS_CACHE_TTL"],
+    )
+
 
+def parse_clock(value):
+    """Horário "HH:MM" do formulário, ou None se inválido."""
+    try:
+        return datetime.strptime((value or "").strip(), "%H:%M").strftime("%H:%M")
+    except ValueError:
+        return None
 
-@app.route("/admin/profissionais", methods=["GET", "POST"])
+
+@admin.route("/profissionais", methods=["GET", "POST"])
 @login_required
 def admin_profissionais():
-    conn = get_db_connection()
-    if conn is None:
-        flash("Erro ao conectar ao banco de dados.", "danger")
-        return redirect(url_for("admin_dashboard"))
-
     if request.method == "POST":
-        name = request.form.get("name", "").strip()
-        email = request.form.get("email", "").strip()
-        phone = request.form.get("phone", "").strip()
+        form_type = request.form.get("form_type", "new_professional")
+
+        with db_connection() as conn:
+            if conn is None:
+                flash("Erro ao conectar ao banco de dados.", "danger")
+                return redirect(url_for("admin.admin_dashboard"))
+
+            if form_type == "schedule":
+                # Intervalo de atendimento semanal
+                professional_id = request.form.get("professional_id", type=int)
+                weekday = request.form.get("weekday", type=int)
+                start = parse_clock(request.form.get("start_time"))
+                end = parse_clock(request.form.get("end_time"))
+
+                if not professional_id or weekday not in range(7):
+                    flash("Profissional ou dia da semana inválido.", "danger")
+                    return redirect(url_for("admin.admin_profissionais"))
+                if not (start and end and start < end):
+                    flash("Informe o horário inicial e o final (HH:MM).", "danger")
+                    return redirect(url_for("admin.admin_profissionais"))
+
+                repository.add_schedule(conn, professional_id, weekday, start, end)
+                conn.commit()
+                flash("Horário de atendimento cadastrado com sucesso.", "success")
+
+            elif form_type == "exception":
+                # Folga/feriado: sem profissional vale para todos; sem horários, o dia inteiro
+                professional_id = request.form.get("professional_id", type=int) or None
+                exception_date = parse_iso_date(request.form.get("exception_date"))
+                start = parse_clock(request.form.get("start_time"))
+                end = parse_clock(request.form.get("end_time"))
+                description = request.form.get("description", "").strip()[:100] or None
+
+                if exception_date is None:
+                    flash("Informe a data do bloqueio.", "danger")
+                    return redirect(url_for("admin.admin_profissionais"))
+                if (start or end) and not (start and end and start < end):
+                    flash("Informe o horário inicial e o final (HH:MM) ou deixe ambos em branco.", "danger")
+                    return redirect(url_for("admin.admin_profissionais"))
+
+                repository.add_exception(conn, professional_id, exception_date, start, end, description)
+                conn.commit()
+                flash("Bloqueio de agenda cadastrado com sucesso.", "success")
+
+            elif form_type in ("remove_schedule", "remove_exception"):
+                rule_id = request.form.get("id", type=int)
+                if rule_id:
+                    if form_type == "remove_schedule":
+                        repository.remove_schedule(conn, rule_id)
+                    else:
+                        repository.remove_exception(conn, rule_id)
+                    conn.commit()
+                    flash("Regra da agenda removida.", "success")
+
+            else:
+                name = request.form.get("name", "").strip()
+                email = request.form.get("email", "").strip()
+                phone = request.form.get("phone", "").strip()
 
-        if not name:
-            flash("Informe o nome do profissional.", "danger")
-            return redirect(url_for("admin_profissionais"))
+                if not name:
+                    flash("Informe o nome do profissional.", "danger")
+                    return redirect(url_for("admin.admin_profissionais"))
 
-        try:
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO professionals (name, email, phone) VALUES (%s, %s, %s)",
-                (name, email, phone),
-            )
-            conn.commit()
-            flash("Profissional cadastrado com sucesso.", "success")
-        finally:
-            cursor.close()
-            conn.close()
+                repository.create_professional(conn, name, email, phone)
+                conn.commit()
+                flash("Profissional cadastrado com sucesso.", "success")
 
-        return redirect(url_for("admin_profissionais"))
+        catalog.invalidate()
+        return redirect(url_for("admin.admin_profissionais"))
 
-    professionals = []
-    try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(
-            """
-            SELECT id, name, email, phone, active, created_at
-            FROM professionals
-            ORDER BY name
-            """
-        )
-        professionals = cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
+    snapshot = catalog.get(fresh=True)
+    if snapshot is None:
+        flash("Erro ao conectar ao banco de dados.", "danger")
+        return redirect(url_for("admin.admin_dashboard"))
 
-    return render_template("admin_professionals.html", professionals=professionals)
+    return render_template(
+        "admin_professionals.html",
+        professionals=snapshot.professionals,
+        schedules=snapshot.schedule_rows,
+        exceptions=snapshot.exception_rows,
+        weekdays=WEEKDAYS,
+    )
 
 
-@app.route("/admin/servicos", methods=["GET", "POST"])
+@admin.route("/servicos", methods=["GET", "POST"])
 @login_required
 def admin_servicos():
-    conn = get_db_connection()
-    if conn is None:
-        flash("Erro ao conectar ao banco de dados.", "danger")
-        return redirect(url_for("admin_dashboard"))
-
     if request.method == "POST":
         form_type = request.form.get("form_type")
 
-        try:
-            cursor = conn.cursor()
+        with db_connection() as conn:
+            if conn is None:
+                flash("Erro ao conectar ao banco de dados.", "danger")
+                return redirect(url_for("admin.admin_dashboard"))
+
             if form_type == "new_service":
                 name = request.form.get("name", "").strip()
                 description = request.form.get("description", "").strip()
+                duration = request.form.get("duration_slots", 1, type=int)
 
                 if not name:
                     flash("Informe o nome do módulo/serviço.", "danger")
-                    return redirect(url_for("admin_servicos"))
+                    return redirect(url_for("admin.admin_servicos"))
+                if not 1 <= duration <= len(slot_grid.slots):
+                    flash("Duração inválida.", "danger")
+                    return redirect(url_for("admin.admin_servicos"))
 
-                cursor.execute(
-                    "INSERT INTO services (name, description) VALUES (%s, %s)",
-                    (name, description),
-                )
+                repository.create_service(conn, name, description, duration)
                 conn.commit()
                 flash("Módulo/serviço cadastrado com sucesso.", "success")
 
@@ -690,66 +1743,329 @@ def admin_servicos():
                     service_id = int(service_id)
                 except ValueError:
                     flash("Profissional ou módulo inválido.", "danger")
-                    return redirect(url_for("admin_servicos"))
-
-                # Evita duplicidade
-                cursor.execute(
-                    """
-                    INSERT IGNORE INTO professional_services (professional_id, service_id)
-                    VALUES (%s, %s)
-                    """,
-                    (professional_id, service_id),
-                )
+                    return redirect(url_for("admin.admin_servicos"))
+
+                # Evita duplicidade (INSERT IGNORE)
+                repository.link_service(conn, professional_id, service_id)
                 conn.commit()
                 flash("Vínculo entre profissional e módulo criado com sucesso.", "success")
 
-        finally:
-            cursor.close()
-            conn.close()
-
-        return redirect(url_for("admin_servicos"))
+        catalog.invalidate()
+        return redirect(url_for("admin.admin_servicos"))
 
     # GET
-    professionals = []
-    services = []
-    links = []
-    try:
-        cursor = conn.cursor(dictionary=True)
+    snapshot = catalog.get(fresh=True)
+    if snapshot is None:
+        flash("Erro ao conectar ao banco de dados.", "danger")
+        return redirect(url_for("admin.admin_dashboard"))
+
+    return render_template(
+        "admin_services.html",
+        professionals=snapshot.active_professionals,
+        services=snapshot.services,
+        links=snapshot.link_rows,
+        slot_minutes=slot_grid.slot_minutes,
+        max_duration=len(slot_grid.slots),
+    )
+
+
+@admin.route("/status/pool")
+@login_required
+def admin_status_pool():
+    """Contadores do pool de conexões (espera por conexão, esgotamentos etc.)."""
+    data = db_pool.stats()
+    if db_router.replicas:
+        data["routing"] = db_router.stats()
+        data["replicas"] = db_router.replica_stats()
+    return jsonify(data)
+
+
+def metrics_access(f):
+    """login_required, liberando acessos locais se METRICS_ALLOW_LOCAL estiver ativo."""
+    protected = login_required(f)
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if current_app.config["METRICS_ALLOW_LOCAL"] and request.remote_addr in ("127.0.0.1", "::1"):
+            return f(*args, **kwargs)
+        return protected(*args, **kwargs)
+    return decorated_function
 
-        cursor.execute(
-            "SELECT id, name FROM professionals WHERE active = 1 ORDER BY name"
+
+@admin.route("/metrics")
+@metrics_access
+def admin_metrics():
+    """Histogramas por rota, pool de conexões e índice de ocupação no formato do Prometheus."""
+    extra = []
+    for prefix, stats, counters in (
+        ("agenda_pool", db_pool.stats(), db_pool.counters),
+        ("agenda_db_routing", db_router.stats(), db_router.counters),
+        ("agenda_occupancy", occupancy.stats(), occupancy.counters),
+        ("agenda_page_cache", page_cache.stats(), page_cache.counters),
+        ("agenda_rate_limit", api_limiter.stats(), api_limiter.counters),
+        ("agenda_booking_gate", booking_gate.stats(), booking_gate.counters),
+        ("agenda_slot_events", slot_events.stats(), slot_events.counters),
+    ):
+        for name, value in sorted(stats.items()):
+            if name in counters:
+                extra.append((f"{prefix}_{name}_total", "counter", f"Contador {name}.", value))
+            else:
+                extra.append((f"{prefix}_{name}", "gauge", f"Valor atual de {name}.", value))
+    return Response(metrics.render(extra), mimetype="text/plain; version=0.0.4")
+
+
+cli = AppGroup("agenda")
+
+
+@cli.command("db-migrate")
+@click.option("--target", type=int, help="Aplica somente até esta versão.")
+def db_migrate_command(target):
+    """Aplica as migrações pendentes de migrations/ no banco configurado."""
+    import migrate
+
+    with db_connection() as conn:
+        if conn is None:
+            raise click.ClickException("Não foi possível conectar ao banco de dados.")
+        applied = migrate.migrate(conn, target=target, echo=click.echo)
+    click.echo(f"{len(applied)} migração(ões) aplicada(s).")
+
+
+@cli.command("db-seed")
+@click.option("--professionals", default=20, show_default=True)
+@click.option("--services", default=6, show_default=True)
+@click.option("--clients", default=5000, show_default=True)
+@click.option("--appointments", default=50000, show_default=True)
+@click.option("--seed", default=42, show_default=True, help="Semente do gerador aleatório.")
+def db_seed_command(professionals, services, clients, appointments, seed):
+    """Popula o banco com dados sintéticos (use um banco de testes)."""
+    from seed import seed_database
+
+    with db_connection() as conn:
+        if conn is None:
+            raise click.ClickException("Não foi possível conectar ao banco de dados.")
+        summary = seed_database(
+            conn,
+            slot_grid.slots,
+            professionals=professionals,
+            services=services,
+            clients=clients,
+            appointments=appointments,
+            seed=seed,
+            echo=click.echo,
         )
-        professionals = cursor.fetchall()
+    click.echo(f"Concluído em {summary['elapsed_s']}s.")
+
+
+@cli.command("db-import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk-size", type=int, show_default="IMPORT_CHUNK_SIZE",
+              help="Linhas gravadas por transação.")
+@click.option("--errors", "errors_path", type=click.Path(dir_okay=False),
+              help="Grava as linhas rejeitadas (linha, motivo) neste CSV.")
+def db_import_command(path, chunk_size, errors_path):
+    """Importa clientes e agendamentos de um arquivo CSV."""
+    snapshot = catalog.get(fresh=True)
+    with db_connection() as conn:
+        if conn is None or snapshot is None:
+            raise click.ClickException("Não foi possível conectar ao banco de dados.")
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            try:
+                report = importer.import_csv(
+                    conn, f, snapshot, slot_grid.slots,
+                    chunk_size=chunk_size or current_app.config["IMPORT_CHUNK_SIZE"],
+                    occupancy=occupancy,
+                )
+            except ValueError as e:
+                raise click.ClickException(str(e))
+
+    if errors_path:
+        with open(errors_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["line", "error"])
+            writer.writerows(report.errors)
+    else:
+        for line, message in report.errors:
+            click.echo(f"linha {line}: {message}")
+
+    summary = report.as_dict()
+    click.echo(
+        f"{summary['imported']} de {summary['rows']} linha(s) importada(s) "
+        f"{summary['clients_created']} cliente(s) novo(s), {summary['errors']} erro(s) "
+        f"em {summary['elapsed_s']}s ({summary['rows_per_s']} linhas/s)."
+    )
 
-        cursor.execute(
-            "SELECT id, name, description, active FROM services ORDER BY name"
+
+@cli.command("stats-rebuild")
+@click.option("--date-from", type=click.DateTime(["%Y-%m-%d"]), help="Data inicial (aaaa-mm-dd).")
+@click.option("--date-to", type=click.DateTime(["%Y-%m-%d"]), help="Data final (aaaa-mm-dd).")
+def stats_rebuild_command(date_from, date_to):
+    """Recalcula appointment_daily_stats a partir dos agendamentos (inclusive arquivados)."""
+    with db_connection() as conn:
+        if conn is None:
+            raise click.ClickException("Não foi possível conectar ao banco de dados.")
+        groups = daily_stats.rebuild(
+            conn,
+            date_from=date_from.date() if date_from else None,
+            date_to=date_to.date() if date_to else None,
         )
-        services = cursor.fetchall()
-
-        cursor.execute(
-            """
-            SELECT ps.professional_id,
-                   ps.service_id,
-                   p.name AS professional_name,
-                   s.name AS service_name
-            FROM professional_services ps
-            JOIN professionals p ON ps.professional_id = p.id
-            JOIN services s ON ps.service_id = s.id
-            ORDER BY p.name, s.name
-            """
+    click.echo(f"{groups} grupo(s) recalculado(s).")
+
+
+@cli.command("stats-verify")
+@click.option("--date-from", type=click.DateTime(["%Y-%m-%d"]), help="Data inicial (aaaa-mm-dd).")
+@click.option("--date-to", type=click.DateTime(["%Y-%m-%d"]), help="Data final (aaaa-mm-dd).")
+def stats_verify_command(date_from, date_to):
+    """Confere appointment_daily_stats com appointments; falha se divergirem."""
+    with db_connection() as conn:
+        if conn is None:
+            raise click.ClickException("Não foi possível conectar ao banco de dados.")
+        mismatches = daily_stats.verify(
+            conn,
+            date_from=date_from.date() if date_from else None,
+            date_to=date_to.date() if date_to else None,
+        )
+    for stat_date, professional_id, service_id, status, expected, stored in mismatches:
+        click.echo(
+            f"{stat_date} profissional={professional_id} serviço={service_id} "
+            f"{status}: esperado {expected}, gravado {stored}"
+        )
+    if mismatches:
+        click.echo(f"{len(mismatches)} grupo(s) divergente(s); rode `flask --app app stats-rebuild`.")
+        raise SystemExit(1)
+    click.echo("Estatísticas conferem com os agendamentos.")
+
+
+@cli.command("db-archive")
+@click.option("--days", type=int, show_default="ARCHIVE_RETENTION_DAYS",
+              help="Arquiva agendamentos com data anterior a hoje menos N dias.")
+@click.option("--cancelled-days", type=int, show_default="ARCHIVE_CANCELLED_DAYS",
+              help="Arquiva cancelados com data anterior a hoje menos N dias.")
+@click.option("--batch-size", type=int, show_default="ARCHIVE_BATCH_SIZE",
+              help="Linhas movidas por transação.")
+@click.option("--pause", default=0.0, show_default=True,
+              help="Segundos de pausa entre lotes.")
+def db_archive_command(days, cancelled_days, batch_size, pause):
+    """Move agendamentos antigos e cancelados para appointments_archive."""
+    import archive
+
+    config = current_app.config
+    days = config["ARCHIVE_RETENTION_DAYS"] if days is None else days
+    cancelled_days = config["ARCHIVE_CANCELLED_DAYS"] if cancelled_days is None else cancelled_days
+    today = datetime.now().date()
+    with db_connection() as conn:
+        if conn is None:
+            raise click.ClickException("Não foi possível conectar ao banco de dados.")
+        summary = archive.archive_appointments(
+            conn,
+            before=today - timedelta(days=days),
+            cancelled_before=today - timedelta(days=cancelled_days),
+            batch_size=batch_size or config["ARCHIVE_BATCH_SIZE"],
+            pause=pause,
+            progress=lambda moved: click.echo(f"{moved} linha(s) arquivada(s)..."),
         )
-        links = cursor.fetchall()
-    finally:
-        cursor.close()
-        conn.close()
+    seconds = summary["seconds"]
+    rate = summary["moved"] / seconds if seconds else 0.0
+    click.echo(
+        f"{summary['moved']} agendamento(s) arquivado(s) em {summary['batches']} lote(s), "
+        f"{seconds:.1f}s ({rate:.0f} linhas/s)."
+    )
 
-    return render_template(
-        "admin_services.html",
-        professionals=professionals,
-        services=services,
-        links=links,
+
+@cli.command("serve")
+@click.option("--bind", show_default="SERVE_BIND", help="Endereço host:porta.")
+@click.option("--workers", type=int, show_default="SERVE_WORKERS", help="Processos.")
+@click.option("--threads", type=click.IntRange(min=1),
+              help="Threads das páginas por processo (padrão: SERVE_THREADS, "
+                   "ou DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW).")
+@click.option("--graceful-timeout", type=int, show_default="SERVE_GRACEFUL_TIMEOUT",
+              help="Segundos para um processo antigo terminar as requisições em andamento.")
+@click.option("--warmup-days", type=int, show_default="SERVE_WARMUP_DAYS",
+              help="Dias de ocupação carregados antes de aceitar requisições (0 desativa).")
+@click.option("--no-warmup", is_flag=True, help="Não prepara os processos antes de atender.")
+def serve_command(bind, workers, threads, graceful_timeout, warmup_days, no_warmup):
+    """
+    Roda o servidor de produção (gunicorn + uvicorn) com processos pré-forkados.
+
+    Os avisos ao vivo de /api/horarios/stream valem por processo: cada
+    worker só avisa das gravações feitas nele, e o navegador busca os
+    horários de novo quando o stream fica SSE_HEARTBEAT_SECONDS sem mensagens.
+    """
+    try:
+        import server
+    except ImportError as e:
+        raise click.ClickException(f"{e}. Instale as dependências: pip install -r requirements.txt")
+
+    # Os workers herdam a instância (e a configuração) do processo principal no fork
+    config = current_app.config
+    if threads is not None:
+        config["SERVE_THREADS"] = threads
+    try:
+        serve_threads(config)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    if graceful_timeout is None:
+        graceful_timeout = config["SERVE_GRACEFUL_TIMEOUT"]
+    if no_warmup:
+        warmup_days = 0
+    elif warmup_days is None:
+        warmup_days = config["SERVE_WARMUP_DAYS"]
+    server.serve(
+        current_app._get_current_object(),
+        bind=bind or config["SERVE_BIND"],
+        workers=workers or config["SERVE_WORKERS"],
+        graceful_timeout=graceful_timeout,
+        warmup_days=warmup_days,
     )
 
 
+@cli.command("db-explain")
+def db_explain_command():
+    """Roda EXPLAIN nas consultas das rotas e falha se houver varredura completa."""
+    from explain_check import run_check
+
+    try:
+        ok = run_check(sys.modules[__name__], echo=click.echo)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    if not ok:
+        raise SystemExit(1)
+
+
+def create_app(config=None):
+    """
+    Cria uma instância da aplicação. A configuração parte das constantes
+    de CONFIG_KEYS, depois as variáveis AGENDA_* do ambiente e por fim
+    `config`, ex.: create_app({"DB_NAME": "agenda_teste", "TESTING": True}).
+    Pools, caches e o driver do MySQL só são criados no primeiro uso (Services).
+    """
+    application = Flask(__name__)
+    defaults = {key: getattr(sys.modules[__name__], key) for key in CONFIG_KEYS}
+    application.config.update(defaults)
+    application.config.update(from_env(defaults))
+    if config:
+        application.config.update(config)
+    application.secret_key = application.config["SECRET_KEY"]
+    application.extensions["agenda"] = Services(application.config)
+
+    application.register_blueprint(booking)
+    application.register_blueprint(api)
+    application.register_blueprint(admin)
+
+    application.before_request(start_timing)
+    application.after_request(add_server_timing)
+    application.teardown_request(finish_timing)
+    application.context_processor(inject_now)
+    application.add_template_global(cached_fragment)
+    before_render_template.connect(start_render_timing, application)
+    template_rendered.connect(stop_render_timing, application)
+
+    for command in cli.commands.values():
+        application.cli.add_command(command)
+    return application
+
+
+# Sem instância criada na importação: `flask --app app` encontra create_app
+# sozinho, e asgi.py, server.py e os benchmarks criam a sua.
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
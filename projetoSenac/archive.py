@@ -0,0 +1,94 @@
+"""
+Arquivamento de agendamentos antigos (tabela appointments_archive).
+
+`appointments` fica só com o que as rotas do dia a dia consultam: os
+agendamentos recentes e futuros. Os anteriores à janela de retenção, e os
+cancelados há mais tempo que a janela dos cancelados, são copiados para
+appointments_archive e apagados da tabela quente em lotes pequenos, cada
+um na sua transação, para que nenhum bloqueio dure mais que um lote.
+
+Listagem, exportação e estatísticas leem as duas tabelas
+(repository.list_appointments, repository.export_batches e daily_stats);
+os totais de appointment_daily_stats não mudam ao arquivar.
+"""
+import time
+
+ARCHIVE_COLUMNS = (
+    "id, client_id, professional_id, service_id, appointment_date, appointment_time, "
+    "duration_slots, status, notes, idempotency_key, created_at"
+)
+
+# Lote a mover: a ordem do índice evita percorrer a tabela, e FOR UPDATE
+# impede que um cancelamento altere a linha entre a cópia e a remoção.
+_CANDIDATES = {
+    "old": """
+        SELECT id FROM appointments
+        WHERE appointment_date < %s
+        ORDER BY appointment_date, appointment_time, id
+        LIMIT %s
+        FOR UPDATE
+    """,
+    "cancelled": """
+        SELECT id FROM appointments
+        WHERE status = 'cancelled' AND appointment_date < %s
+        ORDER BY status, appointment_date
+        LIMIT %s
+        FOR UPDATE
+    """,
+}
+
+
+def _move_batch(conn, kind, cutoff, batch_size):
+    """Move um lote em uma transação; retorna quantas linhas foram movidas."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(_CANDIDATES[kind], (cutoff, batch_size))
+        ids = [row[0] for row in cursor.fetchall()]
+        if ids:
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(
+                f"""
+                INSERT INTO appointments_archive ({ARCHIVE_COLUMNS})
+                SELECT {ARCHIVE_COLUMNS} FROM appointments WHERE id IN ({placeholders})
+                """,
+                ids,
+            )
+            cursor.execute(f"DELETE FROM appointments WHERE id IN ({placeholders})", ids)
+        conn.commit()
+        return len(ids)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def archive_appointments(conn, before, cancelled_before=None, batch_size=1000,
+                         pause=0.0, progress=None):
+    """
+    Move para appointments_archive os agendamentos com data anterior a
+    `before` e, se informado, os cancelados com data anterior a
+    `cancelled_before`. `pause` (segundos) entre lotes deixa espaço para
+    as transações das rotas; `progress(linhas_movidas)` é chamada a cada lote.
+    Retorna {"moved": ..., "batches": ..., "seconds": ...}.
+    """
+    started = time.perf_counter()
+    moved = batches = 0
+    passes = [("old", before)]
+    if cancelled_before is not None and cancelled_before > before:
+        passes.append(("cancelled", cancelled_before))
+
+    for kind, cutoff in passes:
+        while True:
+            count = _move_batch(conn, kind, cutoff, batch_size)
+            if count:
+                moved += count
+                batches += 1
+                if progress is not None:
+                    progress(moved)
+            if count < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+
+    return {"moved": moved, "batches": batches, "seconds": time.perf_counter() - started}
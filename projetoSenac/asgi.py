@@ -0,0 +1,322 @@
+"""
+Entrada ASGI da aplicação, para servidores assíncronos como o uvicorn:
+
+    uvicorn --factory asgi:create_application --workers 2
+
+As APIs JSON somente leitura (/api/horarios, /api/disponibilidade,
+/api/proximos e /api/servicos) são atendidas por rotas assíncronas: respostas que já estão
+no cache (índice de ocupação e catálogo), inclusive os 304 de requisições
+condicionais, saem direto do loop de eventos, e
+só as que precisam do banco ocupam uma thread de um executor limitado ao
+tamanho do pool. Assim, centenas de clientes consultando horários ficam
+aguardando no loop sem prender uma thread cada.
+Elas também passam pelo limite de requisições por IP (API_RATE_LIMIT).
+O stream SSE /api/horarios/stream também é atendido no loop: cada
+navegador conectado é uma tarefa à espera de eventos, não uma thread.
+
+As demais rotas (formulários, painel, exportação) continuam sendo as views
+do Flask, executadas em um segundo executor.
+
+Cada entrada (create_application) serve uma instância do Flask, com os
+serviços e a configuração dela, e cria os próprios executores.
+"""
+import asyncio
+import io
+import math
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qsl
+
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_etags, quote_etag
+
+import app as agenda
+
+
+def create_application(flask_app=None):
+    """Entrada ASGI de `flask_app` (por padrão, uma nova instância de agenda.create_app())."""
+    return AgendaASGI(flask_app if flask_app is not None else agenda.create_app())
+
+
+class AgendaASGI:
+    """Aplicação ASGI de uma instância do Flask, com executores próprios."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        # Serviços (pools, caches, limites) da aplicação servida
+        self.services = flask_app.extensions["agenda"]
+        config = flask_app.config
+        self.sse_heartbeat = config["SSE_HEARTBEAT_SECONDS"]
+        self.sse_max_seconds = config["SSE_MAX_SECONDS"]
+
+        # Threads que consultam o banco para as APIs: uma por conexão do pool,
+        # para que nenhuma fique parada esperando conexão livre.
+        self.api_threads = config["DB_POOL_SIZE"]
+        # Threads que executam as views do Flask (páginas, formulários, exportação):
+        # SERVE_THREADS, por padrão o pool inteiro (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW)
+        self.page_threads = agenda.serve_threads(config)
+
+        # Caminho -> (função que monta a resposta, Cache-Control)
+        self.api_routes = {
+            "/api/horarios": (agenda.horarios_payload, config["SLOTS_CACHE_CONTROL"]),
+            "/api/disponibilidade": (agenda.disponibilidade_payload, None),
+            "/api/proximos": (agenda.proximos_payload, None),
+            "/api/servicos": (agenda.servicos_payload, config["SERVICES_CACHE_CONTROL"]),
+        }
+
+        self.api_executor = ThreadPoolExecutor(
+            max_workers=self.api_threads, thread_name_prefix="asgi-api"
+        )
+        self.page_executor = ThreadPoolExecutor(
+            max_workers=self.page_threads, thread_name_prefix="asgi-page"
+        )
+
+    def _in_app(self, func, *args, **kwargs):
+        """Executa `func` em um contexto da aplicação, do qual dependem os atalhos de app.py."""
+        with self.flask_app.app_context():
+            return func(*args, **kwargs)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            route = self.api_routes.get(scope["path"])
+            if route is not None and scope["method"] in ("GET", "HEAD"):
+                await self._api(*route, scope, send)
+            elif scope["path"] == "/api/horarios/stream" and scope["method"] == "GET":
+                await self._slot_stream(scope, receive, send)
+            else:
+                await self._wsgi(scope, receive, send)
+        else:
+            raise NotImplementedError(f"Tipo de conexão não suportado: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.api_executor.shutdown(wait=False)
+                self.page_executor.shutdown(wait=False)
+                self.services.db_router.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _send_error(self, scope, send, status, message, retry_after=None):
+        """Resposta JSON {"error": ...}, como as das views."""
+        body = f"{self.flask_app.json.dumps({'error': message}, separators=(',', ':'))}\n".encode("utf-8")
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ]
+        if retry_after is not None:
+            headers.append((b"retry-after", str(math.ceil(retry_after)).encode("latin-1")))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+    async def _rate_limited(self, scope, send):
+        """Mesmo limite por IP das views (agenda.rate_limited); True se a requisição foi recusada."""
+        client = scope.get("client") or ("", 0)
+        retry_after = self.services.api_limiter.allow(client[0])
+        if retry_after:
+            await self._send_error(scope, send, 429, agenda.RATE_LIMITED_MESSAGE, retry_after)
+            return True
+        return False
+
+    async def _api(self, handler, cache_control, scope, send):
+        if await self._rate_limited(scope, send):
+            return
+
+        args = _args(scope)
+        result = self._in_app(handler, args, cached_only=True)
+        if result is None:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self.api_executor, partial(self._in_app, handler, args)
+            )
+        payload, etag = result
+
+        # Mesmos cabeçalhos e corpo de agenda.json_response()/jsonify()
+        headers = []
+        if_none_match = dict(scope["headers"]).get(b"if-none-match")
+        if etag is not None and if_none_match and parse_etags(
+            if_none_match.decode("latin-1")
+        ).contains_weak(etag):
+            status, body = 304, b""
+        else:
+            status = 200
+            body = f"{self.flask_app.json.dumps(payload, separators=(',', ':'))}\n".encode("utf-8")
+            headers.append((b"content-type", b"application/json"))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        if etag is not None:
+            headers.append((b"etag", quote_etag(etag).encode("latin-1")))
+        if cache_control:
+            headers.append((b"cache-control", cache_control.encode("latin-1")))
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({
+            "type": "http.response.body",
+            "body": b"" if scope["method"] == "HEAD" else body,
+        })
+
+    async def _slot_stream(self, scope, receive, send):
+        """
+        /api/horarios/stream (ver agenda.api_horarios_stream) no loop de
+        eventos: cada conexão aberta é só uma tarefa esperando o próximo
+        evento, sem ocupar uma thread.
+        """
+        if await self._rate_limited(scope, send):
+            return
+        key = agenda.slot_stream_key(_args(scope))
+        if key is None:
+            await self._send_error(scope, send, 400, "Informe professional_id e date (dd/mm/aaaa).")
+            return
+
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        latest = []
+
+        def deliver(event):
+            latest[:] = [event]
+            changed.set()
+
+        def push(event):
+            # Chamada pela thread que publicou o evento
+            try:
+                loop.call_soon_threadsafe(deliver, event)
+            except RuntimeError:
+                pass  # loop já encerrado
+
+        if not self.services.slot_events.subscribe(key, push):
+            await self._send_error(
+                scope, send, 503, "Muitas conexões abertas. Tente novamente mais tarde.",
+                self.sse_heartbeat,
+            )
+            return
+
+        disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+        try:
+            initial = await loop.run_in_executor(
+                self.api_executor, self._in_app, agenda.current_slot_state, key
+            )
+            await send({"type": "http.response.start", "status": 200, "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ]})
+            chunk = "retry: 3000\n\n"
+            if initial is not None:
+                chunk += agenda.sse_message(initial)
+            await send({"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True})
+
+            deadline = loop.time() + self.sse_max_seconds
+            while True:
+                timeout = min(self.sse_heartbeat, deadline - loop.time())
+                if timeout <= 0:
+                    break
+                waiter = asyncio.ensure_future(changed.wait())
+                done, _ = await asyncio.wait(
+                    {waiter, disconnected}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                waiter.cancel()
+                if disconnected in done:
+                    return
+                if changed.is_set():
+                    changed.clear()
+                    chunk = agenda.sse_message(latest.pop())
+                else:
+                    chunk = ": ping\n\n"
+                await send({"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            disconnected.cancel()
+            self.services.slot_events.unsubscribe(key, push)
+
+    async def _wsgi(self, scope, receive, send):
+        """Executa a view do Flask no executor de páginas, repassando a resposta em partes."""
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ]
+            return lambda data: None
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            self.page_executor, self.flask_app, _environ(scope, bytes(body)), start_response
+        )
+        try:
+            # Respostas em streaming (ex.: /admin/exportar) são lidas parte a parte
+            iterator = iter(result)
+            first = await loop.run_in_executor(self.page_executor, next, iterator, None)
+            await send({
+                "type": "http.response.start",
+                "status": started["status"],
+                "headers": started["headers"],
+            })
+            chunk = first
+            while chunk is not None:
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                chunk = await loop.run_in_executor(self.page_executor, next, iterator, None)
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            if hasattr(result, "close"):
+                await loop.run_in_executor(self.page_executor, result.close)
+
+
+def _args(scope):
+    return MultiDict(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True))
+
+
+async def _wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def _environ(scope, body):
+    """Monta o ambiente WSGI equivalente à requisição ASGI."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1")
+        value = value.decode("latin-1")
+        if name == "content-type":
+            key = "CONTENT_TYPE"
+        elif name == "content-length":
+            key = "CONTENT_LENGTH"
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
@@ -0,0 +1,175 @@
+"""
+Benchmark das APIs JSON: views síncronas do Flask x rotas assíncronas (asgi.py).
+
+Para cada nível de concorrência, N clientes simultâneos consultam
+/api/horarios, /api/disponibilidade e /api/servicos em sequência:
+
+- sync: as views do Flask rodam em um número fixo de threads (--sync-workers),
+  como em um servidor WSGI com threads; requisições excedentes esperam na fila.
+- async: a aplicação ASGI é chamada diretamente no loop de eventos.
+
+A latência inclui o tempo de espera na fila. Com --cold o índice de ocupação
+expira imediatamente, forçando uma consulta ao banco por requisição.
+
+    python benchmarks/bench_async.py --concurrency 50,200,500 --requests 5000
+"""
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from functools import partial
+
+from common import disable_rate_limit, latency_summary, write_results
+
+from flask import current_app
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+import app as agenda
+import asgi
+
+
+def build_urls(count, days, rng):
+    snapshot = agenda.catalog.get(fresh=True)
+    if snapshot is None:
+        raise SystemExit("Não foi possível conectar ao banco de dados.")
+    professionals = [p["id"] for p in snapshot.active_professionals]
+    if not professionals:
+        raise SystemExit("Nenhum profissional ativo cadastrado.")
+
+    urls = []
+    for _ in range(count):
+        pid = rng.choice(professionals)
+        day = (date.today() + timedelta(days=rng.randrange(days))).strftime("%d/%m/%Y")
+        kind = rng.random()
+        if kind < 0.6:
+            urls.append(("/api/horarios", f"date={day}&professional_id={pid}"))
+        elif kind < 0.8:
+            urls.append(("/api/disponibilidade", f"start={day}&end={day}&professional_id={pid}"))
+        else:
+            urls.append(("/api/servicos", f"professional_id={pid}"))
+    return urls
+
+
+def call_sync(flask_app, path, query):
+    environ = EnvironBuilder(path=path, query_string=query).get_environ()
+    app_iter, status, headers = run_wsgi_app(flask_app, environ, buffered=True)
+    return int(status.split(" ", 1)[0])
+
+
+async def call_async(asgi_app, path, query):
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": query.encode("latin-1"),
+        "headers": [],
+        "server": ("localhost", 80),
+        "client": ("127.0.0.1", 0),
+    }
+    status = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await asgi_app(scope, receive, send)
+    return status.get("code", 500)
+
+
+async def drive(urls, concurrency, request):
+    """Executa as requisições com `concurrency` clientes; retorna (latências, erros, duração)."""
+    queue = list(reversed(urls))
+    latencies = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        while queue:
+            path, query = queue.pop()
+            started = time.perf_counter()
+            try:
+                status = await request(path, query)
+            except Exception:
+                status = 500
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def run_mode(mode, urls, concurrency, sync_workers, asgi_app):
+    if mode == "sync":
+        workers = ThreadPoolExecutor(max_workers=sync_workers)
+
+        async def request(path, query):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(workers, call_sync, asgi_app.flask_app, path, query)
+    else:
+        workers = None
+        request = partial(call_async, asgi_app)
+
+    agenda.occupancy.clear()
+    try:
+        latencies, errors, elapsed = asyncio.run(drive(urls, concurrency, request))
+    finally:
+        if workers:
+            workers.shutdown()
+
+    result = {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": len(urls),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(len(urls) / elapsed, 1) if elapsed else 0.0,
+        "threads": sync_workers if mode == "sync" else asgi_app.api_threads,
+    }
+    result.update(latency_summary(latencies))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", default="10,50,200,500",
+                        help="níveis de concorrência separados por vírgula")
+    parser.add_argument("--requests", type=int, default=5000, help="requisições por nível")
+    parser.add_argument("--sync-workers", type=int, default=current_app.config["DB_POOL_SIZE"],
+                        help="threads do modo síncrono (workers WSGI)")
+    parser.add_argument("--days", type=int, default=14, help="datas consultadas a partir de hoje")
+    parser.add_argument("--cold", action="store_true", help="desativa o cache de ocupação")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    args = parser.parse_args()
+    disable_rate_limit(agenda)
+
+    if args.cold:
+        agenda.occupancy.ttl = 0
+
+    urls = build_urls(args.requests, args.days, random.Random(args.seed))
+    asgi_app = asgi.create_application(current_app._get_current_object())
+    results = []
+    for level in [int(c) for c in args.concurrency.split(",") if c.strip()]:
+        for mode in ("sync", "async"):
+            results.append(run_mode(mode, urls, level, args.sync_workers, asgi_app))
+
+    write_results("async_api", {
+        "cold": args.cold,
+        "pool_size": current_app.config["DB_POOL_SIZE"],
+        "runs": results,
+    }, args.json)
+
+
+if __name__ == "__main__":
+    with agenda.create_app().app_context():
+        main()
@@ -0,0 +1,195 @@
+"""
+Benchmark do fluxo de agendamento (POST /agendar) sob disputa.
+
+Vários clientes simultâneos tentam reservar os mesmos horários de um
+profissional em datas reservadas para o teste (ano 2099). Parte dos envios
+repete o formulário com a mesma chave de idempotência, simulando duplo clique.
+Envios recusados pelo controle de admissão (503, ver BOOKING_MAX_CONCURRENT)
+são contados em "rejected"; --gate-limit troca o limite de agendamentos
+simultâneos para comparar a vazão com limites diferentes.
+
+Requer o banco configurado em app.py com os dados de exemplo de db_schema.sql.
+
+    python benchmarks/bench_booking.py --threads 32 --attempts 2000
+"""
+import argparse
+import random
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+
+from common import latency_summary, write_results
+
+from flask import current_app
+
+import app as agenda
+import daily_stats
+from admission import ConcurrencyGate
+
+BENCH_START = date(2099, 1, 1)
+EMAIL_PATTERN = "bench-booking-%@example.com"
+
+
+def cleanup(professional_id, days):
+    with agenda.db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                DELETE FROM appointments
+                WHERE professional_id = %s
+                  AND appointment_date BETWEEN %s AND %s
+                """,
+                (professional_id, BENCH_START, BENCH_START + timedelta(days=days - 1)),
+            )
+            cursor.execute("DELETE FROM clients WHERE email LIKE %s", (EMAIL_PATTERN,))
+            conn.commit()
+        finally:
+            cursor.close()
+        daily_stats.rebuild(
+            conn,
+            date_from=BENCH_START,
+            date_to=BENCH_START + timedelta(days=days - 1),
+            professional_ids=[professional_id],
+        )
+
+
+def count_booked(professional_id, days):
+    with agenda.db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                SELECT COUNT(*), COUNT(DISTINCT appointment_date, appointment_time)
+                FROM appointments
+                WHERE professional_id = %s
+                  AND appointment_date BETWEEN %s AND %s
+                  AND status = 'scheduled'
+                """,
+                (professional_id, BENCH_START, BENCH_START + timedelta(days=days - 1)),
+            )
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=1000, help="total de envios")
+    parser.add_argument("--days", type=int, default=5, help="datas disputadas")
+    parser.add_argument("--professional-id", type=int, default=1)
+    parser.add_argument("--service-id", type=int, default=1)
+    parser.add_argument("--double-submit-rate", type=float, default=0.1)
+    parser.add_argument("--gate-limit", type=int,
+                        help="agendamentos simultâneos admitidos (padrão: BOOKING_MAX_CONCURRENT)")
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    args = parser.parse_args()
+
+    if args.gate_limit:
+        config = current_app.config
+        agenda.services().booking_gate = ConcurrencyGate(
+            args.gate_limit, config["BOOKING_QUEUE_SIZE"], config["BOOKING_QUEUE_TIMEOUT"]
+        )
+
+    cleanup(args.professional_id, args.days)
+
+    slots = [
+        ((BENCH_START + timedelta(days=d)).strftime("%d/%m/%Y"), t)
+        for d in range(args.days)
+        for t in agenda.slot_grid.slots
+    ]
+    per_thread = args.attempts // args.threads
+    lock = threading.Lock()
+    latencies = []
+    outcomes = {"booked": 0, "conflict": 0, "replayed": 0, "rejected": 0, "error": 0}
+    appointment_ids = set()
+
+    # As threads não herdam o contexto da aplicação
+    flask_app = current_app._get_current_object()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = flask_app.test_client()
+        local_latencies = []
+        local = {"booked": 0, "conflict": 0, "replayed": 0, "rejected": 0, "error": 0}
+        local_ids = []
+        n = 0
+        while n < per_thread:
+            date_str, time_str = rng.choice(slots)
+            form = {
+                "name": f"Cliente {seed}-{n}",
+                "email": f"bench-booking-{seed}-{n}@example.com",
+                "phone": "",
+                "date": date_str,
+                "time": time_str,
+                "professional_id": str(args.professional_id),
+                "service_id": str(args.service_id),
+                "idempotency_key": uuid.uuid4().hex,
+            }
+            submits = 2 if rng.random() < args.double_submit_rate else 1
+            first_id = None
+            for i in range(min(submits, per_thread - n)):
+                started = time.perf_counter()
+                response = client.post("/agendar", data=form)
+                local_latencies.append(time.perf_counter() - started)
+                n += 1
+                location = response.headers.get("Location", "")
+                if response.status_code == 503:
+                    local["rejected"] += 1
+                elif response.status_code != 302:
+                    local["error"] += 1
+                elif "/agendar/sucesso/" in location:
+                    appointment_id = int(location.rsplit("/", 1)[1])
+                    if first_id is None:
+                        # Primeiro envio aceito (o anterior pode ter sido recusado)
+                        first_id = appointment_id
+                        local["booked"] += 1
+                        local_ids.append(appointment_id)
+                    elif appointment_id == first_id:
+                        local["replayed"] += 1
+                    else:
+                        local["error"] += 1
+                else:
+                    local["conflict"] += 1
+        with lock:
+            latencies.extend(local_latencies)
+            for k, v in local.items():
+                outcomes[k] += v
+            appointment_ids.update(local_ids)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    rows, distinct_slots = count_booked(args.professional_id, args.days)
+    cleanup(args.professional_id, args.days)
+
+    write_results("booking", {
+        "threads": args.threads,
+        "contested_slots": len(slots),
+        "attempts": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "attempts_per_s": round(len(latencies) / elapsed, 1),
+        "bookings_per_s": round(outcomes["booked"] / elapsed, 1),
+        "outcomes": outcomes,
+        "latency": latency_summary(latencies),
+        "consistency": {
+            "rows_in_db": rows,
+            "distinct_slots_in_db": distinct_slots,
+            "reported_bookings": len(appointment_ids),
+            "ok": rows == distinct_slots == len(appointment_ids),
+        },
+        "pool": agenda.db_pool.stats(),
+        "admission": agenda.booking_gate.stats(),
+    }, args.json)
+
+
+if __name__ == "__main__":
+    with agenda.create_app().app_context():
+        main()
@@ -0,0 +1,73 @@
+"""
+Benchmark da exportação em streaming (/admin/exportar).
+
+Garante que o banco tenha pelo menos --rows agendamentos (completando com
+seed.py se necessário), exporta tudo em CSV ou NDJSON pelo cliente de
+testes do Flask e mede linhas/s e o pico de memória (RSS) do processo.
+
+    python benchmarks/bench_export.py --rows 1000000 --format csv
+"""
+import argparse
+import resource
+import time
+
+from common import ensure_appointments, write_results
+
+from flask import current_app
+
+import app as agenda
+
+
+def peak_rss_mb():
+    # ru_maxrss é informado em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    args = parser.parse_args()
+
+    ensure_appointments(agenda, args.rows)
+
+    client = current_app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = 1
+
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    first_byte = None
+    lines = 0
+    size = 0
+
+    response = client.get(f"/admin/exportar?format={args.format}", buffered=False)
+    for chunk in response.response:
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        lines += chunk.count(b"\n")
+        size += len(chunk)
+    response.close()
+
+    elapsed = time.perf_counter() - started
+    rows = lines - 1 if args.format == "csv" else lines
+
+    write_results("export", {
+        "format": args.format,
+        "rows": rows,
+        "bytes": size,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(rows / elapsed, 1) if elapsed else 0.0,
+        "time_to_first_chunk_ms": round((first_byte or 0) * 1000, 1),
+        "peak_rss_mb_before": round(rss_before, 1),
+        "peak_rss_mb_after": round(peak_rss_mb(), 1),
+        "batch_size": current_app.config["EXPORT_BATCH_SIZE"],
+    }, args.json)
+
+
+if __name__ == "__main__":
+    with agenda.create_app().app_context():
+        main()
@@ -0,0 +1,133 @@
+"""
+Micro-benchmarks das funções auxiliares de app.py e dos módulos de apoio.
+
+Mede o custo por chamada (em nanossegundos) de normalize_time, slot_label,
+dos cursores de paginação, da validação do formulário, das operações do
+índice de ocupação e da agenda compilada (schedule.py), inclusive os
+horários livres de um mês inteiro, com os tipos de valor que chegam do
+banco e dos formulários. Não precisa de banco de dados.
+
+    python benchmarks/bench_helpers.py --json helpers.json
+"""
+import argparse
+import timeit
+from datetime import date, datetime, time, timedelta
+
+from common import write_results
+
+import app as agenda
+from rows import AppointmentRow
+from schedule import Schedules
+from validation import validate_booking
+
+# Agenda de exemplo: seg-sex 08:00-12:00 e 14:00-18:00, sábado de manhã,
+# uma folga do profissional 3 e um feriado para todos
+WEEKLY_ROWS = [
+    (i, 3, weekday, start, end)
+    for i, (weekday, start, end) in enumerate(
+        [(d, "08:00", "12:00") for d in range(5)]
+        + [(d, "14:00", "18:00") for d in range(5)]
+        + [(5, "08:00", "12:00")]
+    )
+]
+EXCEPTION_ROWS = [
+    (1, 3, date(2024, 5, 20), None, None, "Folga"),
+    (2, 3, date(2024, 5, 21), "08:00", "10:00", "Consulta médica"),
+    (3, None, date(2024, 5, 30), None, None, "Corpus Christi"),
+]
+
+
+class _Snapshot:
+    def __init__(self):
+        self.schedules = Schedules(agenda.slot_grid, WEEKLY_ROWS, EXCEPTION_ROWS)
+
+    def offers(self, professional_id, service_id):
+        return True
+
+    def service_duration(self, service_id):
+        return 1
+
+
+def month_availability(schedules, occupied, length):
+    """Horários livres (bitmaps) de um profissional em cada dia de maio/2024."""
+    return [
+        schedules.free_starts(3, day, occupied.get(day, 0), length)
+        for day in MONTH
+    ]
+
+
+MONTH = [date(2024, 5, 1) + timedelta(days=d) for d in range(31)]
+
+
+def cases():
+    """Lista de (nome, função sem argumentos)."""
+    occupancy = agenda.services().occupancy
+    spans = [("08:00", 1), ("10:00", 1), ("15:00", 2)]
+    bitmap = occupancy.bitmap_from_spans(spans)
+    appointment = AppointmentRow(
+        123456, date(2024, 5, 17), time(14, 0), "scheduled", "Maria", "", "Carlos", "Treino",
+    )
+    cursor = agenda.encode_page_cursor(appointment)
+    form = {
+        "name": "Maria", "email": "maria@example.com", "phone": "11999999999",
+        "date": "17/05/2024", "time": "14:00", "professional_id": "3", "service_id": "2",
+    }
+    snapshot = _Snapshot()
+    slots = agenda.slot_grid.slots
+    schedules = snapshot.schedules
+    occupied = {day: bitmap for day in MONTH[::2]}
+
+    return [
+        ("normalize_time[time]", lambda: agenda.normalize_time(time(14, 0))),
+        ("normalize_time[timedelta]", lambda: agenda.normalize_time(timedelta(hours=14))),
+        ("normalize_time[datetime]", lambda: agenda.normalize_time(datetime(2024, 5, 17, 14, 0))),
+        ("normalize_time[str HH:MM:SS]", lambda: agenda.normalize_time("14:00:00")),
+        ("normalize_time[str HH:MM]", lambda: agenda.normalize_time("14:00")),
+        ("normalize_date[datetime]", lambda: agenda.normalize_date(datetime(2024, 5, 17))),
+        ("slot_label[timedelta]", lambda: agenda.slot_label(timedelta(hours=14))),
+        ("encode_page_cursor", lambda: agenda.encode_page_cursor(appointment)),
+        ("decode_page_cursor", lambda: agenda.decode_page_cursor(cursor)),
+        ("parse_id_list", lambda: agenda.parse_id_list(["1", "2,3", "x"])),
+        ("validate_booking", lambda: validate_booking(form, snapshot, slots)),
+        ("occupancy.bitmap_from_spans", lambda: occupancy.bitmap_from_spans(spans)),
+        ("slot_grid.span_mask[2 slots]", lambda: agenda.slot_grid.span_mask("14:00", 2)),
+        ("slot_grid.labels", lambda: agenda.slot_grid.labels(agenda.slot_grid.full_mask & ~bitmap)),
+        ("schedule.free_starts[1 slot]", lambda: schedules.free_starts(3, date(2024, 5, 17), bitmap)),
+        ("schedule.free_starts[3 slots]", lambda: schedules.free_starts(3, date(2024, 5, 17), bitmap, 3)),
+        ("schedule.fits", lambda: schedules.fits(3, date(2024, 5, 17), "14:00", 2)),
+        ("schedule.month_availability[1 slot]", lambda: month_availability(schedules, occupied, 1)),
+        ("schedule.month_availability[3 slots]", lambda: month_availability(schedules, occupied, 3)),
+    ]
+
+
+def measure(func, repeat, min_time):
+    """Melhor tempo por chamada (ns) entre `repeat` rodadas de pelo menos `min_time` s."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(number, int(number * min_time / 0.2))
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / number * 1e9, number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="duração mínima (s) de cada rodada")
+    parser.add_argument("--filter", help="mede só os casos cujo nome contém este texto")
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    args = parser.parse_args()
+
+    results = {}
+    for name, func in cases():
+        if args.filter and args.filter not in name:
+            continue
+        ns, number = measure(func, args.repeat, args.min_time)
+        results[name] = {"ns_per_call": round(ns, 1), "calls_per_round": number}
+
+    write_results("helpers", results, args.json)
+
+
+if __name__ == "__main__":
+    with agenda.create_app().app_context():
+        main()
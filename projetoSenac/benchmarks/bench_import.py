@@ -0,0 +1,81 @@
+"""
+Tempo de importação e de criação da aplicação (sem banco de dados).
+
+Cada rodada roda em um processo Python novo, para medir a importação a
+frio, e registra:
+
+- import_ms: `import app` (sem criar aplicação);
+- create_app_ms: cada instância criada com create_app(), como nos testes;
+- first_request_ms: primeira requisição a / pelo cliente de testes da última instância;
+- driver_loaded: se o driver do MySQL chegou a ser carregado (deve ser
+  False: ele só é carregado na primeira conexão).
+
+    python benchmarks/bench_import.py --runs 20 --json import.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from common import PROJECT_DIR, latency_summary, write_results
+
+# Executado em cada processo filho; imprime as medidas em JSON
+CHILD = """
+import json, sys
+from time import perf_counter
+
+started = perf_counter()
+import app
+imported = perf_counter()
+driver_loaded = "mysql.connector.errors" in sys.modules
+create = []
+for _ in range({apps}):
+    t = perf_counter()
+    flask_app = app.create_app()
+    create.append(perf_counter() - t)
+t = perf_counter()
+status = flask_app.test_client().get("/").status_code
+first = perf_counter() - t
+print(json.dumps({{
+    "import": imported - started,
+    "create_app": create,
+    "first_request": first,
+    "status": status,
+    "driver_loaded": driver_loaded or "mysql.connector.errors" in sys.modules,
+}}))
+"""
+
+
+def run_once(apps):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(apps=apps)],
+        cwd=PROJECT_DIR, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--apps", type=int, default=5, help="instâncias criadas por rodada")
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    args = parser.parse_args()
+    if args.apps < 1:
+        parser.error("--apps deve ser pelo menos 1")
+
+    runs = [run_once(args.apps) for _ in range(args.runs)]
+    statuses = {run["status"] for run in runs}
+    if statuses != {200}:
+        raise SystemExit(f"A página inicial respondeu {sorted(statuses)}.")
+
+    write_results("import", {
+        "runs": args.runs,
+        "import_ms": latency_summary([run["import"] for run in runs]),
+        "create_app_ms": latency_summary([s for run in runs for s in run["create_app"]]),
+        "first_request_ms": latency_summary([run["first_request"] for run in runs]),
+        "driver_loaded": any(run["driver_loaded"] for run in runs),
+    }, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark das consultas de repository.py com e sem instruções preparadas.
+
+Roda, em uma única conexão do pool, as consultas de /api/horarios
+(booked_slots) e a transação completa de POST /agendar (cliente,
+agendamento e estatística, desfeita com rollback), primeiro com cursores de
+texto (statement_cache_size=0) e depois com as instruções preparadas
+guardadas na conexão. Mede a latência por chamada de cada modo.
+
+    python benchmarks/bench_prepared.py --iterations 5000 --json prepared.json
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+from common import ensure_appointments, latency_summary, write_results
+
+from flask import current_app
+
+import app as agenda
+import repository
+
+# Datas reservadas para os agendamentos do teste (sempre desfeitos)
+BOOKING_START = date(2099, 9, 1)
+
+
+def horarios(conn, ctx, rng):
+    day = rng.choice(ctx["dates"])
+    repository.booked_slots(conn, day, rng.choice(ctx["professionals"]))
+
+
+def agendar(conn, ctx, rng):
+    professional_id, service_id = rng.choice(ctx["links"])
+    token = uuid.uuid4().hex[:12]
+    client_id = repository.upsert_client(
+        conn, f"Cliente {token}", f"bench-prepared-{token}@example.com", ""
+    )
+    day = BOOKING_START + timedelta(days=rng.randrange(30))
+    repository.insert_appointment(
+        conn, client_id, professional_id, service_id,
+        day, rng.choice(agenda.slot_grid.slots), uuid.uuid4().hex,
+    )
+    repository.record_booking(conn, day, professional_id, service_id)
+    conn.rollback()
+
+
+CASES = {"horarios": horarios, "agendar": agendar}
+
+
+def measure(func, ctx, iterations, cache_size, seed):
+    """Latências de `iterations` chamadas com o cache de instruções indicado."""
+    agenda.db_pool.dispose()
+    agenda.db_pool.statement_cache_size = cache_size
+    rng = random.Random(seed)
+    latencies = []
+    with agenda.db_connection() as conn:
+        if conn is None:
+            raise SystemExit("Não foi possível conectar ao banco de dados.")
+        for _ in range(min(100, iterations)):  # aquecimento
+            func(conn, ctx, rng)
+        for _ in range(iterations):
+            started = time.perf_counter()
+            func(conn, ctx, rng)
+            latencies.append(time.perf_counter() - started)
+        conn.invalidate()  # não reaproveita a conexão no próximo modo
+    summary = latency_summary(latencies)
+    summary["calls_per_s"] = round(len(latencies) / sum(latencies), 1) if latencies else 0.0
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=2000, help="chamadas por caso e modo")
+    parser.add_argument("--appointments", type=int, default=100000,
+                        help="agendamentos mínimos no banco (completa com seed.py)")
+    parser.add_argument("--cache-size", type=int, default=current_app.config["DB_STATEMENT_CACHE_SIZE"])
+    parser.add_argument("--days", type=int, default=30, help="datas consultadas a partir de hoje")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    args = parser.parse_args()
+
+    total = ensure_appointments(agenda, args.appointments, seed=args.seed)
+    snapshot = agenda.catalog.get(fresh=True)
+    if snapshot is None:
+        raise SystemExit("Não foi possível conectar ao banco de dados.")
+    active = {p["id"] for p in snapshot.active_professionals}
+    ctx = {
+        "professionals": sorted(active),
+        "links": sorted((pid, sid) for pid, sid in snapshot.links if pid in active),
+        "dates": [date.today() + timedelta(days=d) for d in range(args.days)],
+    }
+    if not ctx["links"]:
+        raise SystemExit("Nenhum profissional ativo com módulo vinculado.")
+
+    results = {"appointments_in_db": total, "iterations": args.iterations}
+    try:
+        for name, func in CASES.items():
+            text = measure(func, ctx, args.iterations, 0, args.seed)
+            prepared = measure(func, ctx, args.iterations, args.cache_size, args.seed)
+            results[name] = {
+                "text": text,
+                "prepared": prepared,
+                "p50_speedup": round(text["p50_ms"] / prepared["p50_ms"], 2)
+                if prepared["p50_ms"] else 0.0,
+            }
+    finally:
+        agenda.db_pool.statement_cache_size = current_app.config["DB_STATEMENT_CACHE_SIZE"]
+
+    write_results("prepared", results, args.json)
+
+
+if __name__ == "__main__":
+    with agenda.create_app().app_context():
+        main()
@@ -0,0 +1,126 @@
+"""
+Carga no primário com e sem réplicas de leitura.
+
+Roda a mesma mistura de bench_routes.py duas vezes: primeiro com todas as
+leituras no primário (DB_HOST) e depois com as réplicas informadas em
+--replica. Em cada fase, mede as consultas SELECT recebidas pelo primário
+(Com_select de SHOW GLOBAL STATUS), as leituras encaminhadas pelo
+db_router e p50/p95/p99 das requisições.
+
+As réplicas precisam estar replicando o banco do primário. Para testar
+localmente, bastam duas instâncias do MySQL na mesma máquina, com a segunda
+configurada como réplica da primeira (porta 3307, por exemplo):
+
+    python benchmarks/bench_replicas.py --replica localhost:3307 --mix browse --json replicas.json
+"""
+import argparse
+
+from common import disable_rate_limit, ensure_appointments, write_results
+
+from flask import current_app
+
+import app as agenda
+from bench_routes import MIXES, Context, cleanup, run
+from db import ReplicaRouter
+
+
+def parse_replica(value):
+    host, _, port = value.partition(":")
+    replica = {"host": host}
+    if port:
+        replica["port"] = int(port)
+    return replica
+
+
+def primary_selects():
+    with agenda.db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SHOW GLOBAL STATUS LIKE 'Com_select'")
+            return int(cursor.fetchone()[1])
+        finally:
+            cursor.close()
+
+
+def make_router(replicas):
+    services = agenda.services()
+    pools = [
+        services.make_pool(dict(
+            services.connect_args,
+            connection_timeout=current_app.config["DB_REPLICA_CONNECT_TIMEOUT"],
+            **replica,
+        ))
+        for replica in replicas
+    ]
+    return ReplicaRouter(services.db_pool, pools, retry_after=current_app.config["DB_REPLICA_RETRY_AFTER"])
+
+
+def phase(router, mix, ctx, args):
+    """Roda a mistura com `router` como agenda.db_router, partindo de caches vazios."""
+    agenda.services().db_router = router
+    agenda.occupancy.clear()
+    agenda.page_cache.clear()
+    before = primary_selects()
+    try:
+        overall, per_route = run(mix, ctx, args.threads, args.requests, args.duration, args.seed)
+    finally:
+        router_stats = router.stats()
+        replica_stats = router.replica_stats()
+        for pool in router.replicas:
+            pool.dispose()
+    selects = primary_selects() - before - 1  # desconta a própria leitura do contador
+    return {
+        "primary_selects": selects,
+        "primary_selects_per_request": round(selects / overall["count"], 3) if overall["count"] else 0.0,
+        "routing": router_stats,
+        "replicas": replica_stats,
+        "overall": overall,
+        "routes": per_route,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--replica", action="append", type=parse_replica, required=True,
+                        help="réplica no formato host[:porta] (pode repetir)")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="browse")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=10000, help="total de requisições por fase")
+    parser.add_argument("--duration", type=float, help="limita cada fase a N segundos")
+    parser.add_argument("--appointments", type=int, default=100000,
+                        help="agendamentos mínimos no banco (completa com seed.py)")
+    parser.add_argument("--browse-days", type=int, default=14,
+                        help="datas consultadas a partir de hoje")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    args = parser.parse_args()
+    disable_rate_limit(agenda)
+
+    total = ensure_appointments(agenda, args.appointments, seed=args.seed)
+    ctx = Context(args.browse_days)
+    configured = agenda.services().db_router
+    mix = MIXES[args.mix]
+
+    try:
+        primary_only = phase(ReplicaRouter(agenda.db_pool), mix, ctx, args)
+        with_replicas = phase(make_router(args.replica), mix, ctx, args)
+    finally:
+        agenda.services().db_router = configured
+        cleanup()
+
+    before = primary_only["primary_selects"]
+    after = with_replicas["primary_selects"]
+    write_results("replicas", {
+        "mix": args.mix,
+        "threads": args.threads,
+        "appointments_in_db": total,
+        "replicas": [f"{r['host']}:{r.get('port', 3306)}" for r in args.replica],
+        "primary_only": primary_only,
+        "with_replicas": with_replicas,
+        "primary_select_reduction": round(1 - after / before, 3) if before else 0.0,
+    }, args.json)
+
+
+if __name__ == "__main__":
+    with agenda.create_app().app_context():
+        main()
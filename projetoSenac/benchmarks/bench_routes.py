@@ -0,0 +1,285 @@
+"""
+Teste de carga por rota com misturas de tráfego realistas.
+
+Popula o banco com seed.py até --appointments agendamentos (se necessário)
+e dispara, com várias threads e o cliente de testes do Flask, uma mistura de
+requisições: consulta de horários, agendamento, listagem administrativa,
+relatórios etc. Mede vazão e p50/p95/p99 de cada rota.
+
+Misturas disponíveis (--mix): browse (clientes consultando horários),
+book (clientes agendando), admin (gestores no painel) e mixed (as três).
+Os agendamentos criados usam datas de 2099 e são removidos ao final.
+
+    python benchmarks/bench_routes.py --mix mixed --threads 16 --requests 20000 --json antes.json
+"""
+import argparse
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+
+from common import disable_rate_limit, ensure_appointments, latency_summary, write_results
+
+from flask import current_app
+
+import app as agenda
+import daily_stats
+
+BOOKING_START = date(2099, 6, 1)
+BOOKING_DAYS = 30
+EMAIL_PATTERN = "bench-routes-%@example.com"
+
+
+class Context:
+    """Ids e datas existentes no banco, usados para montar as requisições."""
+
+    def __init__(self, browse_days):
+        snapshot = agenda.catalog.get(fresh=True)
+        if snapshot is None:
+            raise SystemExit("Não foi possível conectar ao banco de dados.")
+        self.professionals = [p["id"] for p in snapshot.active_professionals]
+        self.links = sorted(
+            (pid, sid) for pid, sid in snapshot.links if pid in set(self.professionals)
+        )
+        if not self.links:
+            raise SystemExit("Nenhum profissional ativo com módulo vinculado.")
+        self.services = sorted({sid for _, sid in self.links})
+        self.browse_dates = [date.today() + timedelta(days=d) for d in range(browse_days)]
+        self.slots = agenda.slot_grid.slots
+
+        with agenda.db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT id FROM users ORDER BY id LIMIT 1")
+                self.user_id = cursor.fetchone()[0]
+            finally:
+                cursor.close()
+
+
+# Cada rota recebe (cliente, contexto, gerador aleatório) e devolve a resposta.
+
+def index(client, ctx, rng):
+    return client.get("/")
+
+
+def booking_form(client, ctx, rng):
+    return client.get("/agendar")
+
+
+def api_servicos(client, ctx, rng):
+    return client.get(f"/api/servicos?professional_id={rng.choice(ctx.professionals)}")
+
+
+def api_horarios(client, ctx, rng):
+    day = rng.choice(ctx.browse_dates).strftime("%d/%m/%Y")
+    return client.get(f"/api/horarios?date={day}&professional_id={rng.choice(ctx.professionals)}")
+
+
+def api_disponibilidade(client, ctx, rng):
+    start = rng.choice(ctx.browse_dates)
+    end = start + timedelta(days=6)
+    return client.get(
+        f"/api/disponibilidade?start={start:%d/%m/%Y}&end={end:%d/%m/%Y}"
+        f"&professional_id={rng.choice(ctx.professionals)}"
+    )
+
+
+def api_proximos(client, ctx, rng):
+    return client.get(f"/api/proximos?service_id={rng.choice(ctx.services)}&limit=5")
+
+
+def book(client, ctx, rng):
+    professional_id, service_id = rng.choice(ctx.links)
+    day = BOOKING_START + timedelta(days=rng.randrange(BOOKING_DAYS))
+    token = uuid.uuid4().hex[:12]
+    return client.post("/agendar", data={
+        "name": f"Cliente {token}",
+        "email": f"bench-routes-{token}@example.com",
+        "phone": "",
+        "date": day.strftime("%d/%m/%Y"),
+        "time": rng.choice(ctx.slots),
+        "professional_id": str(professional_id),
+        "service_id": str(service_id),
+        "idempotency_key": uuid.uuid4().hex,
+    })
+
+
+def admin_dashboard(client, ctx, rng):
+    return client.get("/admin/dashboard")
+
+
+def admin_listing(client, ctx, rng):
+    return client.get("/admin/agendamentos")
+
+
+def admin_listing_filtered(client, ctx, rng):
+    day = rng.choice(ctx.browse_dates)
+    return client.get(
+        f"/admin/agendamentos?professional_id={rng.choice(ctx.professionals)}"
+        f"&date_from={day.isoformat()}&date_to={(day + timedelta(days=7)).isoformat()}"
+    )
+
+
+def admin_listing_page(client, ctx, rng):
+    day = date.today() - timedelta(days=rng.randrange(1, 365))
+    return client.get(f"/admin/agendamentos?after={day.isoformat()}_23:59:59_999999999")
+
+
+def admin_reports(client, ctx, rng):
+    return client.get("/admin/relatorios")
+
+
+# Peso relativo de cada rota em cada mistura
+MIXES = {
+    "browse": {
+        index: 5, booking_form: 15, api_servicos: 20, api_horarios: 40, api_disponibilidade: 12,
+        api_proximos: 8,
+    },
+    "book": {
+        booking_form: 20, api_servicos: 15, api_horarios: 35, book: 30,
+    },
+    "admin": {
+        admin_dashboard: 30, admin_listing: 20, admin_listing_filtered: 25,
+        admin_listing_page: 15, admin_reports: 10,
+    },
+    "mixed": {
+        index: 2, booking_form: 10, api_servicos: 12, api_horarios: 32, api_disponibilidade: 9,
+        api_proximos: 4, book: 8, admin_dashboard: 8, admin_listing: 5, admin_listing_filtered: 5,
+        admin_listing_page: 3, admin_reports: 2,
+    },
+}
+
+
+def cleanup():
+    """Remove os agendamentos e clientes criados pela rota `book`."""
+    last_day = BOOKING_START + timedelta(days=BOOKING_DAYS - 1)
+    with agenda.db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                DELETE a FROM appointments a
+                JOIN clients c ON c.id = a.client_id
+                WHERE c.email LIKE %s
+                  AND a.appointment_date BETWEEN %s AND %s
+                """,
+                (EMAIL_PATTERN, BOOKING_START, last_day),
+            )
+            cursor.execute("DELETE FROM clients WHERE email LIKE %s", (EMAIL_PATTERN,))
+            conn.commit()
+        finally:
+            cursor.close()
+        daily_stats.rebuild(conn, date_from=BOOKING_START, date_to=last_day)
+
+
+def run(mix, ctx, threads, total_requests, duration, seed):
+    routes = list(mix)
+    weights = [mix[r] for r in routes]
+    lock = threading.Lock()
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    issued = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    def next_ticket():
+        nonlocal issued
+        with lock:
+            if total_requests and issued >= total_requests:
+                return False
+            issued += 1
+        return deadline is None or time.perf_counter() < deadline
+
+    # As threads não herdam o contexto da aplicação
+    flask_app = current_app._get_current_object()
+
+    def worker(worker_seed):
+        rng = random.Random(worker_seed)
+        client = flask_app.test_client()
+        with client.session_transaction() as session:
+            session["user_id"] = ctx.user_id
+        local_latencies = defaultdict(list)
+        local_statuses = defaultdict(lambda: defaultdict(int))
+        while next_ticket():
+            route = rng.choices(routes, weights)[0]
+            started = time.perf_counter()
+            response = route(client, ctx, rng)
+            response.get_data()
+            local_latencies[route.__name__].append(time.perf_counter() - started)
+            local_statuses[route.__name__][response.status_code] += 1
+        with lock:
+            for name, values in local_latencies.items():
+                latencies[name].extend(values)
+            for name, counts in local_statuses.items():
+                for status, n in counts.items():
+                    statuses[name][status] += n
+
+    workers = [threading.Thread(target=worker, args=(seed + i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    per_route = {}
+    for name in sorted(latencies):
+        summary = latency_summary(latencies[name])
+        summary["requests_per_s"] = round(len(latencies[name]) / elapsed, 1)
+        summary["status"] = dict(statuses[name])
+        per_route[name] = summary
+
+    all_latencies = [v for values in latencies.values() for v in values]
+    overall = latency_summary(all_latencies)
+    overall["requests_per_s"] = round(len(all_latencies) / elapsed, 1) if elapsed else 0.0
+    overall["elapsed_s"] = round(elapsed, 3)
+    return overall, per_route
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=10000, help="total de requisições")
+    parser.add_argument("--duration", type=float, help="limita a execução a N segundos")
+    parser.add_argument("--appointments", type=int, default=100000,
+                        help="agendamentos mínimos no banco (completa com seed.py)")
+    parser.add_argument("--professionals", type=int, default=50,
+                        help="profissionais criados se for preciso popular o banco")
+    parser.add_argument("--clients", type=int, default=10000,
+                        help="clientes criados se for preciso popular o banco")
+    parser.add_argument("--browse-days", type=int, default=14,
+                        help="datas consultadas a partir de hoje")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    args = parser.parse_args()
+    disable_rate_limit(agenda)
+
+    total = ensure_appointments(
+        agenda, args.appointments,
+        professionals=args.professionals, clients=args.clients, seed=args.seed,
+    )
+    ctx = Context(args.browse_days)
+    agenda.occupancy.clear()
+
+    try:
+        overall, per_route = run(
+            MIXES[args.mix], ctx, args.threads, args.requests, args.duration, args.seed,
+        )
+    finally:
+        cleanup()
+
+    write_results("routes", {
+        "mix": args.mix,
+        "threads": args.threads,
+        "appointments_in_db": total,
+        "professionals": len(ctx.professionals),
+        "overall": overall,
+        "routes": per_route,
+    }, args.json)
+
+
+if __name__ == "__main__":
+    with agenda.create_app().app_context():
+        main()
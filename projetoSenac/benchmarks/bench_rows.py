@@ -0,0 +1,118 @@
+"""
+Benchmark das listagens: linhas em dicionário + normalize_date/normalize_time
+(formato anterior) x registros AppointmentRow de rows.py.
+
+Gera N linhas sintéticas no formato entregue pelo conector (DATE como date,
+TIME como timedelta), converte-as nos dois formatos e renderiza o template
+de /admin/agendamentos com cada um. Mede tempo e memória alocada (pico do
+tracemalloc). Não precisa de banco de dados.
+
+    python benchmarks/bench_rows.py --rows 10000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from common import write_results
+
+from flask import current_app, render_template
+
+import app as agenda
+from rows import AppointmentRow
+
+COLUMNS = (
+    "id", "appointment_date", "appointment_time", "status",
+    "client_name", "phone", "professional_name", "service_name",
+)
+
+
+def synthetic_rows(count, seed):
+    rng = random.Random(seed)
+    slots = [timedelta(hours=int(s[:2]), minutes=int(s[3:])) for s in agenda.slot_grid.slots]
+    first = date(2024, 1, 1)
+    return [
+        (
+            i,
+            first + timedelta(days=rng.randrange(365)),
+            rng.choice(slots),
+            rng.choice(("scheduled", "cancelled")),
+            f"Cliente {i}",
+            f"11{i:09d}",
+            f"Profissional {i % 50}",
+            f"Serviço {i % 6}",
+        )
+        for i in range(count)
+    ]
+
+
+def as_dicts(rows):
+    """Formato anterior: dictionary=True + normalização por linha."""
+    result = [dict(zip(COLUMNS, row)) for row in rows]
+    for a in result:
+        a["appointment_date"] = agenda.normalize_date(a["appointment_date"])
+        a["appointment_time"] = agenda.normalize_time(a["appointment_time"])
+    return result
+
+
+def as_records(rows):
+    return [AppointmentRow(*row) for row in rows]
+
+
+def measure(func, repeat):
+    """(melhor tempo em ms, pico de memória alocada em KB)."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return round(best * 1000, 2), round(peak / 1024, 1)
+
+
+def render(appointments):
+    return render_template(
+        "admin_appointments.html",
+        appointments=appointments,
+        filters={},
+        next_cursor=None,
+        is_first_page=True,
+        professionals=[],
+        services=[],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows, args.seed)
+    dicts = as_dicts(rows)
+    records = as_records(rows)
+    results = {"rows": args.rows}
+
+    for name, func in (("dicts", lambda: as_dicts(rows)), ("records", lambda: as_records(rows))):
+        ms, kb = measure(func, args.repeat)
+        results[f"decode_{name}"] = {"best_ms": ms, "peak_alloc_kb": kb}
+
+    with current_app.test_request_context("/admin/agendamentos"):
+        render(records[:10])  # compila o template antes de medir
+        for name, data in (("dicts", dicts), ("records", records)):
+            ms, kb = measure(lambda: render(data), args.repeat)
+            results[f"render_{name}"] = {"best_ms": ms, "peak_alloc_kb": kb}
+
+    write_results("rows", results, args.json)
+
+
+if __name__ == "__main__":
+    with agenda.create_app().app_context():
+        main()
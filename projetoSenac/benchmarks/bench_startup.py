@@ -0,0 +1,163 @@
+"""
+Inicialização do servidor de produção (flask --app app serve).
+
+Em cada rodada, sobe o servidor em uma porta livre, com e sem a preparação
+dos workers (--no-warmup), e mede:
+
+- ready_ms: do início do processo até a primeira resposta de /api/servicos;
+- first_requests_max_ms: latência das primeiras consultas de horários e disponibilidade,
+  que sem a preparação ainda abrem conexões e vão ao banco;
+- reload: requisições feitas durante um SIGHUP (troca dos workers), com o
+  número de falhas (conexão recusada/interrompida ou 5xx) e a maior latência.
+
+    python benchmarks/bench_startup.py --workers 4 --runs 5 --json startup.json
+"""
+import argparse
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+
+from common import PROJECT_DIR, latency_summary, write_results
+
+from flask import current_app
+
+import app as agenda
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get(url, timeout=5.0):
+    """Status HTTP e segundos da requisição; status None se a conexão falhou."""
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        status = None
+    return status, time.perf_counter() - started
+
+
+def start_server(port, args, warmup):
+    command = [
+        sys.executable, "-m", "flask", "--app", "app", "serve",
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(args.workers),
+    ]
+    if not warmup:
+        command.append("--no-warmup")
+    return subprocess.Popen(
+        command, cwd=PROJECT_DIR,
+        stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+
+
+def wait_ready(base, started, deadline):
+    """Segundos até a primeira resposta (qualquer status abaixo de 500)."""
+    while time.perf_counter() < deadline:
+        status, _ = get(f"{base}/api/servicos", timeout=1.0)
+        if status is not None and status < 500:
+            return time.perf_counter() - started
+        time.sleep(0.01)
+    raise SystemExit("O servidor não respondeu a tempo.")
+
+
+def first_requests(base, urls):
+    return [get(base + url)[1] for url in urls]
+
+
+def reload_phase(base, process, seconds):
+    """Envia SIGHUP e faz requisições seguidas por `seconds` segundos."""
+    latencies = []
+    failures = 0
+    process.send_signal(signal.SIGHUP)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        status, elapsed = get(f"{base}/api/servicos")
+        latencies.append(elapsed)
+        if status is None or status >= 500:
+            failures += 1
+    return dict(latency_summary(latencies), failures=failures)
+
+
+def run_once(args, warmup, urls):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = start_server(port, args, warmup)
+    try:
+        ready = wait_ready(base, started, started + args.timeout)
+        first = first_requests(base, urls)
+        reload = reload_phase(base, process, args.reload_seconds) if args.reload_seconds else None
+    finally:
+        process.terminate()
+        process.wait(timeout=args.timeout)
+    return {"ready": ready, "first": first, "reload": reload}
+
+
+def summarize(runs):
+    ready = [run["ready"] for run in runs]
+    first = [max(run["first"]) for run in runs]
+    reloads = [run["reload"] for run in runs if run["reload"]]
+    data = {
+        "ready_ms": latency_summary(ready),
+        "first_requests_max_ms": latency_summary(first),
+    }
+    if reloads:
+        data["reload"] = {
+            "failures": sum(r["failures"] for r in reloads),
+            "requests": sum(r["count"] for r in reloads),
+            "max_ms": max(r["max_ms"] for r in reloads),
+        }
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=current_app.config["SERVE_WORKERS"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--reload-seconds", type=float, default=3.0,
+                        help="duração das requisições após o SIGHUP (0 desativa)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--verbose", action="store_true", help="mostra o log do gunicorn")
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    args = parser.parse_args()
+
+    snapshot = agenda.catalog.get(fresh=True)
+    if snapshot is None:
+        raise SystemExit("Não foi possível conectar ao banco de dados.")
+    if not snapshot.active_professionals:
+        raise SystemExit("Nenhum profissional ativo cadastrado.")
+    agenda.db_router.dispose()
+
+    professional_id = snapshot.active_professionals[0]["id"]
+    today = date.today()
+    end = today + timedelta(days=6)
+    urls = [
+        f"/api/horarios?date={today:%d/%m/%Y}&professional_id={professional_id}",
+        f"/api/disponibilidade?start={today:%d/%m/%Y}&end={end:%d/%m/%Y}"
+        f"&professional_id={professional_id}",
+    ]
+
+    results = {"workers": args.workers, "runs": args.runs}
+    for name, warmup in (("cold", False), ("warm", True)):
+        runs = [run_once(args, warmup, urls) for _ in range(args.runs)]
+        results[name] = summarize(runs)
+
+    write_results("startup", results, args.json)
+
+
+if __name__ == "__main__":
+    with agenda.create_app().app_context():
+        main()
@@ -0,0 +1,97 @@
+"""Funções de apoio compartilhadas pelos benchmarks."""
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+
+# Permite importar app.py e os demais módulos do projeto
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+
+def percentile(values, pct):
+    """Percentil (0-100) por interpolação linear; 0.0 para lista vazia."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def latency_summary(seconds):
+    """Resumo de latências em milissegundos."""
+    ms = [s * 1000 for s in seconds]
+    return {
+        "count": len(ms),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+    }
+
+
+def count_appointments(agenda):
+    with agenda.db_connection() as conn:
+        if conn is None:
+            raise SystemExit("Não foi possível conectar ao banco de dados.")
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*) FROM appointments")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+
+def ensure_appointments(agenda, rows, professionals=100, clients=None, seed=42):
+    """
+    Completa o banco com seed.py até haver pelo menos `rows` agendamentos.
+    Retorna o total existente ao final.
+    """
+    from seed import seed_database
+
+    existing = count_appointments(agenda)
+    if existing >= rows:
+        return existing
+    missing = rows - existing
+    print(f"Populando {missing} agendamentos...")
+    with agenda.db_connection() as conn:
+        summary = seed_database(
+            conn,
+            agenda.slot_grid.slots,
+            professionals=professionals,
+            clients=clients or max(1000, missing // 20),
+            appointments=missing,
+            seed=seed,
+        )
+    agenda.catalog.invalidate()
+    return existing + summary["appointments"]
+
+
+def disable_rate_limit(agenda):
+    """
+    Desativa o limite por IP das APIs: todas as requisições do benchmark
+    saem do mesmo endereço e seriam recusadas com 429.
+    """
+    from admission import RateLimiter
+
+    agenda.services().api_limiter = RateLimiter(0, 0)
+
+
+def write_results(name, results, path=None):
+    """Imprime os resultados e, se `path` for informado, grava em JSON."""
+    payload = {
+        "benchmark": name,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "results": results,
+    }
+    text = json.dumps(payload, indent=2, ensure_ascii=False, default=str)
+    print(text)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return payload
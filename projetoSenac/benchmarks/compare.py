@@ -0,0 +1,53 @@
+"""
+Compara dois resultados JSON do mesmo benchmark (por exemplo, antes e
+depois de uma mudança) e mostra a variação de cada métrica numérica.
+
+    python benchmarks/compare.py antes.json depois.json
+"""
+import argparse
+import json
+
+
+def flatten(value, prefix=""):
+    """{"a": {"b": 1}} -> {"a.b": 1}, mantendo apenas valores numéricos."""
+    items = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            items.update(flatten(item, f"{prefix}{key}."))
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            items.update(flatten(item, f"{prefix}{i}."))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        items[prefix.rstrip(".")] = value
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--filter", help="mostra só as métricas que contêm este texto (ex.: p99)")
+    args = parser.parse_args()
+
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+    if before.get("benchmark") != after.get("benchmark"):
+        raise SystemExit(
+            f"Benchmarks diferentes: {before.get('benchmark')} x {after.get('benchmark')}"
+        )
+
+    old = flatten(before["results"])
+    new = flatten(after["results"])
+    width = max((len(k) for k in old), default=10)
+    print(f"{'métrica':<{width}}  {'antes':>12}  {'depois':>12}  {'variação':>9}")
+    for key in sorted(set(old) & set(new)):
+        if args.filter and args.filter not in key:
+            continue
+        change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+        print(f"{key:<{width}}  {old[key]:>12}  {new[key]:>12}  {change:>+8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
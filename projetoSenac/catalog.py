@@ -0,0 +1,174 @@
+"""
+Cache em memória do catálogo: profissionais, serviços, seus vínculos e a
+agenda de atendimento de cada profissional (schedule.py).
+"""
+import logging
+import threading
+import time
+
+import repository
+from db import connector
+from schedule import WEEKDAYS, Schedules, format_minutes, to_minutes
+
+log = logging.getLogger(__name__)
+
+
+class CatalogSnapshot:
+    """Cópia imutável do catálogo lida do banco em um determinado `version`."""
+
+    def __init__(self, version, grid, professionals, services, links,
+                 schedules=(), exceptions=()):
+        self.version = version
+        # Listas completas (ProfessionalRow/ServiceRow, inclusive inativos),
+        # ordenadas por nome; `links` são pares (profissional, serviço)
+        self.professionals = professionals
+        self.services = services
+        self.links = set(links)
+
+        self.professionals_by_id = {p.id: p for p in professionals}
+        self.services_by_id = {s.id: s for s in services}
+
+        # Agendas compiladas (bitmaps sobre a grade `grid`)
+        self.schedules = Schedules(grid, schedules, exceptions)
+
+        # Projeções em dicionário, usadas diretamente nas respostas JSON
+        self.active_professionals = [
+            {"id": p.id, "name": p.name} for p in professionals if p.active
+        ]
+
+        self.services_by_professional = {}
+        self.professionals_by_service = {}
+        for s in services:
+            if not s.active:
+                continue
+            for p in professionals:
+                if (p.id, s.id) in self.links:
+                    self.services_by_professional.setdefault(p.id, []).append(
+                        {"id": s.id, "name": s.name, "duration_slots": s.duration_slots}
+                    )
+                    if p.active:
+                        self.professionals_by_service.setdefault(s.id, []).append(
+                            {"id": p.id, "name": p.name}
+                        )
+        for items in self.professionals_by_service.values():
+            items.sort(key=lambda p: p["name"])
+
+        # Vínculos com nomes, na ordem usada pela tela de administração
+        self.link_rows = sorted(
+            (
+                {
+                    "professional_id": pid,
+                    "service_id": sid,
+                    "professional_name": self.professionals_by_id[pid].name,
+                    "service_name": self.services_by_id[sid].name,
+                }
+                for pid, sid in self.links
+                if pid in self.professionals_by_id and sid in self.services_by_id
+            ),
+            key=lambda link: (link["professional_name"], link["service_name"]),
+        )
+
+        # Regras da agenda com nomes, para a tela de profissionais
+        names = {p.id: p.name for p in professionals}
+        self.schedule_rows = [
+            {
+                "id": schedule_id,
+                "professional_name": names.get(pid, "-"),
+                "weekday": WEEKDAYS[weekday],
+                "start": format_minutes(to_minutes(start)),
+                "end": format_minutes(to_minutes(end)),
+            }
+            for schedule_id, pid, weekday, start, end in schedules
+        ]
+        self.exception_rows = [
+            {
+                "id": exception_id,
+                "professional_name": names.get(pid, "-") if pid is not None else "Todos",
+                "date": day,
+                "start": format_minutes(to_minutes(start)) if start is not None else None,
+                "end": format_minutes(to_minutes(end)) if end is not None else None,
+                "description": description,
+            }
+            for exception_id, pid, day, start, end, description in exceptions
+        ]
+
+    def offers(self, professional_id, service_id):
+        """Indica se o profissional atende o serviço."""
+        return (professional_id, service_id) in self.links
+
+    def service_duration(self, service_id):
+        """Quantos slots consecutivos o serviço ocupa (1 se desconhecido)."""
+        service = self.services_by_id.get(service_id)
+        return service.duration_slots if service is not None else 1
+
+
+class Catalog:
+    """
+    Mantém um CatalogSnapshot carregado uma vez e recarregado quando o número
+    de versão (tabela catalog_version) muda. Cada processo confere a versão
+    no máximo a cada `check_interval` segundos; gravações no catálogo
+    (repository.create_professional etc.) incrementam a versão dentro da
+    própria transação. `grid` é a schedule.SlotGrid usada nas agendas.
+    """
+
+    def __init__(self, connection_factory, grid, check_interval=5.0):
+        self.connection_factory = connection_factory
+        self.grid = grid
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, fresh=False):
+        """
+        Retorna o snapshot atual, ou None se o banco estiver indisponível e
+        ainda não houver snapshot. Com fresh=True a versão é conferida agora.
+        """
+        snapshot = self._snapshot
+        if (
+            snapshot is not None
+            and not fresh
+            and time.monotonic() - self._checked_at < self.check_interval
+        ):
+            return snapshot
+
+        with self._lock:
+            # Outra thread pode ter acabado de recarregar
+            snapshot = self._snapshot
+            if (
+                snapshot is not None
+                and not fresh
+                and time.monotonic() - self._checked_at < self.check_interval
+            ):
+                return snapshot
+
+            with self.connection_factory() as conn:
+                if conn is None:
+                    return snapshot
+                try:
+                    version = repository.catalog_version(conn)
+                    if snapshot is None or snapshot.version != version:
+                        snapshot = CatalogSnapshot(
+                            version, self.grid, *repository.catalog_rows(conn)
+                        )
+                        self._snapshot = snapshot
+                except connector.Error as e:
+                    log.error("Erro ao carregar o catálogo: %s", e)
+                    return snapshot
+
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def peek(self):
+        """
+        Retorna o snapshot se ele ainda estiver dentro do intervalo de
+        conferência, sem acessar o banco; caso contrário, None.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+        return None
+
+    def invalidate(self):
+        """Força a conferência da versão na próxima leitura deste processo."""
+        self._checked_at = 0.0
@@ -0,0 +1,51 @@
+"""
+Configuração da aplicação a partir de variáveis de ambiente.
+
+Cada chave de app.CONFIG_KEYS pode ser definida por AGENDA_<CHAVE>, por
+exemplo:
+
+    AGENDA_DB_HOST=10.0.0.5 AGENDA_DB_PASSWORD=segredo AGENDA_DB_POOL_SIZE=10 \\
+    AGENDA_DB_REPLICAS='[{"host": "10.0.0.6"}]' flask --app app serve
+
+O texto é convertido para o tipo do valor padrão: número, booleano
+(1/0, true/false), JSON para listas e dicionários, ou texto puro.
+"""
+import json
+import os
+
+PREFIX = "AGENDA_"
+
+_TRUE = ("1", "true", "yes", "on", "sim")
+_FALSE = ("0", "false", "no", "off", "nao", "não")
+
+
+def parse_value(key, text, default):
+    """Converte `text` para o tipo de `default`; ValueError se não for possível."""
+    try:
+        if isinstance(default, bool):
+            lowered = text.strip().lower()
+            if lowered in _TRUE:
+                return True
+            if lowered in _FALSE:
+                return False
+            raise ValueError("use true ou false")
+        if isinstance(default, int):
+            return int(text)
+        if isinstance(default, float):
+            return float(text)
+        if isinstance(default, (list, dict)) or default is None:
+            return json.loads(text)
+        return text
+    except ValueError as e:
+        raise ValueError(f"Valor inválido em {PREFIX}{key}={text!r}: {e}") from None
+
+
+def from_env(defaults, environ=None):
+    """Valores de `defaults` definidos no ambiente, já convertidos."""
+    if environ is None:
+        environ = os.environ
+    return {
+        key: parse_value(key, environ[PREFIX + key], default)
+        for key, default in defaults.items()
+        if PREFIX + key in environ
+    }
@@ -0,0 +1,126 @@
+"""
+Estatísticas diárias de agendamentos (tabela appointment_daily_stats).
+
+A tabela guarda o total de agendamentos por (data, profissional, serviço,
+status) e é atualizada na mesma transação de cada agendamento ou
+cancelamento (repository.record_booking/record_cancellation), para que
+painel e relatórios não precisem varrer `appointments`. `rebuild` e
+`verify` recalculam/conferem a partir dela, somando os agendamentos de
+`appointments_archive` (arquivar não altera os totais; ver archive.py).
+"""
+
+
+# Soma `total` ao grupo; usado por repository.record_stat (dentro da
+# transação de cada agendamento/cancelamento) e pela importação em lote
+RECORD_SQL = """
+    INSERT INTO appointment_daily_stats
+        (stat_date, professional_id, service_id, status, total)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE total = total + VALUES(total)
+"""
+
+
+def record_many(cursor, deltas):
+    """
+    Aplica vários incrementos de uma vez.
+    `deltas` é um dicionário {(data, profissional, serviço, status): delta}.
+    """
+    rows = [(*key, delta) for key, delta in deltas.items() if delta]
+    if not rows:
+        return
+    cursor.executemany(RECORD_SQL, rows)
+
+
+def _range_filter(column, date_from, date_to, professional_ids=None):
+    conditions = []
+    params = []
+    if date_from:
+        conditions.append(f"{column} >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append(f"{column} <= %s")
+        params.append(date_to)
+    if professional_ids:
+        conditions.append(
+            "professional_id IN (" + ", ".join(["%s"] * len(professional_ids)) + ")"
+        )
+        params.extend(professional_ids)
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    return where, params
+
+
+def _counts_sql(where):
+    """Contagem por grupo nas duas tabelas, com o filtro aplicado em cada uma."""
+    return f"""
+        SELECT appointment_date, professional_id, service_id, status, COUNT(*)
+        FROM (
+            SELECT appointment_date, professional_id, service_id, status
+            FROM appointments {where}
+            UNION ALL
+            SELECT appointment_date, professional_id, service_id, status
+            FROM appointments_archive {where}
+        ) AS all_appointments
+        GROUP BY appointment_date, professional_id, service_id, status
+    """
+
+
+def rebuild(conn, date_from=None, date_to=None, professional_ids=None):
+    """
+    Recalcula as estatísticas do período (ou de tudo) a partir de
+    `appointments` e `appointments_archive`, em uma única transação. Retorna o número de grupos.
+    """
+    cursor = conn.cursor()
+    try:
+        where, params = _range_filter("stat_date", date_from, date_to, professional_ids)
+        cursor.execute(f"DELETE FROM appointment_daily_stats {where}", params)
+
+        where, params = _range_filter("appointment_date", date_from, date_to, professional_ids)
+        cursor.execute(
+            f"""
+            INSERT INTO appointment_daily_stats
+                (stat_date, professional_id, service_id, status, total)
+            {_counts_sql(where)}
+            """,
+            params * 2,
+        )
+        groups = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return groups
+
+
+def verify(conn, date_from=None, date_to=None):
+    """
+    Compara as estatísticas com a contagem real em `appointments` e
+    `appointments_archive`.
+    Retorna uma lista de (data, profissional, serviço, status, esperado, gravado)
+    para cada grupo divergente.
+    """
+    cursor = conn.cursor()
+    try:
+        where, params = _range_filter("appointment_date", date_from, date_to)
+        cursor.execute(_counts_sql(where), params * 2)
+        expected = {tuple(row[:4]): row[4] for row in cursor.fetchall()}
+
+        where, params = _range_filter("stat_date", date_from, date_to)
+        cursor.execute(
+            f"""
+            SELECT stat_date, professional_id, service_id, status, total
+            FROM appointment_daily_stats
+            {where}
+            """,
+            params,
+        )
+        stored = {tuple(row[:4]): row[4] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        if expected.get(key, 0) != stored.get(key, 0):
+            mismatches.append((*key, expected.get(key, 0), stored.get(key, 0)))
+    return mismatches
@@ -0,0 +1,550 @@
+"""Pool de conexões MySQL usado por todas as rotas da aplicação e roteamento de leituras para réplicas."""
+import importlib.util
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+
+def lazy_import(name):
+    """
+    Módulo carregado só no primeiro acesso a um atributo (importlib.util.LazyLoader).
+    Se já tiver sido importado, devolve o próprio módulo.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+# O driver (e a extensão em C) pesa mais que o resto da aplicação para
+# importar; ele só é carregado na primeira conexão ou no primeiro uso de
+# uma de suas exceções (connector.Error, connector.IntegrityError...).
+connector = lazy_import("mysql.connector")
+
+
+class PoolExhausted(Exception):
+    """Nenhuma conexão ficou livre dentro do tempo limite de espera."""
+
+
+class ObservedCursor:
+    """
+    Cursor que avisa os ouvintes do pool a cada comando executado,
+    com o SQL, os parâmetros e a duração (segundos).
+    """
+
+    def __init__(self, cursor, listeners):
+        self._cursor = cursor
+        self._listeners = listeners
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _notify(self, operation, params, elapsed):
+        for listener in self._listeners:
+            listener(operation, params, elapsed)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            self._notify(operation, params, time.perf_counter() - started)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            self._notify(operation, seq_params, time.perf_counter() - started)
+
+
+class PreparedCursor(ObservedCursor):
+    """
+    Cursor de uma instrução preparada no servidor, guardado na conexão do
+    pool e reaproveitado: close() apenas descarta as linhas não lidas e a
+    instrução continua preparada para a próxima chamada.
+    """
+
+    def __init__(self, cursor, sql, listeners):
+        super().__init__(cursor, listeners)
+        self._sql = sql
+
+    def execute(self, operation, params=None):
+        # O conector só reaproveita a instrução se receber o mesmo objeto str
+        if operation == self._sql:
+            operation = self._sql
+        return super().execute(operation, params)
+
+    def close(self):
+        if self._cursor.with_rows:
+            self._cursor.fetchall()
+
+
+class PooledConnection:
+    """
+    Envolve uma conexão do pool.
+    Chamar close() devolve a conexão ao pool em vez de encerrá-la.
+    """
+
+    def __init__(self, pool, raw, generation):
+        self._pool = pool
+        self._raw = raw
+        self._generation = generation
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self._checked_out = False
+        self._broken = False
+        # Texto SQL -> PreparedCursor, do menos para o mais recente
+        self._statements = OrderedDict()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._raw.cursor(*args, **kwargs)
+        if self._pool.listeners:
+            return ObservedCursor(cursor, self._pool.listeners)
+        return cursor
+
+    def prepared(self, sql):
+        """
+        Cursor com `sql` preparado no servidor (protocolo binário), guardado
+        nesta conexão para as próximas chamadas com o mesmo texto. Com o
+        cache desativado (statement_cache_size=0) devolve um cursor comum.
+        """
+        size = self._pool.statement_cache_size
+        if not size:
+            return self.cursor()
+
+        cursor = self._statements.get(sql)
+        if cursor is not None:
+            self._statements.move_to_end(sql)
+            self._pool._count("statement_cache_hits")
+            return cursor
+
+        cursor = PreparedCursor(self._raw.cursor(prepared=True), sql, self._pool.listeners)
+        self._statements[sql] = cursor
+        self._pool._count("statements_prepared")
+        if len(self._statements) > size:
+            # Libera no servidor a instrução usada há mais tempo
+            _, oldest = self._statements.popitem(last=False)
+            try:
+                oldest._cursor.close()
+            except connector.Error:
+                self._broken = True
+        return cursor
+
+    def invalidate(self):
+        """
+        Marca a conexão para ser descartada na devolução ao pool, por
+        exemplo quando uma leitura em streaming foi interrompida no meio.
+        """
+        self._broken = True
+
+    def close(self):
+        if self._checked_out:
+            self._pool.release(self)
+
+
+class ConnectionPool:
+    """
+    Pool de conexões com tamanho fixo, conexões extras (overflow),
+    tempo limite de espera, pre-ping e reciclagem de conexões antigas.
+
+    É seguro entre processos: se o processo for "forkado" (workers WSGI),
+    as conexões herdadas são descartadas e o pool recomeça do zero.
+    """
+
+    def __init__(self, connect_args, size=5, max_overflow=10, timeout=5.0,
+                 recycle=1800, pre_ping=True, ping_after=30.0, statement_cache_size=32):
+        self.connect_args = dict(connect_args)
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.ping_after = ping_after
+        # Instruções preparadas mantidas por conexão (0 desativa)
+        self.statement_cache_size = statement_cache_size
+        # Funções chamadas como listener(sql, params, segundos) a cada comando
+        self.listeners = []
+        # Funções chamadas como listener(segundos, conectou) a cada retirada
+        # de conexão; `conectou` indica se foi aberta uma conexão nova.
+        self.checkout_listeners = []
+
+        self._cond = threading.Condition(threading.Lock())
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._generation = getattr(self, "_generation", 0) + 1
+        self._idle = deque()
+        self._open = 0
+        self.counters = {
+            "checkouts": 0,
+            "checkout_wait_seconds": 0.0,
+            "waits": 0,
+            "exhausted": 0,
+            "connects": 0,
+            "connect_seconds": 0.0,
+            "connect_errors": 0,
+            "recycled": 0,
+            "ping_failures": 0,
+            "statements_prepared": 0,
+            "statement_cache_hits": 0,
+        }
+
+    def _count(self, name):
+        with self._cond:
+            self.counters[name] += 1
+
+    def _check_fork(self):
+        # Conexões herdadas do processo pai não podem ser compartilhadas:
+        # apenas esquecemos delas (sem fechar o socket do pai).
+        if self._pid != os.getpid():
+            with self._cond:
+                if self._pid != os.getpid():
+                    self._reset_state()
+
+    def _connect(self):
+        started = time.perf_counter()
+        try:
+            raw = connector.connect(**self.connect_args)
+        except connector.Error:
+            with self._cond:
+                self.counters["connect_errors"] += 1
+            raise
+        elapsed = time.perf_counter() - started
+        with self._cond:
+            self.counters["connects"] += 1
+            self.counters["connect_seconds"] += elapsed
+        return PooledConnection(self, raw, self._generation)
+
+    def _is_usable(self, conn):
+        now = time.monotonic()
+        if self.recycle and now - conn.created_at > self.recycle:
+            with self._cond:
+                self.counters["recycled"] += 1
+            return False
+        if self.pre_ping and now - conn.last_used > self.ping_after:
+            try:
+                conn._raw.ping(reconnect=False)
+            except connector.Error:
+                with self._cond:
+                    self.counters["ping_failures"] += 1
+                return False
+        return True
+
+    def _discard(self, conn):
+        try:
+            conn._raw.close()
+        except connector.Error:
+            pass
+
+    def acquire(self):
+        """Retira uma conexão do pool, esperando até `timeout` segundos."""
+        self._check_fork()
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        waited = False
+        connected = False
+
+        while True:
+            with self._cond:
+                conn = None
+                if self._idle:
+                    conn = self._idle.pop()
+                elif self._open < self.size + self.max_overflow:
+                    # Reserva a vaga antes de conectar fora do lock
+                    self._open += 1
+                else:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self.counters["exhausted"] += 1
+                        self.counters["checkout_wait_seconds"] += time.perf_counter() - started
+                        raise PoolExhausted(
+                            f"Pool esgotado ({self._open} conexões em uso)"
+                        )
+                    if not waited:
+                        waited = True
+                        self.counters["waits"] += 1
+                    self._cond.wait(remaining)
+                    continue
+
+            if conn is not None:
+                if self._is_usable(conn):
+                    break
+                self._discard(conn)
+                conn = None
+                with self._cond:
+                    self._open -= 1
+                continue
+
+            try:
+                conn = self._connect()
+            except connector.Error:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+            connected = True
+            break
+
+        conn._checked_out = True
+        elapsed = time.perf_counter() - started
+        with self._cond:
+            self.counters["checkouts"] += 1
+            self.counters["checkout_wait_seconds"] += elapsed
+        for listener in self.checkout_listeners:
+            listener(elapsed, connected)
+        return conn
+
+    def release(self, conn):
+        """Devolve a conexão ao pool, desfazendo transações pendentes."""
+        conn._checked_out = False
+        conn.last_used = time.monotonic()
+
+        keep = (
+            not conn._broken
+            and conn._generation == self._generation
+            and self._pid == os.getpid()
+        )
+        if keep:
+            try:
+                # Uma transação aberta (mesmo só de leitura) manteria um
+                # snapshot antigo para o próximo usuário da conexão.
+                if conn._raw.in_transaction:
+                    conn._raw.rollback()
+            except connector.Error:
+                keep = False
+
+        if not keep:
+            if conn._generation == self._generation:
+                self._discard(conn)
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+            return
+
+        with self._cond:
+            if len(self._idle) >= self.size:
+                # Conexão de overflow: fecha em vez de guardar
+                self._open -= 1
+                overflow = True
+            else:
+                self._idle.append(conn)
+                overflow = False
+            self._cond.notify()
+        if overflow:
+            self._discard(conn)
+
+    def fill(self, count):
+        """
+        Abre conexões até haver `count` ociosas (no máximo `size`), para que
+        as primeiras requisições não paguem a conexão. Retorna quantas abriu.
+        """
+        self._check_fork()
+        opened = 0
+        while True:
+            with self._cond:
+                if (
+                    len(self._idle) >= min(count, self.size)
+                    or self._open >= self.size + self.max_overflow
+                ):
+                    return opened
+                self._open += 1
+            try:
+                conn = self._connect()
+            except connector.Error:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append(conn)
+                self._cond.notify()
+            opened += 1
+
+    def after_fork(self):
+        """
+        Recomeça o pool no processo filho logo após o fork: esquece as
+        conexões herdadas (sem fechar os sockets do pai) e recria o lock,
+        que pode ter sido copiado enquanto outra thread o segurava.
+        """
+        self._cond = threading.Condition(threading.Lock())
+        self._reset_state()
+
+    def dispose(self):
+        """Fecha as conexões ociosas (ex.: antes de um fork ou no encerramento)."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """Contadores e estado atual do pool."""
+        self._check_fork()
+        with self._cond:
+            data = dict(self.counters)
+            data.update(
+                size=self.size,
+                max_overflow=self.max_overflow,
+                open=self._open,
+                idle=len(self._idle),
+                in_use=self._open - len(self._idle),
+            )
+        return data
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager que sempre devolve a conexão ao pool.
+        Entrega None se não for possível obter uma conexão,
+        mantendo o padrão `if conn is None` das rotas.
+        """
+        try:
+            conn = self.acquire()
+        except (connector.Error, PoolExhausted) as e:
+            log.error("Erro ao conectar ao MySQL: %s", e)
+            conn = None
+
+        try:
+            yield conn
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+class ReplicaRouter:
+    """
+    Distribui as leituras entre pools de réplicas em rodízio (round-robin).
+
+    Uma réplica que falha ao conectar fica fora do rodízio por
+    `retry_after` segundos e a leitura segue para a próxima; sem réplica
+    disponível (ou sem réplicas configuradas), a leitura vai para o pool
+    primário. Uma réplica com o pool esgotado só é pulada nesta leitura.
+    Gravações e leituras que precisam do que acabou de ser gravado usam o
+    primário diretamente.
+    """
+
+    def __init__(self, primary, replicas=(), retry_after=30.0):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.retry_after = retry_after
+        # As réplicas avisam os mesmos ouvintes do primário
+        for pool in self.replicas:
+            pool.listeners = primary.listeners
+            pool.checkout_listeners = primary.checkout_listeners
+        self._down_until = [0.0] * len(self.replicas)
+        self._next = 0
+        self._lock = threading.Lock()
+        self.counters = {"replica_reads": 0, "primary_reads": 0, "failovers": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _candidates(self):
+        """Réplicas disponíveis, a partir da próxima da vez no rodízio."""
+        now = time.monotonic()
+        count = len(self.replicas)
+        with self._lock:
+            available = [
+                index for index in (
+                    (self._next + offset) % count for offset in range(count)
+                )
+                if self._down_until[index] <= now
+            ]
+            if available:
+                # A vez de uma réplica fora do ar passa adiante, sem repetir a vizinha
+                self._next = (available[0] + 1) % count
+        return [(index, self.replicas[index]) for index in available]
+
+    def acquire_read(self):
+        """Retira uma conexão de leitura: de uma réplica, ou do primário como reserva."""
+        if self.replicas:
+            for index, pool in self._candidates():
+                try:
+                    conn = pool.acquire()
+                except PoolExhausted:
+                    self._count("failovers")
+                    continue
+                except connector.Error as e:
+                    log.warning("Réplica %s indisponível: %s", pool.connect_args.get("host"), e)
+                    self._down_until[index] = time.monotonic() + self.retry_after
+                    self._count("failovers")
+                    continue
+                self._count("replica_reads")
+                return conn
+        self._count("primary_reads")
+        return self.primary.acquire()
+
+    @contextmanager
+    def read_connection(self):
+        """Como ConnectionPool.connection(), mas para consultas só de leitura."""
+        try:
+            conn = self.acquire_read()
+        except (connector.Error, PoolExhausted) as e:
+            log.error("Erro ao conectar ao MySQL: %s", e)
+            conn = None
+
+        try:
+            yield conn
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def after_fork(self):
+        """Recomeça o primário, as réplicas e o rodízio no processo filho."""
+        self._lock = threading.Lock()
+        self._down_until = [0.0] * len(self.replicas)
+        self._next = 0
+        self.counters = dict.fromkeys(self.counters, 0)
+        self.primary.after_fork()
+        for pool in self.replicas:
+            pool.after_fork()
+
+    def dispose(self):
+        self.primary.dispose()
+        for pool in self.replicas:
+            pool.dispose()
+
+    def stats(self):
+        """Contadores de roteamento e situação de cada réplica."""
+        now = time.monotonic()
+        with self._lock:
+            data = dict(self.counters)
+        data.update(
+            replicas=len(self.replicas),
+            replicas_down=sum(1 for until in self._down_until if until > now),
+        )
+        return data
+
+    def replica_stats(self):
+        """Estado do pool de cada réplica, com o endereço e se está fora do rodízio."""
+        now = time.monotonic()
+        return [
+            dict(
+                pool.stats(),
+                host=pool.connect_args.get("host"),
+                port=pool.connect_args.get("port", 3306),
+                down=self._down_until[index] > now,
+            )
+            for index, pool in enumerate(self.replicas)
+        ]
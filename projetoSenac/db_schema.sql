@@ -6,8 +6,20 @@ CREATE DATABASE IF NOT EXISTS agenda_online
 
 USE agenda_online;
 
+-- Este script cria o esquema do zero. As tabelas são criadas sem
+-- IF NOT EXISTS de propósito: em um banco que já tem tabelas o script para
+-- no primeiro CREATE TABLE, antes de registrar as migrações abaixo como
+-- aplicadas. Bancos existentes são atualizados com `flask db-migrate`.
+
+-- Controle das migrações aplicadas (ver migrate.py e a pasta migrations/)
+CREATE TABLE schema_migrations (
+  version INT PRIMARY KEY,
+  name VARCHAR(100) NOT NULL,
+  applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Tabela de usuários (gestores / administradores do sistema)
-CREATE TABLE IF NOT EXISTS users (
+CREATE TABLE users (
   id INT AUTO_INCREMENT PRIMARY KEY,
   name VARCHAR(100) NOT NULL,
   email VARCHAR(100) NOT NULL UNIQUE,
@@ -22,7 +34,7 @@ VALUES ('Administrador', 'admin@agenda.com', 'admin123', 'admin')
 ON DUPLICATE KEY UPDATE name = VALUES(name);
 
 -- Tabela de profissionais (quem realiza os atendimentos)
-CREATE TABLE IF NOT EXISTS professionals (
+CREATE TABLE professionals (
   id INT AUTO_INCREMENT PRIMARY KEY,
   name VARCHAR(100) NOT NULL,
   email VARCHAR(100),
@@ -32,16 +44,18 @@ CREATE TABLE IF NOT EXISTS professionals (
 );
 
 -- Tabela de serviços / módulos
-CREATE TABLE IF NOT EXISTS services (
+CREATE TABLE services (
   id INT AUTO_INCREMENT PRIMARY KEY,
   name VARCHAR(100) NOT NULL,
   description VARCHAR(255),
+  -- Quantos horários consecutivos da grade o serviço ocupa
+  duration_slots TINYINT UNSIGNED NOT NULL DEFAULT 1,
   active TINYINT(1) NOT NULL DEFAULT 1,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Relação muitos-para-muitos entre profissionais e serviços
-CREATE TABLE IF NOT EXISTS professional_services (
+CREATE TABLE professional_services (
   professional_id INT NOT NULL,
   service_id INT NOT NULL,
   PRIMARY KEY (professional_id, service_id),
@@ -53,25 +67,71 @@ CREATE TABLE IF NOT EXISTS professional_services (
     ON DELETE CASCADE
 );
 
+-- Horários de atendimento por dia da semana (0 = segunda ... 6 = domingo).
+-- Profissionais sem nenhuma linha atendem em todos os horários da grade.
+CREATE TABLE professional_schedules (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  professional_id INT NOT NULL,
+  weekday TINYINT UNSIGNED NOT NULL,
+  start_time TIME NOT NULL,
+  end_time TIME NOT NULL,
+  CONSTRAINT fk_schedules_professional
+    FOREIGN KEY (professional_id) REFERENCES professionals(id)
+    ON DELETE CASCADE,
+  INDEX idx_schedules_professional_weekday (professional_id, weekday)
+);
+
+-- Datas sem atendimento: professional_id NULL vale para todos (feriado);
+-- start_time/end_time NULL bloqueiam o dia inteiro.
+CREATE TABLE schedule_exceptions (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  professional_id INT NULL,
+  exception_date DATE NOT NULL,
+  start_time TIME NULL,
+  end_time TIME NULL,
+  description VARCHAR(100),
+  CONSTRAINT fk_exceptions_professional
+    FOREIGN KEY (professional_id) REFERENCES professionals(id)
+    ON DELETE CASCADE,
+  INDEX idx_exceptions_date (exception_date)
+);
+
+-- Versão do catálogo (profissionais, serviços e vínculos).
+-- Incrementada a cada alteração para que todos os processos recarreguem o cache.
+CREATE TABLE catalog_version (
+  id TINYINT PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO catalog_version (id, version) VALUES (1, 0);
+
 -- Tabela de clientes
-CREATE TABLE IF NOT EXISTS clients (
+CREATE TABLE clients (
   id INT AUTO_INCREMENT PRIMARY KEY,
   name VARCHAR(100) NOT NULL,
   email VARCHAR(100),
   phone VARCHAR(20),
-  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  -- Clientes sem e-mail ficam com NULL (não conflitam entre si)
+  CONSTRAINT uc_client_email UNIQUE (email)
 );
 
 -- Tabela de agendamentos
-CREATE TABLE IF NOT EXISTS appointments (
+CREATE TABLE appointments (
   id INT AUTO_INCREMENT PRIMARY KEY,
   client_id INT NOT NULL,
   professional_id INT NOT NULL,
   service_id INT NOT NULL,
   appointment_date DATE NOT NULL,
   appointment_time TIME NOT NULL,
+  -- Horários consecutivos ocupados (cópia de services.duration_slots)
+  duration_slots TINYINT UNSIGNED NOT NULL DEFAULT 1,
   status ENUM('scheduled', 'cancelled') NOT NULL DEFAULT 'scheduled',
+  -- NULL nos cancelados: uc_appointment só vale para agendamentos ativos
+  active_slot TINYINT GENERATED ALWAYS AS (IF(status = 'cancelled', NULL, 1)) VIRTUAL,
   notes VARCHAR(255),
+  -- Chave enviada pelo formulário para ignorar envios repetidos
+  idempotency_key VARCHAR(64),
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   CONSTRAINT fk_appointments_client
     FOREIGN KEY (client_id) REFERENCES clients(id)
@@ -82,9 +142,66 @@ CREATE TABLE IF NOT EXISTS appointments (
   CONSTRAINT fk_appointments_service
     FOREIGN KEY (service_id) REFERENCES services(id)
     ON DELETE RESTRICT,
-  CONSTRAINT uc_appointment UNIQUE (appointment_date, appointment_time, professional_id)
+  CONSTRAINT uc_appointment UNIQUE (appointment_date, appointment_time, professional_id, active_slot),
+  CONSTRAINT uc_appointment_idempotency UNIQUE (idempotency_key),
+  INDEX idx_appointments_professional_date_status (professional_id, appointment_date, status),
+  INDEX idx_appointments_status_date (status, appointment_date),
+  INDEX idx_appointments_date_time_id (appointment_date, appointment_time, id),
+  INDEX idx_appointments_professional_date_time (professional_id, appointment_date, appointment_time)
 );
 
+-- Agendamentos antigos movidos pelo `flask db-archive` (archive.py)
+CREATE TABLE appointments_archive (
+  id INT PRIMARY KEY,
+  client_id INT NOT NULL,
+  professional_id INT NOT NULL,
+  service_id INT NOT NULL,
+  appointment_date DATE NOT NULL,
+  appointment_time TIME NOT NULL,
+  duration_slots TINYINT UNSIGNED NOT NULL DEFAULT 1,
+  status ENUM('scheduled', 'cancelled') NOT NULL DEFAULT 'scheduled',
+  notes VARCHAR(255),
+  idempotency_key VARCHAR(64),
+  created_at TIMESTAMP NULL DEFAULT NULL,
+  archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  CONSTRAINT fk_appointments_archive_client
+    FOREIGN KEY (client_id) REFERENCES clients(id)
+    ON DELETE CASCADE,
+  CONSTRAINT fk_appointments_archive_professional
+    FOREIGN KEY (professional_id) REFERENCES professionals(id)
+    ON DELETE CASCADE,
+  CONSTRAINT fk_appointments_archive_service
+    FOREIGN KEY (service_id) REFERENCES services(id)
+    ON DELETE RESTRICT,
+  -- Mesma ordem da listagem e da exportação (appointment_date, appointment_time, id)
+  INDEX idx_archive_date_time_id (appointment_date, appointment_time, id),
+  INDEX idx_archive_professional_date_time (professional_id, appointment_date, appointment_time),
+  INDEX idx_archive_status_date (status, appointment_date)
+);
+
+-- Totais diários para painel e relatórios (ver daily_stats.py)
+CREATE TABLE appointment_daily_stats (
+  stat_date DATE NOT NULL,
+  professional_id INT NOT NULL,
+  service_id INT NOT NULL,
+  status ENUM('scheduled', 'cancelled') NOT NULL,
+  total INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (stat_date, professional_id, service_id, status),
+  INDEX idx_daily_stats_status_date (status, stat_date, total)
+);
+
+-- O esquema acima já inclui todas as migrações (só chega aqui em um banco
+-- novo, ver o início do arquivo)
+INSERT INTO schema_migrations (version, name) VALUES
+  (1, 'booking_constraints'),
+  (2, 'catalog_version'),
+  (3, 'hot_path_indexes'),
+  (4, 'listing_keyset_indexes'),
+  (5, 'appointment_daily_stats'),
+  (6, 'professional_schedules'),
+  (7, 'appointments_archive'),
+  (8, 'active_slot_unique');
+
 -- Dados de exemplo (profissionais)
 INSERT INTO professionals (name, email, phone) VALUES
   ('Carlos Silva - Personal Trainer', 'carlos@agenda.com', '11999990001'),
@@ -0,0 +1,236 @@
+"""
+Verificação de planos de execução das consultas da aplicação.
+
+Percorre as rotas de app.py com o cliente de testes do Flask sobre um banco
+local populado (ver seed.py), registra cada comando SQL executado (as
+consultas de repository.py, preparadas ou não) e roda EXPLAIN em cada um.
+Acusa falha quando alguma consulta faz varredura completa (type = ALL) de
+uma das tabelas grandes.
+
+As rotas gravam de verdade (um cliente e um agendamento de teste, depois
+apagados), então a verificação só roda em um banco dedicado, indicado em
+EXPLAIN_CHECK_DB e igual ao DB_NAME da aplicação.
+"""
+import uuid
+from datetime import date
+
+from flask import current_app
+
+import daily_stats
+
+# Tabelas que crescem com o uso; as demais (catálogo, usuários) são pequenas
+LARGE_TABLES = {"appointments", "appointments_archive", "clients", "appointment_daily_stats"}
+
+# Data usada pelo agendamento de teste (removido ao final)
+CHECK_DATE = date(2099, 12, 31)
+
+# Abaixo disso o otimizador prefere varrer a tabela e o resultado não vale
+MIN_APPOINTMENTS = 1000
+
+
+def _sample(conn):
+    """Escolhe ids e datas existentes para montar as requisições."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM appointments")
+        total = cursor.fetchone()[0]
+        cursor.execute(
+            """
+            SELECT ps.professional_id, ps.service_id
+            FROM professional_services ps
+            JOIN professionals p ON p.id = ps.professional_id
+            WHERE p.active = 1
+            LIMIT 1
+            """
+        )
+        professional_id, service_id = cursor.fetchone()
+        cursor.execute(
+            """
+            SELECT appointment_date
+            FROM appointments
+            WHERE professional_id = %s
+            ORDER BY appointment_date DESC
+            LIMIT 1
+            """,
+            (professional_id,),
+        )
+        row = cursor.fetchone()
+        busy_date = row[0] if row else date.today()
+        cursor.execute("SELECT id FROM users ORDER BY id LIMIT 1")
+        user_id = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    return {
+        "total": total,
+        "professional_id": professional_id,
+        "service_id": service_id,
+        "busy_date": busy_date,
+        "user_id": user_id,
+    }
+
+
+def collect_statements(agenda, sample):
+    """
+    Executa as rotas na aplicação atual (comando db-explain) e devolve a
+    lista de (sql, params) executados.
+    """
+    recorded = []
+
+    def listener(sql, params, elapsed):
+        recorded.append((sql, params))
+
+    pid = sample["professional_id"]
+    sid = sample["service_id"]
+    busy = sample["busy_date"].strftime("%d/%m/%Y")
+    client = current_app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = sample["user_id"]
+
+    agenda.occupancy.clear()
+    agenda.db_pool.listeners.append(listener)
+    try:
+        agenda.catalog.get(fresh=True)
+        client.get("/agendar")
+        client.get(f"/api/servicos?professional_id={pid}")
+        client.get(f"/api/horarios?date={busy}&professional_id={pid}")
+        agenda.occupancy.clear()
+        client.get(f"/api/disponibilidade?start={busy}&end={busy}&professional_id={pid}")
+        agenda.occupancy.clear()
+        client.get(f"/api/proximos?service_id={sid}&start={busy}")
+
+        # Agendamento em uma data reservada para a verificação
+        response = client.post("/agendar", data={
+            "name": "Verificação EXPLAIN",
+            "email": f"explain-{uuid.uuid4().hex[:8]}@example.com",
+            "phone": "",
+            "date": CHECK_DATE.strftime("%d/%m/%Y"),
+            "time": agenda.slot_grid.slots[0],
+            "professional_id": str(pid),
+            "service_id": str(sid),
+            "idempotency_key": uuid.uuid4().hex,
+        })
+        location = response.headers.get("Location", "")
+        appointment_id = None
+        if "/agendar/sucesso/" in location:
+            appointment_id = int(location.rsplit("/", 1)[1])
+            client.get(f"/agendar/sucesso/{appointment_id}")
+
+        client.post("/admin/login", data={"email": "explain@example.com", "password": "x"})
+        with client.session_transaction() as session:
+            session["user_id"] = sample["user_id"]
+        client.get("/admin/dashboard")
+        client.get("/admin/agendamentos")
+        client.get(f"/admin/agendamentos?date={sample['busy_date'].isoformat()}")
+        page_cursor = f"{sample['busy_date'].isoformat()}_23:59:59_999999999"
+        client.get(f"/admin/agendamentos?after={page_cursor}")
+        client.get(f"/admin/agendamentos?professional_id={pid}&after={page_cursor}")
+        busy_iso = sample["busy_date"].isoformat()
+        client.get(f"/admin/exportar?date_from={busy_iso}&date_to={busy_iso}").get_data()
+        client.get("/admin/relatorios")
+        client.get("/admin/profissionais")
+        client.get("/admin/servicos")
+        if appointment_id:
+            client.post(f"/admin/agendamentos/{appointment_id}/cancelar")
+    finally:
+        agenda.db_pool.listeners.remove(listener)
+
+    return recorded, appointment_id
+
+
+def explain(conn, statements):
+    """
+    Roda EXPLAIN em cada SELECT/UPDATE/DELETE distinto.
+    Retorna uma lista de (sql, linhas do EXPLAIN, problemas).
+    """
+    seen = set()
+    results = []
+    cursor = conn.cursor(dictionary=True)
+    try:
+        for sql, params in statements:
+            normalized = " ".join(sql.split())
+            verb = normalized.split(" ", 1)[0].upper()
+            if verb not in ("SELECT", "UPDATE", "DELETE") or normalized in seen:
+                continue
+            if isinstance(params, list) and params and isinstance(params[0], (tuple, list)):
+                continue  # executemany
+            seen.add(normalized)
+
+            cursor.execute("EXPLAIN " + sql, params or None)
+            plan = cursor.fetchall()
+            problems = [
+                f"varredura completa em {row['table']} (~{row['rows']} linhas)"
+                for row in plan
+                if row.get("type") == "ALL" and row.get("table") in LARGE_TABLES
+            ]
+            results.append((normalized, plan, problems))
+        conn.rollback()
+    finally:
+        cursor.close()
+    return results
+
+
+def check_database(config, default_name):
+    """Confere se a aplicação aponta para o banco dedicado; RuntimeError se não."""
+    check_db = config["EXPLAIN_CHECK_DB"]
+    if not check_db:
+        raise RuntimeError(
+            "Defina EXPLAIN_CHECK_DB (ex.: AGENDA_EXPLAIN_CHECK_DB=agenda_teste) "
+            "com um banco só para a verificação: ela grava e apaga agendamentos."
+        )
+    if check_db == default_name:
+        raise RuntimeError(f"EXPLAIN_CHECK_DB não pode ser o banco padrão ({default_name}).")
+    if config["DB_NAME"] != check_db:
+        raise RuntimeError(
+            f"DB_NAME ({config['DB_NAME']}) não é o banco de verificação ({check_db}); "
+            f"use AGENDA_DB_NAME={check_db}."
+        )
+
+
+def run_check(agenda, echo=print):
+    """Executa a verificação completa. Retorna True se nenhuma consulta falhou."""
+    check_database(current_app.config, agenda.DB_NAME)
+    with agenda.db_connection() as conn:
+        if conn is None:
+            raise RuntimeError("Não foi possível conectar ao banco de dados.")
+        sample = _sample(conn)
+
+    if sample["total"] < MIN_APPOINTMENTS:
+        echo(
+            f"Aviso: apenas {sample['total']} agendamentos no banco; "
+            "popule-o com `flask --app app db-seed` para um resultado confiável."
+        )
+
+    statements, appointment_id = collect_statements(agenda, sample)
+
+    with agenda.db_connection() as conn:
+        results = explain(conn, statements)
+        if appointment_id:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "SELECT client_id FROM appointments WHERE id = %s", (appointment_id,)
+                )
+                row = cursor.fetchone()
+                cursor.execute("DELETE FROM appointments WHERE id = %s", (appointment_id,))
+                if row:
+                    cursor.execute("DELETE FROM clients WHERE id = %s", (row[0],))
+                conn.commit()
+            finally:
+                cursor.close()
+            daily_stats.rebuild(conn, date_from=CHECK_DATE, date_to=CHECK_DATE)
+
+    failures = 0
+    for sql, plan, problems in results:
+        status = "FALHA" if problems else "ok"
+        echo(f"[{status}] {sql[:110]}")
+        for row in plan:
+            echo(
+                f"    {row.get('table')}: type={row.get('type')} "
+                f"key={row.get('key')} rows={row.get('rows')}"
+            )
+        for problem in problems:
+            echo(f"    -> {problem}")
+        failures += bool(problems)
+
+    echo(f"{len(results)} consultas verificadas, {failures} com varredura completa.")
+    return failures == 0
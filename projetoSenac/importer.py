@@ -0,0 +1,319 @@
+"""
+Importação em lote de clientes e agendamentos a partir de um CSV.
+
+O arquivo é lido em streaming e processado em blocos: cada bloco é gravado
+em uma transação própria, com inserções em lote (`executemany`). As linhas
+seguem as mesmas regras do formulário /agendar (validation.py); as que não
+puderem ser importadas voltam no relatório com o número da linha e o motivo.
+
+Colunas: name, email, phone, date (dd/mm/aaaa), time (HH:MM),
+professional_id, service_id e, opcionalmente, notes.
+"""
+import csv
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+import daily_stats
+from db import connector
+from validation import validate_booking
+
+REQUIRED_COLUMNS = ("name", "email", "phone", "date", "time", "professional_id", "service_id")
+
+SLOT_TAKEN = "Este horário já está agendado para este profissional."
+
+
+class ImportReport:
+    """Resultado de uma importação: contadores, erros por linha e vazão."""
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.clients_created = 0
+        self.errors = []  # (linha do arquivo, mensagem)
+        self._started = time.perf_counter()
+        self.elapsed_s = 0.0
+
+    def finish(self):
+        self.elapsed_s = time.perf_counter() - self._started
+        self.errors.sort()
+
+    @property
+    def rows_per_s(self):
+        return self.rows / self.elapsed_s if self.elapsed_s else 0.0
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "clients_created": self.clients_created,
+            "errors": len(self.errors),
+            "elapsed_s": round(self.elapsed_s, 3),
+            "rows_per_s": round(self.rows_per_s, 1),
+        }
+
+
+def _slot_label(value):
+    """TIME vindo do banco (timedelta) para o formato "HH:MM" dos slots."""
+    if isinstance(value, timedelta):
+        minutes = int(value.total_seconds()) // 60
+        return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+    return value.strftime("%H:%M")
+
+
+def import_csv(conn, stream, snapshot, slots, chunk_size=1000, occupancy=None):
+    """
+    Importa os agendamentos do CSV em `stream` (arquivo de texto).
+
+    `snapshot` é o CatalogSnapshot usado para validar os vínculos e a agenda
+    dos profissionais, e `occupancy`, se informado, recebe os horários
+    ocupados após cada bloco.
+    Os blocos já gravados permanecem se um bloco seguinte falhar.
+    Levanta ValueError se faltar alguma coluna obrigatória.
+    """
+    reader = csv.DictReader(stream)
+    missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Colunas ausentes no CSV: {', '.join(missing)}.")
+
+    report = ImportReport()
+    clients = {}  # e-mail (minúsculo) -> id, apenas de blocos já gravados
+    seen = set()  # (data, horário, profissional) já aceitos neste arquivo
+    chunk = []
+    for row in reader:
+        report.rows += 1
+        booking, error = validate_booking(row, snapshot, slots)
+        if error:
+            report.errors.append((reader.line_num, error))
+            continue
+
+        key = (booking["appointment_date"], booking["time"], booking["professional_id"])
+        if key in seen:
+            report.errors.append((reader.line_num, "Horário repetido no arquivo."))
+            continue
+        seen.add(key)
+
+        booking["line"] = reader.line_num
+        booking["notes"] = (row.get("notes") or "").strip()[:255] or None
+        chunk.append(booking)
+        if len(chunk) >= chunk_size:
+            _import_chunk(conn, chunk, snapshot, clients, report, occupancy)
+            chunk = []
+
+    if chunk:
+        _import_chunk(conn, chunk, snapshot, clients, report, occupancy)
+    report.finish()
+    return report
+
+
+def _import_chunk(conn, chunk, snapshot, clients, report, occupancy):
+    cursor = conn.cursor()
+    try:
+        overlapping = _overlapping(cursor, chunk, snapshot)
+        if overlapping:
+            report.errors.extend((b["line"], SLOT_TAKEN) for b in overlapping)
+            skipped = {id(b) for b in overlapping}
+            chunk = [b for b in chunk if id(b) not in skipped]
+
+        new_clients, created = _resolve_clients(cursor, chunk, clients)
+        existing = _existing_slots(cursor, chunk)
+
+        inserts = []
+        for booking in chunk:
+            key = (booking["appointment_date"], booking["time"], booking["professional_id"])
+            if key in existing:
+                report.errors.append((booking["line"], SLOT_TAKEN))
+            else:
+                inserts.append(booking)
+
+        inserted, errors = _insert_appointments(cursor, inserts)
+
+        deltas = defaultdict(int)
+        for b in inserted:
+            deltas[(b["appointment_date"], b["professional_id"], b["service_id"], "scheduled")] += 1
+        daily_stats.record_many(cursor, deltas)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    clients.update(new_clients)
+    report.clients_created += created
+    report.imported += len(inserted)
+    report.errors.extend(errors)
+
+    if occupancy is not None:
+        for b in inserted:
+            occupancy.mark(
+                (b["professional_id"], b["appointment_date"]), b["time"], b["duration_slots"]
+            )
+
+
+def _overlapping(cursor, chunk, snapshot):
+    """
+    Linhas que se sobrepõem a um agendamento ativo (pela duração gravada em
+    cada um) ou a uma linha anterior do arquivo (o mesmo horário inicial
+    fica para _existing_slots). Como no /agendar, as linhas dos
+    profissionais do bloco ficam bloqueadas até o fim da transação.
+    """
+    if not chunk:
+        return []
+
+    grid = snapshot.schedules.grid
+    professional_ids = sorted({b["professional_id"] for b in chunk})
+    placeholders = ", ".join(["%s"] * len(professional_ids))
+    cursor.execute(
+        f"SELECT id FROM professionals WHERE id IN ({placeholders}) ORDER BY id FOR UPDATE",
+        professional_ids,
+    )
+    cursor.fetchall()
+
+    keys = sorted({(b["professional_id"], b["appointment_date"]) for b in chunk})
+    placeholders = ", ".join(["(%s, %s)"] * len(keys))
+    cursor.execute(
+        f"""
+        SELECT professional_id, appointment_date, appointment_time, duration_slots
+        FROM appointments
+        WHERE (professional_id, appointment_date) IN ({placeholders})
+          AND status = 'scheduled'
+        """,
+        [value for key in keys for value in key],
+    )
+    occupied = defaultdict(int)
+    starts = set()
+    for professional_id, day, start, length in cursor.fetchall():
+        label = _slot_label(start)
+        occupied[(professional_id, day)] |= grid.span_mask(label, length)
+        starts.add((professional_id, day, label))
+
+    overlapping = []
+    for b in chunk:
+        key = (b["professional_id"], b["appointment_date"])
+        span = grid.span_mask(b["time"], b["duration_slots"])
+        if (key[0], key[1], b["time"]) in starts:
+            continue
+        if occupied[key] & span:
+            overlapping.append(b)
+        else:
+            occupied[key] |= span
+    return overlapping
+
+
+def _resolve_clients(cursor, chunk, clients):
+    """
+    Preenche client_id em cada linha, reaproveitando clientes pelo e-mail.
+    Retorna (e-mails resolvidos neste bloco, quantidade de clientes criados),
+    contando as linhas que os INSERTs de fato gravaram.
+    """
+    resolved = {}
+    first_row = {}
+    for b in chunk:
+        email = b["email"].lower()
+        if email and email not in clients:
+            first_row.setdefault(email, b)
+
+    created = 0
+    if first_row:
+        emails = list(first_row)
+        placeholders = ", ".join(["%s"] * len(emails))
+        cursor.execute(f"SELECT id, email FROM clients WHERE email IN ({placeholders})", emails)
+        resolved.update((email.lower(), client_id) for client_id, email in cursor.fetchall())
+
+        missing = [e for e in emails if e not in resolved]
+        if missing:
+            cursor.executemany(
+                """
+                INSERT INTO clients (name, email, phone)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE id = id
+                """,
+                [(first_row[e]["name"], first_row[e]["email"], first_row[e]["phone"]) for e in missing],
+            )
+            # Linhas afetadas: 1 por cliente novo, 0 para o e-mail que outro
+            # processo cadastrou nesse meio-tempo (id = id não altera nada)
+            created = cursor.rowcount
+            placeholders = ", ".join(["%s"] * len(missing))
+            cursor.execute(f"SELECT id, email FROM clients WHERE email IN ({placeholders})", missing)
+            resolved.update((email.lower(), client_id) for client_id, email in cursor.fetchall())
+
+    for b in chunk:
+        email = b["email"].lower()
+        if email:
+            b["client_id"] = clients.get(email) or resolved[email]
+        else:
+            # Sem e-mail não há como deduplicar: cada linha gera um cliente,
+            # como no formulário. O id de cada um só sai de um INSERT próprio.
+            cursor.execute(
+                "INSERT INTO clients (name, email, phone) VALUES (%s, NULL, %s)",
+                (b["name"], b["phone"]),
+            )
+            b["client_id"] = cursor.lastrowid
+            created += cursor.rowcount
+    return resolved, created
+
+
+def _existing_slots(cursor, chunk):
+    """
+    Horários do bloco já ocupados por agendamentos ativos (os cancelados
+    não contam para uc_appointment), bloqueados até o fim da transação:
+    {(data, "HH:MM", profissional)}.
+    """
+    keys = [(b["appointment_date"], b["time"], b["professional_id"]) for b in chunk]
+    if not keys:
+        return set()
+    placeholders = ", ".join(["(%s, %s, %s)"] * len(keys))
+    cursor.execute(
+        f"""
+        SELECT appointment_date, appointment_time, professional_id
+        FROM appointments
+        WHERE (appointment_date, appointment_time, professional_id) IN ({placeholders})
+          AND status = 'scheduled'
+        FOR UPDATE
+        """,
+        [value for key in keys for value in key],
+    )
+    return {(row[0], _slot_label(row[1]), row[2]) for row in cursor.fetchall()}
+
+
+def _insert_appointments(cursor, bookings):
+    """
+    Insere os agendamentos em lote. Se outro processo ocupar um dos
+    horários entre a conferência e o INSERT, refaz linha a linha para
+    separar os conflitos. Retorna (inseridos, erros).
+    """
+    if not bookings:
+        return [], []
+
+    sql = """
+        INSERT INTO appointments
+            (client_id, professional_id, service_id,
+             appointment_date, appointment_time, duration_slots, status, notes)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """
+
+    def values(b):
+        return (b["client_id"], b["professional_id"], b["service_id"],
+                b["appointment_date"], b["time"], b["duration_slots"], "scheduled", b["notes"])
+
+    try:
+        cursor.executemany(sql, [values(b) for b in bookings])
+        return bookings, []
+    except connector.IntegrityError as e:
+        if e.errno != connector.errorcode.ER_DUP_ENTRY:
+            raise
+
+    # O INSERT em lote falhou por inteiro; o restante da transação segue válido
+    inserted = []
+    errors = []
+    for b in bookings:
+        try:
+            cursor.execute(sql, values(b))
+            inserted.append(b)
+        except connector.IntegrityError as e:
+            if e.errno != connector.errorcode.ER_DUP_ENTRY:
+                raise
+            errors.append((b["line"], SLOT_TAKEN))
+    return inserted, errors
@@ -0,0 +1,105 @@
+"""
+Aplica as migrações de esquema (pasta migrations/) em um banco existente.
+
+Cada arquivo NNNN_descricao.sql é aplicado uma única vez, em ordem, e
+registrado na tabela schema_migrations.
+"""
+import os
+import re
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+def available_migrations(directory=MIGRATIONS_DIR):
+    """Lista de (versão, nome, caminho) em ordem crescente de versão."""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if match:
+            migrations.append(
+                (int(match.group(1)), match.group(2), os.path.join(directory, filename))
+            )
+    return migrations
+
+
+def split_statements(sql):
+    """Separa um script em comandos, ignorando linhas de comentário."""
+    lines = [
+        line for line in sql.splitlines()
+        if line.strip() and not line.strip().startswith("--")
+    ]
+    statements = []
+    current = []
+    for line in lines:
+        current.append(line)
+        if line.rstrip().endswith(";"):
+            statements.append("\n".join(current).rstrip().rstrip(";"))
+            current = []
+    if current:
+        statements.append("\n".join(current))
+    return statements
+
+
+def ensure_migrations_table(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+          version INT PRIMARY KEY,
+          name VARCHAR(100) NOT NULL,
+          applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+
+def applied_versions(cursor):
+    ensure_migrations_table(cursor)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def pending_migrations(conn, target=None):
+    cursor = conn.cursor()
+    try:
+        applied = applied_versions(cursor)
+    finally:
+        cursor.close()
+    return [
+        m for m in available_migrations()
+        if m[0] not in applied and (target is None or m[0] <= target)
+    ]
+
+
+def migrate(conn, target=None, echo=print):
+    """
+    Aplica as migrações pendentes até `target` (ou todas).
+    Retorna a lista de versões aplicadas.
+
+    Comandos DDL do MySQL fazem commit implícito, então cada migração é
+    registrada logo após ser aplicada; se uma falhar, as anteriores
+    continuam registradas e a execução pode ser retomada.
+    """
+    applied = []
+    for version, name, path in pending_migrations(conn, target):
+        with open(path, encoding="utf-8") as f:
+            statements = split_statements(f.read())
+
+        echo(f"Aplicando {version:04d}_{name} ({len(statements)} comandos)...")
+        cursor = conn.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        applied.append(version)
+    return applied
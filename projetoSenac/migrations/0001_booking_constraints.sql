@@ -0,0 +1,68 @@
+-- Restrições usadas pelo agendamento em transação única.
+
+-- Clientes sem e-mail passam a ter NULL (não conflitam no índice único)
+UPDATE clients SET email = NULL WHERE email = '';
+
+-- Cópia dos clientes repetidos pelo e-mail e dos agendamentos que serão
+-- passados para o cliente mantido (o de menor id), para conferência ou
+-- para desfazer a unificação abaixo
+CREATE TABLE IF NOT EXISTS merged_clients_0001 (
+  id INT PRIMARY KEY,
+  name VARCHAR(100) NOT NULL,
+  email VARCHAR(100),
+  phone VARCHAR(20),
+  created_at TIMESTAMP NULL,
+  merged_into INT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS merged_appointments_0001 (
+  appointment_id INT PRIMARY KEY,
+  client_id INT NOT NULL
+);
+
+INSERT IGNORE INTO merged_clients_0001 (id, name, email, phone, created_at, merged_into)
+SELECT c.id, c.name, c.email, c.phone, c.created_at, d.keep_id
+FROM clients c
+JOIN (
+  SELECT email, MIN(id) AS keep_id
+  FROM clients
+  WHERE email IS NOT NULL
+  GROUP BY email
+  HAVING COUNT(*) > 1
+) d ON c.email = d.email
+WHERE c.id <> d.keep_id;
+
+INSERT IGNORE INTO merged_appointments_0001 (appointment_id, client_id)
+SELECT a.id, a.client_id
+FROM appointments a
+JOIN merged_clients_0001 m ON m.id = a.client_id;
+
+-- Unifica clientes repetidos pelo e-mail, mantendo o de menor id
+UPDATE appointments a
+JOIN clients c ON a.client_id = c.id
+JOIN (
+  SELECT email, MIN(id) AS keep_id
+  FROM clients
+  WHERE email IS NOT NULL
+  GROUP BY email
+  HAVING COUNT(*) > 1
+) d ON c.email = d.email
+SET a.client_id = d.keep_id
+WHERE c.id <> d.keep_id;
+
+DELETE c
+FROM clients c
+JOIN (
+  SELECT email, MIN(id) AS keep_id
+  FROM clients
+  WHERE email IS NOT NULL
+  GROUP BY email
+  HAVING COUNT(*) > 1
+) d ON c.email = d.email
+WHERE c.id <> d.keep_id;
+
+ALTER TABLE clients ADD CONSTRAINT uc_client_email UNIQUE (email);
+
+ALTER TABLE appointments
+  ADD COLUMN idempotency_key VARCHAR(64) AFTER notes,
+  ADD CONSTRAINT uc_appointment_idempotency UNIQUE (idempotency_key);
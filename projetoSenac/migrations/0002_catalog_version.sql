@@ -0,0 +1,7 @@
+-- Versão do catálogo usada para invalidar o cache em todos os processos.
+CREATE TABLE IF NOT EXISTS catalog_version (
+  id TINYINT PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT IGNORE INTO catalog_version (id, version) VALUES (1, 0);
@@ -0,0 +1,7 @@
+-- Índices das consultas mais frequentes:
+--   /api/horarios e /api/disponibilidade filtram por profissional, data e status;
+--   painel e relatórios agregam agendamentos confirmados por data.
+-- A busca de cliente por e-mail já usa uc_client_email (0001).
+ALTER TABLE appointments
+  ADD INDEX idx_appointments_professional_date_status (professional_id, appointment_date, status),
+  ADD INDEX idx_appointments_status_date (status, appointment_date);
@@ -0,0 +1,5 @@
+-- Índices da paginação por cursor em /admin/agendamentos, que ordena por
+-- (appointment_date, appointment_time, id), com ou sem filtro de profissional.
+ALTER TABLE appointments
+  ADD INDEX idx_appointments_date_time_id (appointment_date, appointment_time, id),
+  ADD INDEX idx_appointments_professional_date_time (professional_id, appointment_date, appointment_time);
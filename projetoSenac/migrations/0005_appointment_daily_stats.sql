@@ -0,0 +1,18 @@
+-- Totais diários de agendamentos por profissional, serviço e status,
+-- mantidos pela aplicação na mesma transação de cada agendamento/cancelamento.
+CREATE TABLE IF NOT EXISTS appointment_daily_stats (
+  stat_date DATE NOT NULL,
+  professional_id INT NOT NULL,
+  service_id INT NOT NULL,
+  status ENUM('scheduled', 'cancelled') NOT NULL,
+  total INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (stat_date, professional_id, service_id, status),
+  INDEX idx_daily_stats_status_date (status, stat_date, total)
+);
+
+-- Carga inicial a partir do histórico existente
+INSERT INTO appointment_daily_stats
+  (stat_date, professional_id, service_id, status, total)
+SELECT appointment_date, professional_id, service_id, status, COUNT(*)
+FROM appointments
+GROUP BY appointment_date, professional_id, service_id, status;
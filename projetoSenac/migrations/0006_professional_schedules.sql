@@ -0,0 +1,39 @@
+-- Agenda por profissional (ver schedule.py): horários semanais, exceções
+-- (folgas, feriados, bloqueios) e duração dos serviços em horários da grade.
+
+-- Intervalos de atendimento por dia da semana (0 = segunda ... 6 = domingo).
+-- Profissionais sem nenhuma linha atendem em todos os horários da grade.
+CREATE TABLE IF NOT EXISTS professional_schedules (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  professional_id INT NOT NULL,
+  weekday TINYINT UNSIGNED NOT NULL,
+  start_time TIME NOT NULL,
+  end_time TIME NOT NULL,
+  CONSTRAINT fk_schedules_professional
+    FOREIGN KEY (professional_id) REFERENCES professionals(id)
+    ON DELETE CASCADE,
+  INDEX idx_schedules_professional_weekday (professional_id, weekday)
+);
+
+-- Datas sem atendimento: professional_id NULL vale para todos (feriado);
+-- start_time/end_time NULL bloqueiam o dia inteiro.
+CREATE TABLE IF NOT EXISTS schedule_exceptions (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  professional_id INT NULL,
+  exception_date DATE NOT NULL,
+  start_time TIME NULL,
+  end_time TIME NULL,
+  description VARCHAR(100),
+  CONSTRAINT fk_exceptions_professional
+    FOREIGN KEY (professional_id) REFERENCES professionals(id)
+    ON DELETE CASCADE,
+  INDEX idx_exceptions_date (exception_date)
+);
+
+-- Quantos horários consecutivos da grade cada serviço ocupa
+ALTER TABLE services
+  ADD COLUMN duration_slots TINYINT UNSIGNED NOT NULL DEFAULT 1 AFTER description;
+
+-- Cópia da duração no agendamento (o serviço pode mudar depois)
+ALTER TABLE appointments
+  ADD COLUMN duration_slots TINYINT UNSIGNED NOT NULL DEFAULT 1 AFTER appointment_time;
@@ -0,0 +1,30 @@
+-- Arquivo dos agendamentos antigos (ver archive.py e `flask db-archive`).
+-- Mesmas colunas de appointments, com o id original; as restrições de
+-- horário e de idempotência só valem para a tabela quente.
+CREATE TABLE IF NOT EXISTS appointments_archive (
+  id INT PRIMARY KEY,
+  client_id INT NOT NULL,
+  professional_id INT NOT NULL,
+  service_id INT NOT NULL,
+  appointment_date DATE NOT NULL,
+  appointment_time TIME NOT NULL,
+  duration_slots TINYINT UNSIGNED NOT NULL DEFAULT 1,
+  status ENUM('scheduled', 'cancelled') NOT NULL DEFAULT 'scheduled',
+  notes VARCHAR(255),
+  idempotency_key VARCHAR(64),
+  created_at TIMESTAMP NULL DEFAULT NULL,
+  archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  CONSTRAINT fk_appointments_archive_client
+    FOREIGN KEY (client_id) REFERENCES clients(id)
+    ON DELETE CASCADE,
+  CONSTRAINT fk_appointments_archive_professional
+    FOREIGN KEY (professional_id) REFERENCES professionals(id)
+    ON DELETE CASCADE,
+  CONSTRAINT fk_appointments_archive_service
+    FOREIGN KEY (service_id) REFERENCES services(id)
+    ON DELETE RESTRICT,
+  -- Mesma ordem da listagem e da exportação (appointment_date, appointment_time, id)
+  INDEX idx_archive_date_time_id (appointment_date, appointment_time, id),
+  INDEX idx_archive_professional_date_time (professional_id, appointment_date, appointment_time),
+  INDEX idx_archive_status_date (status, appointment_date)
+);
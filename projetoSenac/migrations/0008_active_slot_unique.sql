@@ -0,0 +1,10 @@
+-- uc_appointment passa a valer só para agendamentos ativos: active_slot é
+-- NULL nos cancelados, e NULL não conflita no índice único. Um novo
+-- agendamento no horário de um cancelado é um INSERT comum, e a linha
+-- cancelada continua no histórico do cliente e nas estatísticas.
+ALTER TABLE appointments
+  ADD COLUMN active_slot TINYINT
+    GENERATED ALWAYS AS (IF(status = 'cancelled', NULL, 1)) VIRTUAL AFTER status,
+  DROP INDEX uc_appointment,
+  ADD CONSTRAINT uc_appointment
+    UNIQUE (appointment_date, appointment_time, professional_id, active_slot);
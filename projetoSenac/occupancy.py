@@ -0,0 +1,98 @@
+"""Índice em memória dos horários ocupados por (profissional, data)."""
+import threading
+import time
+from collections import OrderedDict
+
+
+class OccupancyIndex:
+    """
+    Guarda, para cada (professional_id, data), um bitmap dos horários
+    ocupados: o bit i corresponde a `grid.slots[i]` (schedule.SlotGrid). Um
+    atendimento de N slots ocupa os N bits a partir do horário de início.
+
+    As entradas são carregadas do banco sob demanda, atualizadas pelas
+    gravações deste processo (agendamento/cancelamento) e expiram após
+    `ttl` segundos, o que limita o atraso em relação a gravações feitas
+    por outros workers. O número de entradas é limitado (LRU).
+    """
+
+    def __init__(self, grid, max_entries=4096, ttl=30.0):
+        self.grid = grid
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+        # Funções chamadas como listener(chave) depois de cada mark/release
+        self.listeners = []
+
+    def bitmap_from_spans(self, spans):
+        """Monta o bitmap a partir de pares ("HH:MM", slots ocupados)."""
+        span_mask = self.grid.span_mask
+        bitmap = 0
+        for slot, length in spans:
+            bitmap |= span_mask(slot, length)
+        return bitmap
+
+    def get(self, key):
+        """Bitmap em cache para a chave, ou None se ausente/expirado."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry[0]
+
+    def load_token(self):
+        """Marca o início de uma leitura no banco (ver `put`)."""
+        with self._lock:
+            return self._writes
+
+    def put(self, key, bitmap, token=None):
+        """
+        Guarda um bitmap lido do banco. Se alguma gravação aconteceu desde
+        `load_token()`, a leitura pode estar desatualizada e não é guardada.
+        """
+        with self._lock:
+            if token is not None and token != self._writes:
+                return
+            self._entries[key] = (bitmap, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def _update(self, key, set_bits, clear_bits):
+        with self._lock:
+            self._writes += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                bitmap = (entry[0] | set_bits) & ~clear_bits
+                self._entries[key] = (bitmap, entry[1])
+        for listener in self.listeners:
+            listener(key)
+
+    def mark(self, key, slot, length=1):
+        """Marca os horários como ocupados (somente se a chave já estiver em cache)."""
+        self._update(key, self.grid.span_mask(slot, length), 0)
+
+    def release(self, key, slot, length=1):
+        """Marca os horários como livres (somente se a chave já estiver em cache)."""
+        self._update(key, 0, self.grid.span_mask(slot, length))
+
+    def clear(self):
+        with self._lock:
+            self._writes += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            data = dict(self.counters)
+            data["entries"] = len(self._entries)
+        return data
@@ -0,0 +1,108 @@
+"""
+Cache em memória dos dados e trechos renderizados das páginas administrativas.
+
+Cada entrada tem validade própria (ttl, em segundos). Quando uma entrada
+vence, só uma thread recalcula (single-flight): as demais que pedirem a
+mesma chave nesse meio tempo esperam e recebem o mesmo resultado, então N
+gestores recarregando o painel custam uma consulta por janela de validade.
+
+As chaves são tuplas cujo primeiro elemento é o grupo ("dashboard",
+"reports"...). `invalidate(grupo)` descarta as entradas do grupo e impede
+que um recálculo iniciado antes da invalidação grave um valor antigo.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """Recálculo em andamento de uma chave."""
+
+    __slots__ = ("done", "value", "failed")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.failed = False
+
+
+class PageCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # chave -> (valor, vence_em)
+        self._flights = {}
+        self._generations = {}  # grupo -> número de invalidações
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "invalidations": 0, "evictions": 0}
+
+    def get_or_compute(self, key, ttl, compute):
+        """
+        Valor em cache para `key` ou, se ausente/vencido, o resultado de
+        `compute()`, guardado por `ttl` segundos. Resultados None (ex.: banco
+        indisponível) são repassados a quem esperava, mas não guardados.
+        """
+        group = key[0]
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.counters["hits"] += 1
+                    return entry[0]
+                flight = self._flights.get(key)
+                owner = flight is None
+                if owner:
+                    flight = self._flights[key] = _Flight()
+                    generation = self._generations.get(group, 0)
+                    self.counters["misses"] += 1
+                else:
+                    self.counters["coalesced"] += 1
+
+            if owner:
+                break
+            flight.done.wait()
+            if not flight.failed:
+                return flight.value
+            # Quem recalculava falhou: a próxima volta tenta de novo
+
+        try:
+            value = compute()
+        except BaseException:
+            with self._lock:
+                del self._flights[key]
+            flight.failed = True
+            flight.done.set()
+            raise
+
+        with self._lock:
+            del self._flights[key]
+            if value is not None and self._generations.get(group, 0) == generation:
+                self._entries[key] = (value, time.monotonic() + ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.counters["evictions"] += 1
+        flight.value = value
+        flight.done.set()
+        return value
+
+    def invalidate(self, *groups):
+        """Descarta as entradas dos grupos (ex.: após um agendamento ou cancelamento)."""
+        with self._lock:
+            for group in groups:
+                self._generations[group] = self._generations.get(group, 0) + 1
+                for key in [k for k in self._entries if k[0] == group]:
+                    del self._entries[key]
+            self.counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            for group in {k[0] for k in self._entries} | {k[0] for k in self._flights}:
+                self._generations[group] = self._generations.get(group, 0) + 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            data = dict(self.counters)
+            data["entries"] = len(self._entries)
+        return data
@@ -0,0 +1,559 @@
+"""
+Consultas SQL das rotas, uma função por consulta.
+
+Cada função recebe a conexão e executa sua instrução como prepared
+statement: nas conexões do pool o cursor preparado fica guardado na própria
+conexão (db.PooledConnection.prepared), e as chamadas seguintes enviam só
+os parâmetros, sem o servidor analisar o SQL de novo. Qualquer outra
+conexão do mysql.connector também serve (por exemplo, uma aberta direto
+em um banco local de testes); nesse caso é usado um cursor de texto.
+
+No protocolo binário, TIME chega como timedelta, DATE como date e SUM como
+Decimal; os registros de rows.py e slot_label já tratam esses tipos. As
+gravações em lote (importer.py, seed.py) continuam no protocolo de texto,
+em que executemany junta as linhas em um único INSERT.
+"""
+import heapq
+from itertools import islice
+
+import daily_stats
+from rows import AppointmentDetail, AppointmentRow, ProfessionalRow, ServiceRow
+
+
+def _statement(conn, sql):
+    prepared = getattr(conn, "prepared", None)
+    if prepared is None:
+        return conn.cursor()
+    return prepared(sql)
+
+
+def _fetch_all(conn, sql, params=()):
+    cursor = _statement(conn, sql)
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _fetch_one(conn, sql, params=()):
+    rows = _fetch_all(conn, sql, params)
+    return rows[0] if rows else None
+
+
+def _execute(conn, sql, params=()):
+    """Executa uma gravação e retorna o lastrowid."""
+    cursor = _statement(conn, sql)
+    try:
+        cursor.execute(sql, params)
+        return cursor.lastrowid
+    finally:
+        cursor.close()
+
+
+# ---------------------------------------------------------------------------
+# Horários ocupados
+
+BOOKED_SLOTS = """
+    SELECT appointment_time, duration_slots
+    FROM appointments
+    WHERE appointment_date = %s
+      AND professional_id = %s
+      AND status = 'scheduled'
+"""
+
+
+def booked_slots(conn, appointment_date, professional_id):
+    """Agendamentos ativos do profissional na data: [(TIME de início, slots ocupados)]."""
+    return _fetch_all(conn, BOOKED_SLOTS, (appointment_date, professional_id))
+
+
+def booked_slots_by_day(conn, professional_ids, start_date, end_date):
+    """
+    Agendamentos de vários profissionais em um intervalo, agrupados:
+    lista de (profissional, data, "HH:MM/slots,HH:MM/slots,...").
+    """
+    placeholders = ", ".join(["%s"] * len(professional_ids))
+    # O formato vai como parâmetro: "%" literal no SQL teria de ser escapado
+    # no protocolo de texto, mas não no de instruções preparadas.
+    sql = f"""
+        SELECT professional_id,
+               appointment_date,
+               GROUP_CONCAT(TIME_FORMAT(appointment_time, %s), '/', duration_slots)
+        FROM appointments
+        WHERE professional_id IN ({placeholders})
+          AND appointment_date BETWEEN %s AND %s
+          AND status = 'scheduled'
+        GROUP BY professional_id, appointment_date
+    """
+    return _fetch_all(conn, sql, ("%H:%i", *professional_ids, start_date, end_date))
+
+
+# ---------------------------------------------------------------------------
+# Agendamento
+
+UPSERT_CLIENT = """
+    INSERT INTO clients (name, email, phone)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)
+"""
+
+INSERT_APPOINTMENT = """
+    INSERT INTO appointments
+        (client_id, professional_id, service_id,
+         appointment_date, appointment_time, duration_slots, status,
+         idempotency_key)
+    VALUES (%s, %s, %s, %s, %s, %s, 'scheduled', %s)
+"""
+
+APPOINTMENT_BY_KEY = "SELECT id FROM appointments WHERE idempotency_key = %s"
+
+LOCK_PROFESSIONAL = "SELECT id FROM professionals WHERE id = %s FOR UPDATE"
+
+
+def upsert_client(conn, name, email, phone):
+    """Cria o cliente ou reaproveita o já cadastrado com o mesmo e-mail; retorna o id."""
+    return _execute(conn, UPSERT_CLIENT, (name, email, phone))
+
+
+def insert_appointment(conn, client_id, professional_id, service_id,
+                       appointment_date, time_str, idempotency_key, duration_slots=1):
+    """
+    Grava o agendamento e retorna o id. Horário ocupado por um agendamento
+    ativo (uc_appointment; os cancelados não contam) ou chave de
+    idempotência repetida geram IntegrityError (ER_DUP_ENTRY).
+    """
+    return _execute(conn, INSERT_APPOINTMENT, (
+        client_id, professional_id, service_id,
+        appointment_date, time_str, duration_slots, idempotency_key,
+    ))
+
+
+def lock_professional(conn, professional_id):
+    """
+    Bloqueia a linha do profissional até o fim da transação, serializando
+    as reservas dele: um atendimento pode ocupar slots além do inicial, que
+    uc_appointment não cobre.
+    """
+    _fetch_all(conn, LOCK_PROFESSIONAL, (professional_id,))
+
+
+def appointment_id_by_key(conn, idempotency_key):
+    row = _fetch_one(conn, APPOINTMENT_BY_KEY, (idempotency_key,))
+    return row[0] if row else None
+
+
+def record_stat(conn, stat_date, professional_id, service_id, status, delta):
+    """Soma `delta` em appointment_daily_stats (chamar dentro da transação da gravação)."""
+    _execute(conn, daily_stats.RECORD_SQL, (stat_date, professional_id, service_id, status, delta))
+
+
+def record_booking(conn, stat_date, professional_id, service_id):
+    record_stat(conn, stat_date, professional_id, service_id, "scheduled", 1)
+
+
+def record_cancellation(conn, stat_date, professional_id, service_id):
+    record_stat(conn, stat_date, professional_id, service_id, "scheduled", -1)
+    record_stat(conn, stat_date, professional_id, service_id, "cancelled", 1)
+
+
+APPOINTMENT_DETAIL = f"""
+    SELECT {AppointmentDetail.COLUMNS}
+    FROM appointments a
+    JOIN clients c ON a.client_id = c.id
+    JOIN professionals p ON a.professional_id = p.id
+    JOIN services s ON a.service_id = s.id
+    WHERE a.id = %s
+"""
+
+
+def appointment_detail(conn, appointment_id):
+    """Agendamento com cliente, profissional e serviço (AppointmentDetail) ou None."""
+    row = _fetch_one(conn, APPOINTMENT_DETAIL, (appointment_id,))
+    return AppointmentDetail(*row) if row else None
+
+
+# ---------------------------------------------------------------------------
+# Cancelamento
+
+LOCK_SCHEDULED = """
+    SELECT professional_id, service_id, appointment_date, appointment_time, duration_slots
+    FROM appointments
+    WHERE id = %s AND status = 'scheduled'
+    FOR UPDATE
+"""
+
+CANCEL_APPOINTMENT = "UPDATE appointments SET status = 'cancelled' WHERE id = %s"
+
+
+def lock_scheduled(conn, appointment_id):
+    """
+    Bloqueia o agendamento ativo: (professional_id, service_id,
+    appointment_date, appointment_time, duration_slots) ou None.
+    """
+    return _fetch_one(conn, LOCK_SCHEDULED, (appointment_id,))
+
+
+def cancel_appointment(conn, appointment_id):
+    _execute(conn, CANCEL_APPOINTMENT, (appointment_id,))
+
+
+# ---------------------------------------------------------------------------
+# Painel, listagem e relatórios
+
+SCHEDULED_TOTAL = """
+    SELECT COALESCE(SUM(total), 0)
+    FROM appointment_daily_stats
+    WHERE stat_date = %s
+      AND status = 'scheduled'
+"""
+
+UPCOMING = f"""
+    SELECT {AppointmentRow.COLUMNS}
+    FROM appointments a
+    JOIN clients c ON a.client_id = c.id
+    JOIN professionals p ON a.professional_id = p.id
+    JOIN services s ON a.service_id = s.id
+    WHERE a.appointment_date >= %s
+      AND a.status = 'scheduled'
+    ORDER BY a.appointment_date, a.appointment_time
+    LIMIT %s
+"""
+
+DAILY_TOTALS = """
+    SELECT stat_date, SUM(total)
+    FROM appointment_daily_stats
+    WHERE status = 'scheduled'
+    GROUP BY stat_date
+    HAVING SUM(total) > 0
+    ORDER BY stat_date DESC
+    LIMIT %s
+"""
+
+
+def scheduled_total(conn, day):
+    """Total de agendamentos ativos no dia (appointment_daily_stats)."""
+    row = _fetch_one(conn, SCHEDULED_TOTAL, (day,))
+    return int(row[0]) if row else 0
+
+
+def upcoming_appointments(conn, day, limit=10):
+    """Próximos agendamentos ativos a partir do dia (AppointmentRow)."""
+    return [AppointmentRow(*row) for row in _fetch_all(conn, UPCOMING, (day, limit))]
+
+
+ARCHIVE_LAST_DATE = "SELECT MAX(appointment_date) FROM appointments_archive"
+
+
+def archive_last_date(conn):
+    """Data do agendamento arquivado mais recente, ou None com o arquivo vazio."""
+    row = _fetch_one(conn, ARCHIVE_LAST_DATE)
+    return row[0] if row else None
+
+
+def _position(row):
+    return (row.appointment_date, row.appointment_time, row.id)
+
+
+def list_appointments(conn, professional_id=None, service_id=None, status=None,
+                      date_from=None, date_to=None, after=None, ascending=False, limit=50):
+    """
+    Página da listagem administrativa (AppointmentRow), em ordem de
+    (appointment_date, appointment_time, id). `after` é a posição
+    (data, horário, id) do último item da página anterior (keyset).
+
+    Lê também appointments_archive quando a página pode incluir linhas
+    arquivadas: as duas consultas usam o mesmo filtro e limite, e as linhas
+    são intercaladas pela posição.
+    """
+    direction = "ASC" if ascending else "DESC"
+    op = ">" if ascending else "<"
+
+    conditions = []
+    params = []
+    if professional_id:
+        conditions.append("a.professional_id = %s")
+        params.append(professional_id)
+    if service_id:
+        conditions.append("a.service_id = %s")
+        params.append(service_id)
+    if status:
+        conditions.append("a.status = %s")
+        params.append(status)
+    if date_from:
+        conditions.append("a.appointment_date >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("a.appointment_date <= %s")
+        params.append(date_to)
+    if after:
+        after_date, after_time, after_id = after
+        conditions.append(
+            f"""a.appointment_date {op}= %s
+                AND (a.appointment_date {op} %s
+                     OR (a.appointment_date = %s
+                         AND (a.appointment_time {op} %s
+                              OR (a.appointment_time = %s AND a.id {op} %s))))"""
+        )
+        params.extend([after_date, after_date, after_date, after_time, after_time, after_id])
+
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    sql = f"""
+        SELECT {AppointmentRow.COLUMNS}
+        FROM {{table}} a
+        JOIN clients c ON a.client_id = c.id
+        JOIN professionals p ON a.professional_id = p.id
+        JOIN services s ON a.service_id = s.id
+        {where}
+        ORDER BY a.appointment_date {direction},
+                 a.appointment_time {direction},
+                 a.id {direction}
+        LIMIT %s
+    """
+    params.append(limit)
+    rows = [
+        AppointmentRow(*row)
+        for row in _fetch_all(conn, sql.format(table="appointments"), params)
+    ]
+
+    # Arquivadas nunca são posteriores a last_archived: só é preciso lê-las
+    # se o período (ou a posição `after`) chega até lá e, em ordem
+    # decrescente, se a página não foi preenchida com linhas mais novas.
+    last_archived = archive_last_date(conn)
+    if (
+        last_archived is None
+        or (date_from and date_from > last_archived)
+        or (ascending and after and after[0] > last_archived)
+        or (not ascending and len(rows) == limit and rows[-1].appointment_date > last_archived)
+    ):
+        return rows
+
+    archived = [
+        AppointmentRow(*row)
+        for row in _fetch_all(conn, sql.format(table="appointments_archive"), params)
+    ]
+    merged = heapq.merge(rows, archived, key=_position, reverse=not ascending)
+    return list(islice(merged, limit))
+
+
+def daily_totals(conn, days=30):
+    """Totais de agendamentos ativos dos últimos `days` dias com movimento: [(data, total)]."""
+    return [(stat_date, int(total)) for stat_date, total in _fetch_all(conn, DAILY_TOTALS, (days,))]
+
+
+EXPORT_SELECT = """
+    SELECT a.id,
+           a.appointment_date,
+           a.appointment_time,
+           a.status,
+           a.notes,
+           a.created_at,
+           c.id,
+           c.name,
+           c.email,
+           c.phone,
+           p.id,
+           p.name,
+           s.id,
+           s.name
+    FROM {table} a
+    JOIN clients c ON a.client_id = c.id
+    JOIN professionals p ON a.professional_id = p.id
+    JOIN services s ON a.service_id = s.id
+"""
+
+
+def _export_rows(conn, table, where, params, batch_size):
+    """
+    Linhas de uma tabela lidas de um cursor de texto sem buffer: o banco
+    envia as linhas conforme são consumidas, então a memória não cresce
+    com o total exportado.
+    """
+    finished = False
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"{EXPORT_SELECT.format(table=table)} {where} "
+            "ORDER BY a.appointment_date, a.appointment_time, a.id",
+            params,
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+        finished = True
+    finally:
+        if finished:
+            cursor.close()
+        else:
+            # Download interrompido: ainda há linhas pendentes no
+            # protocolo, então a conexão não pode voltar ao pool.
+            conn.invalidate()
+
+
+def _export_position(row):
+    return (row[1], row[2], row[0])
+
+
+def export_batches(conn, date_from, date_to, batch_size, archive_conn=None):
+    """
+    Gera lotes de linhas de agendamentos (com cliente, profissional e
+    serviço) em ordem de data, horário e id. Roda uma vez por download,
+    então não vale guardar a instrução preparada. `conn` é do pool.
+
+    Com `archive_conn` (uma segunda conexão, pois cada uma só lê um
+    resultado em streaming por vez), as linhas de appointments_archive no
+    período são intercaladas com as de appointments.
+    """
+    conditions = []
+    params = []
+    if date_from:
+        conditions.append("a.appointment_date >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("a.appointment_date <= %s")
+        params.append(date_to)
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+    sources = [_export_rows(conn, "appointments", where, params, batch_size)]
+    if archive_conn is not None:
+        sources.append(
+            _export_rows(archive_conn, "appointments_archive", where, params, batch_size)
+        )
+    rows = heapq.merge(*sources, key=_export_position) if len(sources) > 1 else sources[0]
+
+    try:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            yield batch
+    finally:
+        # Fecha cada leitura já no fim do download (ou na interrupção), sem
+        # depender do coletor de lixo para devolver ou invalidar a conexão.
+        for source in sources:
+            source.close()
+
+
+# ---------------------------------------------------------------------------
+# Usuários e catálogo
+
+FIND_USER = """
+    SELECT id, name, email, role
+    FROM users
+    WHERE email = %s AND password = %s
+"""
+
+CATALOG_VERSION = "SELECT version FROM catalog_version WHERE id = 1"
+
+BUMP_CATALOG_VERSION = """
+    INSERT INTO catalog_version (id, version) VALUES (1, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1
+"""
+
+PROFESSIONALS = f"SELECT {ProfessionalRow.COLUMNS} FROM professionals ORDER BY name"
+SERVICES = f"SELECT {ServiceRow.COLUMNS} FROM services ORDER BY name"
+LINKS = "SELECT professional_id, service_id FROM professional_services"
+SCHEDULES = """
+    SELECT id, professional_id, weekday, start_time, end_time
+    FROM professional_schedules
+    ORDER BY professional_id, weekday, start_time
+"""
+# Só as exceções de hoje em diante entram no catálogo
+EXCEPTIONS = """
+    SELECT id, professional_id, exception_date, start_time, end_time, description
+    FROM schedule_exceptions
+    WHERE exception_date >= CURDATE()
+    ORDER BY exception_date, start_time
+"""
+
+INSERT_PROFESSIONAL = "INSERT INTO professionals (name, email, phone) VALUES (%s, %s, %s)"
+INSERT_SERVICE = "INSERT INTO services (name, description, duration_slots) VALUES (%s, %s, %s)"
+LINK_SERVICE = """
+    INSERT IGNORE INTO professional_services (professional_id, service_id)
+    VALUES (%s, %s)
+"""
+INSERT_SCHEDULE = """
+    INSERT INTO professional_schedules (professional_id, weekday, start_time, end_time)
+    VALUES (%s, %s, %s, %s)
+"""
+DELETE_SCHEDULE = "DELETE FROM professional_schedules WHERE id = %s"
+INSERT_EXCEPTION = """
+    INSERT INTO schedule_exceptions
+        (professional_id, exception_date, start_time, end_time, description)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+DELETE_EXCEPTION = "DELETE FROM schedule_exceptions WHERE id = %s"
+
+
+def find_user(conn, email, password):
+    """Usuário com o e-mail e a senha informados, em dicionário, ou None."""
+    row = _fetch_one(conn, FIND_USER, (email, password))
+    return dict(zip(("id", "name", "email", "role"), row)) if row else None
+
+
+def catalog_version(conn):
+    row = _fetch_one(conn, CATALOG_VERSION)
+    return row[0] if row else 0
+
+
+def catalog_rows(conn):
+    """
+    (profissionais, serviços, vínculos, horários semanais, exceções) para
+    montar o CatalogSnapshot.
+    """
+    professionals = [ProfessionalRow(*row) for row in _fetch_all(conn, PROFESSIONALS)]
+    services = [ServiceRow(*row) for row in _fetch_all(conn, SERVICES)]
+    links = _fetch_all(conn, LINKS)
+    schedules = _fetch_all(conn, SCHEDULES)
+    exceptions = _fetch_all(conn, EXCEPTIONS)
+    return professionals, services, links, schedules, exceptions
+
+
+def bump_catalog_version(conn):
+    """Incrementa a versão do catálogo (chamar antes do commit da gravação)."""
+    _execute(conn, BUMP_CATALOG_VERSION)
+
+
+def create_professional(conn, name, email, phone):
+    _execute(conn, INSERT_PROFESSIONAL, (name, email, phone))
+    bump_catalog_version(conn)
+
+
+def create_service(conn, name, description, duration_slots=1):
+    _execute(conn, INSERT_SERVICE, (name, description, duration_slots))
+    bump_catalog_version(conn)
+
+
+def link_service(conn, professional_id, service_id):
+    """Vincula o serviço ao profissional (ignora vínculos já existentes)."""
+    _execute(conn, LINK_SERVICE, (professional_id, service_id))
+    bump_catalog_version(conn)
+
+
+def add_schedule(conn, professional_id, weekday, start_time, end_time):
+    """Acrescenta um intervalo de atendimento semanal (weekday 0 = segunda)."""
+    _execute(conn, INSERT_SCHEDULE, (professional_id, weekday, start_time, end_time))
+    bump_catalog_version(conn)
+
+
+def remove_schedule(conn, schedule_id):
+    _execute(conn, DELETE_SCHEDULE, (schedule_id,))
+    bump_catalog_version(conn)
+
+
+def add_exception(conn, professional_id, exception_date, start_time, end_time, description):
+    """
+    Bloqueia a data (ou o intervalo start_time-end_time dela) para o
+    profissional, ou para todos com professional_id None.
+    """
+    _execute(conn, INSERT_EXCEPTION, (
+        professional_id, exception_date, start_time, end_time, description,
+    ))
+    bump_catalog_version(conn)
+
+
+def remove_exception(conn, exception_id):
+    _execute(conn, DELETE_EXCEPTION, (exception_id,))
+    bump_catalog_version(conn)
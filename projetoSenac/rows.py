@@ -0,0 +1,131 @@
+"""
+Registros compactos para as linhas lidas do banco.
+
+As consultas usam cursores comuns (tuplas) e cada linha vira um objeto com
+`__slots__`, sem o dicionário por linha do `dictionary=True`. Os campos
+DATE/TIME são convertidos uma única vez, na criação do registro: o conector
+entrega TIME como timedelta, e como os horários da agenda caem em minutos
+exatos, uma tabela pré-calculada devolve o datetime.time correspondente
+sem aritmética nem strptime por linha.
+
+Os templates acessam os campos por atributo (`a.client_name`), como já
+faziam com os dicionários.
+
+Clientes não têm registro próprio: repository.upsert_client devolve só o
+id, e nome, e-mail e telefone chegam às telas pelos JOINs de
+AppointmentRow e AppointmentDetail.
+"""
+from datetime import datetime, time, timedelta
+
+_TIME_BY_DELTA = {timedelta(minutes=m): time(m // 60, m % 60) for m in range(24 * 60)}
+
+
+def to_time(value):
+    """TIME do banco (timedelta) para datetime.time; outros valores passam direto."""
+    converted = _TIME_BY_DELTA.get(value)
+    if converted is not None:
+        return converted
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds())
+        return time(seconds // 3600 % 24, seconds // 60 % 60, seconds % 60)
+    return value
+
+
+def to_date(value):
+    """DATE do banco para datetime.date (também aceita datetime)."""
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+class AppointmentRow:
+    """Agendamento das listagens (painel e /admin/agendamentos)."""
+
+    __slots__ = (
+        "id", "appointment_date", "appointment_time", "status",
+        "client_name", "phone", "professional_name", "service_name",
+    )
+
+    # Colunas na ordem esperada pelo construtor
+    COLUMNS = """a.id,
+                       a.appointment_date,
+                       a.appointment_time,
+                       a.status,
+                       c.name,
+                       c.phone,
+                       p.name,
+                       s.name"""
+
+    def __init__(self, id, appointment_date, appointment_time, status,
+                 client_name, phone, professional_name, service_name):
+        self.id = id
+        self.appointment_date = to_date(appointment_date)
+        self.appointment_time = to_time(appointment_time)
+        self.status = status
+        self.client_name = client_name
+        self.phone = phone
+        self.professional_name = professional_name
+        self.service_name = service_name
+
+
+class AppointmentDetail:
+    """Agendamento com os dados do cliente (tela de confirmação)."""
+
+    __slots__ = (
+        "id", "appointment_date", "appointment_time", "status",
+        "name", "email", "phone", "professional_name", "service_name",
+    )
+
+    COLUMNS = """a.id,
+                       a.appointment_date,
+                       a.appointment_time,
+                       a.status,
+                       c.name,
+                       c.email,
+                       c.phone,
+                       p.name,
+                       s.name"""
+
+    def __init__(self, id, appointment_date, appointment_time, status,
+                 name, email, phone, professional_name, service_name):
+        self.id = id
+        self.appointment_date = to_date(appointment_date)
+        self.appointment_time = to_time(appointment_time)
+        self.status = status
+        self.name = name
+        self.email = email
+        self.phone = phone
+        self.professional_name = professional_name
+        self.service_name = service_name
+
+
+class ProfessionalRow:
+    """Profissional (professionals)."""
+
+    __slots__ = ("id", "name", "email", "phone", "active", "created_at")
+
+    COLUMNS = "id, name, email, phone, active, created_at"
+
+    def __init__(self, id, name, email, phone, active, created_at):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.phone = phone
+        self.active = bool(active)
+        self.created_at = created_at
+
+
+class ServiceRow:
+    """Módulo/serviço (services)."""
+
+    __slots__ = ("id", "name", "description", "duration_slots", "active")
+
+    COLUMNS = "id, name, description, duration_slots, active"
+
+    def __init__(self, id, name, description, duration_slots, active):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.duration_slots = duration_slots
+        self.active = bool(active)
+
@@ -0,0 +1,175 @@
+"""
+Agenda de atendimento de cada profissional, compilada em bitmaps.
+
+As regras ficam no banco: horários semanais (professional_schedules, um ou
+mais intervalos por dia da semana) e exceções (schedule_exceptions: folgas,
+feriados e bloqueios de parte do dia, de um profissional ou de todos).
+Ao carregar o catálogo, as regras de cada profissional viram um bitmap por
+dia da semana e um dicionário {data: bitmap} só para as datas com exceção,
+sobre a mesma grade de horários do índice de ocupação (bit i = slots[i]).
+Consultar os horários de atendimento de um dia é uma busca em dicionário, e
+os horários livres para um serviço de N slots saem de N operações de bits.
+
+Profissionais sem horários semanais cadastrados atendem em toda a grade,
+todos os dias (comportamento anterior à agenda por profissional).
+"""
+from datetime import time, timedelta
+
+WEEKDAYS = ("Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo")
+
+
+def to_minutes(value):
+    """Horário ("HH:MM", time ou TIME do banco como timedelta) em minutos desde 00:00."""
+    if isinstance(value, timedelta):
+        return int(value.total_seconds()) // 60
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    hours, minutes = value.split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class SlotGrid:
+    """
+    Grade de horários de início ("HH:MM"), cada um com `slot_minutes` de
+    duração. Dois slots vizinhos são contíguos quando o segundo começa
+    exatamente no fim do primeiro (ex.: 11:00 e 14:00 não são): um serviço
+    de vários slots só pode começar onde houver slots contíguos suficientes.
+    """
+
+    def __init__(self, slots, slot_minutes=60):
+        self.slots = tuple(slots)
+        self.slot_minutes = slot_minutes
+        self.index = {slot: i for i, slot in enumerate(self.slots)}
+        self.starts = [to_minutes(slot) for slot in self.slots]
+        self.full_mask = (1 << len(self.slots)) - 1
+
+        # _chains[k]: bits i em que slots[i..i+k] são contíguos
+        contiguous = [
+            self.starts[i + 1] - self.starts[i] == slot_minutes
+            for i in range(len(self.slots) - 1)
+        ]
+        self._chains = [self.full_mask]
+        for k in range(1, len(self.slots)):
+            previous = self._chains[-1]
+            mask = 0
+            for i in range(len(self.slots) - k):
+                if (previous >> i) & 1 and contiguous[i + k - 1]:
+                    mask |= 1 << i
+            self._chains.append(mask)
+
+        # Para poucos horários, pré-calcula a lista de rótulos de cada bitmap
+        self._label_table = None
+        if len(self.slots) <= 12:
+            self._label_table = [self._labels(mask) for mask in range(1 << len(self.slots))]
+
+    def _labels(self, mask):
+        return [slot for i, slot in enumerate(self.slots) if (mask >> i) & 1]
+
+    def labels(self, mask):
+        """Horários ("HH:MM") dos bits ligados em `mask`."""
+        if self._label_table is not None:
+            return self._label_table[mask]
+        return self._labels(mask)
+
+    def interval_mask(self, start, end):
+        """Bitmap dos slots inteiramente contidos em [start, end)."""
+        start, end = to_minutes(start), to_minutes(end)
+        mask = 0
+        for i, minutes in enumerate(self.starts):
+            if minutes >= start and minutes + self.slot_minutes <= end:
+                mask |= 1 << i
+        return mask
+
+    def span_mask(self, slot, length=1):
+        """Bitmap dos `length` slots ocupados por um atendimento que começa em `slot`."""
+        i = self.index.get(slot)
+        if i is None:
+            return 0
+        return (((1 << length) - 1) << i) & self.full_mask
+
+    def start_mask(self, free, length=1):
+        """Bits em que um atendimento de `length` slots cabe inteiro dentro de `free`."""
+        if length <= 1:
+            return free
+        if length > len(self.slots):
+            return 0
+        starts = free & self._chains[length - 1]
+        for k in range(1, length):
+            starts &= free >> k
+        return starts
+
+
+class ProfessionalSchedule:
+    """Bitmaps de atendimento de um profissional: um por dia da semana e as exceções."""
+
+    __slots__ = ("weekly", "overrides")
+
+    def __init__(self, weekly, overrides):
+        self.weekly = weekly  # tupla de 7 bitmaps, segunda = 0
+        self.overrides = overrides  # {data: bitmap} das datas com exceção
+
+    def mask(self, day):
+        mask = self.overrides.get(day)
+        if mask is None:
+            return self.weekly[day.weekday()]
+        return mask
+
+
+class Schedules:
+    """
+    Agendas compiladas de todos os profissionais a partir das linhas de
+    professional_schedules (id, profissional, dia da semana, início, fim) e
+    schedule_exceptions (id, profissional ou NULL para todos, data, início e
+    fim ou NULL para o dia inteiro, ...).
+    """
+
+    def __init__(self, grid, weekly_rows=(), exception_rows=()):
+        self.grid = grid
+        full = grid.full_mask
+
+        weekly = {}
+        for _id, professional_id, weekday, start, end in weekly_rows:
+            days = weekly.setdefault(professional_id, [0] * 7)
+            days[weekday] |= grid.interval_mask(start, end)
+
+        holidays = {}  # data -> slots bloqueados para todos
+        blocked = {}  # profissional -> {data: slots bloqueados}
+        for _id, professional_id, day, start, end, *_rest in exception_rows:
+            mask = full if start is None or end is None else grid.interval_mask(start, end)
+            target = holidays if professional_id is None else blocked.setdefault(professional_id, {})
+            target[day] = target.get(day, 0) | mask
+
+        self._default = self._compile((full,) * 7, holidays)
+        self._by_professional = {}
+        for professional_id in set(weekly) | set(blocked):
+            days = tuple(weekly.get(professional_id, (full,) * 7))
+            removed = dict(holidays)
+            for day, mask in blocked.get(professional_id, {}).items():
+                removed[day] = removed.get(day, 0) | mask
+            self._by_professional[professional_id] = self._compile(days, removed)
+
+    @staticmethod
+    def _compile(weekly, removed):
+        overrides = {day: weekly[day.weekday()] & ~mask for day, mask in removed.items()}
+        return ProfessionalSchedule(weekly, overrides)
+
+    def for_professional(self, professional_id):
+        return self._by_professional.get(professional_id, self._default)
+
+    def working_mask(self, professional_id, day):
+        """Bitmap dos horários em que o profissional atende na data."""
+        return self.for_professional(professional_id).mask(day)
+
+    def free_starts(self, professional_id, day, occupied, length=1):
+        """Horários de início livres (bitmap) para um serviço de `length` slots."""
+        working = self.for_professional(professional_id).mask(day)
+        return self.grid.start_mask(working & ~occupied, length)
+
+    def fits(self, professional_id, day, slot, length=1):
+        """Indica se um atendimento de `length` slots em `slot` cabe na agenda do dia."""
+        bit = self.grid.span_mask(slot)
+        return bool(bit and self.free_starts(professional_id, day, 0, length) & bit)
@@ -0,0 +1,135 @@
+"""
+Popula um banco local com dados sintéticos para testes de desempenho.
+
+Os registros criados são identificados pelo sufixo "(seed)" nos nomes e
+pelo prefixo "seed-" nos e-mails. Use um banco dedicado a testes.
+"""
+import math
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+import daily_stats
+
+
+def _batches(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def seed_database(conn, slots, professionals=20, services=6, clients=5000,
+                  appointments=50000, cancelled_rate=0.1, batch_size=5000,
+                  seed=42, echo=print):
+    """
+    Cria profissionais, serviços, vínculos, clientes e agendamentos.
+
+    Os agendamentos ocupam `slots` de dias consecutivos (cerca de 70% no
+    passado e 30% no futuro), sem conflitar com uc_appointment.
+    Retorna um resumo com as quantidades e o tempo gasto.
+    """
+    rng = random.Random(seed)
+    token = uuid.uuid4().hex[:8]
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        service_ids = []
+        for i in range(services):
+            cursor.execute(
+                "INSERT INTO services (name, description) VALUES (%s, %s)",
+                (f"Serviço {i + 1} (seed)", "Serviço gerado para testes"),
+            )
+            service_ids.append(cursor.lastrowid)
+
+        professional_ids = []
+        for i in range(professionals):
+            cursor.execute(
+                "INSERT INTO professionals (name, email, phone) VALUES (%s, %s, %s)",
+                (f"Profissional {i + 1} (seed)", f"seed-{token}-prof{i}@example.com", ""),
+            )
+            professional_ids.append(cursor.lastrowid)
+
+        links = {}
+        for pid in professional_ids:
+            links[pid] = rng.sample(service_ids, k=min(len(service_ids), rng.randint(1, 3)))
+        cursor.executemany(
+            "INSERT IGNORE INTO professional_services (professional_id, service_id) VALUES (%s, %s)",
+            [(pid, sid) for pid, sids in links.items() for sid in sids],
+        )
+        cursor.execute(
+            """
+            INSERT INTO catalog_version (id, version) VALUES (1, 1)
+            ON DUPLICATE KEY UPDATE version = version + 1
+            """
+        )
+        conn.commit()
+        echo(f"{professionals} profissionais e {services} serviços criados")
+
+        client_rows = [
+            (f"Cliente {i + 1} (seed)", f"seed-{token}-{i}@example.com", f"11{i:09d}")
+            for i in range(clients)
+        ]
+        for batch in _batches(client_rows, batch_size):
+            cursor.executemany(
+                "INSERT INTO clients (name, email, phone) VALUES (%s, %s, %s)",
+                batch,
+            )
+            conn.commit()
+        cursor.execute(
+            "SELECT id FROM clients WHERE email LIKE %s",
+            (f"seed-{token}-%",),
+        )
+        client_ids = [row[0] for row in cursor.fetchall()]
+        echo(f"{len(client_ids)} clientes criados")
+
+        created = 0
+        if appointments and client_ids:
+            per_day = len(professional_ids) * len(slots)
+            days = max(1, math.ceil(appointments / (per_day * 0.8)))
+            fill = appointments / (days * per_day)
+            first_day = date.today() - timedelta(days=int(days * 0.7))
+
+            pending = []
+            for offset in range(days):
+                day = first_day + timedelta(days=offset)
+                for pid in professional_ids:
+                    for slot in slots:
+                        if created >= appointments or rng.random() > fill:
+                            continue
+                        status = "cancelled" if rng.random() < cancelled_rate else "scheduled"
+                        pending.append((
+                            rng.choice(client_ids), pid, rng.choice(links[pid]),
+                            day, slot, status,
+                        ))
+                        created += 1
+                if len(pending) >= batch_size:
+                    _insert_appointments(cursor, pending)
+                    conn.commit()
+                    pending = []
+            if pending:
+                _insert_appointments(cursor, pending)
+                conn.commit()
+            daily_stats.rebuild(conn, professional_ids=professional_ids)
+        echo(f"{created} agendamentos criados")
+    finally:
+        cursor.close()
+
+    return {
+        "professionals": professionals,
+        "services": services,
+        "clients": len(client_ids),
+        "appointments": created,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+    }
+
+
+def _insert_appointments(cursor, rows):
+    cursor.executemany(
+        """
+        INSERT INTO appointments
+            (client_id, professional_id, service_id,
+             appointment_date, appointment_time, status)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """,
+        rows,
+    )
@@ -0,0 +1,101 @@
+"""
+Servidor de produção: gunicorn com processos pré-forkados servindo a
+entrada ASGI (asgi.py) pelo worker do uvicorn, iniciado por
+
+    flask --app app serve --workers 4
+
+- Cada worker atende as APIs JSON e o stream SSE /api/horarios/stream no
+  loop de eventos, então um navegador com a página de agendamento aberta
+  não prende uma thread; as demais views do Flask rodam nos executores de
+  asgi.py, dimensionados pelo pool de conexões.
+- O processo principal só cria a aplicação (create_app, pelo CLI) e fecha
+  as conexões que tiver aberto antes de criar os workers; cada worker
+  herda essa instância e monta sobre ela a própria entrada ASGI
+  (asgi.create_application).
+- Em cada worker, logo após o fork, os pools de conexão são recriados
+  (app.after_fork) e, antes de aceitar requisições, o processo é
+  preparado (app.warm_up): conexões abertas, catálogo e ocupação dos
+  próximos dias em memória.
+- SIGHUP (kill -HUP <pid do processo principal>) troca os workers sem
+  derrubar conexões: os novos são criados e preparados, e os antigos
+  param de aceitar requisições e terminam as que estão em andamento
+  (até --graceful-timeout segundos). Para carregar código novo, use
+  SIGUSR2 (novo processo principal) seguido de SIGTERM no antigo.
+"""
+import logging
+
+from gunicorn.app.base import BaseApplication
+
+import app as agenda
+
+WORKER_CLASS = "uvicorn.workers.UvicornWorker"
+
+
+class AgendaServer(BaseApplication):
+    """Aplicação do gunicorn (entrada ASGI de `flask_app`) com as opções e ganchos de `options`."""
+
+    def __init__(self, flask_app, options):
+        self.flask_app = flask_app
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # Chamado em cada worker, depois do fork: a entrada ASGI cria os
+        # executores (threads), que não passam para o processo filho
+        from asgi import create_application
+
+        return create_application(self.flask_app)
+
+
+def serve(flask_app, bind, workers, graceful_timeout=30, warmup_days=7):
+    """Roda o gunicorn com a instância `flask_app` (create_app) até ser encerrado."""
+
+    def on_starting(server):
+        # Logs dos módulos (db, catalog...) no mesmo destino do log do gunicorn
+        root = logging.getLogger()
+        if not root.handlers:
+            for handler in server.log.error_log.handlers:
+                root.addHandler(handler)
+            root.setLevel(server.log.error_log.level)
+        # Conexões do processo principal (ex.: abertas pelo próprio CLI)
+        # não podem ser herdadas pelos workers
+        with flask_app.app_context():
+            agenda.db_router.dispose()
+
+    def post_fork(server, worker):
+        with flask_app.app_context():
+            agenda.after_fork()
+
+    def post_worker_init(worker):
+        if not warmup_days:
+            return
+        with flask_app.app_context():
+            summary = agenda.warm_up(days=warmup_days)
+        worker.log.info(
+            "Worker %s pronto em %.0f ms: %d conexão(ões), catálogo %s, "
+            "ocupação de %d profissional(is) x %d dia(s)",
+            worker.pid,
+            summary["seconds"] * 1000,
+            summary["connections"],
+            "carregado" if summary["catalog"] else "indisponível",
+            summary["professionals"],
+            summary["days"],
+        )
+
+    def on_reload(server):
+        server.log.info("SIGHUP: trocando os workers")
+
+    AgendaServer(flask_app, {
+        "bind": bind,
+        "workers": workers,
+        "worker_class": WORKER_CLASS,
+        "graceful_timeout": graceful_timeout,
+        "on_starting": on_starting,
+        "post_fork": post_fork,
+        "post_worker_init": post_worker_init,
+        "on_reload": on_reload,
+    }).run()
@@ -0,0 +1,84 @@
+"""
+Pub/sub em memória das mudanças de horários por (profissional, data),
+usado pelo stream SSE /api/horarios/stream.
+
+Cada agendamento ou cancelamento confirmado publica um único evento com o
+estado completo dos horários livres da chave, entregue a todos os
+assinantes dela. Como cada evento substitui o anterior, um assinante lento
+guarda só o último (Subscription) e nunca acumula uma fila.
+
+Os eventos valem por processo: assinantes ligados a outro worker só veem
+as gravações feitas nele (o POST /agendar continua sendo a palavra final).
+"""
+import threading
+
+
+class SlotEvents:
+    """Assinantes por chave; `publish` chama cada um com o evento."""
+
+    def __init__(self, max_subscribers=1000):
+        self.max_subscribers = max_subscribers
+        self._subscribers = {}  # chave -> set de funções callback(evento)
+        self._count = 0
+        self._lock = threading.Lock()
+        self.counters = {"subscriptions": 0, "rejected": 0, "published": 0, "delivered": 0}
+
+    def subscribe(self, key, callback):
+        """Registra `callback` para a chave; False se o limite de assinantes foi atingido."""
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                self.counters["rejected"] += 1
+                return False
+            self._subscribers.setdefault(key, set()).add(callback)
+            self._count += 1
+            self.counters["subscriptions"] += 1
+            return True
+
+    def unsubscribe(self, key, callback):
+        with self._lock:
+            callbacks = self._subscribers.get(key)
+            if callbacks is None or callback not in callbacks:
+                return
+            callbacks.discard(callback)
+            self._count -= 1
+            if not callbacks:
+                del self._subscribers[key]
+
+    def has_subscribers(self, key):
+        return key in self._subscribers
+
+    def publish(self, key, event):
+        """Entrega `event` a todos os assinantes da chave (fora do lock)."""
+        with self._lock:
+            callbacks = list(self._subscribers.get(key, ()))
+            self.counters["published"] += 1
+            self.counters["delivered"] += len(callbacks)
+        for callback in callbacks:
+            callback(event)
+
+    def stats(self):
+        with self._lock:
+            data = dict(self.counters)
+            data.update(subscribers=self._count, keys=len(self._subscribers))
+        return data
+
+
+class Subscription:
+    """Último evento recebido por um assinante, com espera bloqueante (threads)."""
+
+    def __init__(self):
+        self._event = None
+        self._cond = threading.Condition(threading.Lock())
+
+    def push(self, event):
+        with self._cond:
+            self._event = event
+            self._cond.notify()
+
+    def wait(self, timeout):
+        """Próximo evento, ou None se nada mudou em `timeout` segundos."""
+        with self._cond:
+            if self._event is None:
+                self._cond.wait(timeout)
+            event, self._event = self._event, None
+        return event
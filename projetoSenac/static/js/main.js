@@ -4,6 +4,63 @@ document.addEventListener('DOMContentLoaded', function () {
   const dateInput = document.getElementById('date');
   const timeSelect = document.getElementById('time');
 
+  // Respostas de /api/servicos e /api/horarios já recebidas, por URL.
+  // Reaproveitadas sem ir ao servidor enquanto o max-age do Cache-Control
+  // valer; depois, revalidadas com If-None-Match (o servidor responde 304).
+  const apiCache = new Map();
+  const API_CACHE_LIMIT = 100;
+
+  function maxAge(response) {
+    const cacheControl = response.headers.get('Cache-Control') || '';
+    const match = /max-age=(\d+)/.exec(cacheControl);
+    return match && !/no-cache/.test(cacheControl) ? Number(match[1]) * 1000 : 0;
+  }
+
+  // 429 (limite de requisições): espera o Retry-After e tenta mais uma vez
+  const RETRY_AFTER_LIMIT = 10;
+
+  function fetchWithRetry(url, options, retried) {
+    return fetch(url, options).then(response => {
+      const wait = Number(response.headers.get('Retry-After'));
+      if (response.status === 429 && !retried && wait <= RETRY_AFTER_LIMIT) {
+        return new Promise(resolve => setTimeout(resolve, wait * 1000))
+          .then(() => fetchWithRetry(url, options, true));
+      }
+      return response;
+    });
+  }
+
+  function getJSON(url) {
+    const cached = apiCache.get(url);
+    if (cached && Date.now() < cached.expires) {
+      return Promise.resolve(cached.data);
+    }
+
+    const headers = cached && cached.etag ? { 'If-None-Match': cached.etag } : {};
+    return fetchWithRetry(url, { headers }).then(response => {
+      if (response.status === 304 && cached) {
+        cached.expires = Date.now() + maxAge(response);
+        return cached.data;
+      }
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+      }
+      return response.json().then(data => {
+        // Reinsere no fim: a entrada mais antiga é a primeira do Map
+        apiCache.delete(url);
+        apiCache.set(url, {
+          data,
+          etag: response.headers.get('ETag'),
+          expires: Date.now() + maxAge(response)
+        });
+        if (apiCache.size > API_CACHE_LIMIT) {
+          apiCache.delete(apiCache.keys().next().value);
+        }
+        return data;
+      });
+    });
+  }
+
   function resetServices() {
     if (!serviceSelect) return;
     serviceSelect.innerHTML = '';
@@ -28,14 +85,15 @@ document.addEventListener('DOMContentLoaded', function () {
     professionalSelect.addEventListener('change', function () {
       const professionalId = professionalSelect.value;
       resetTimes('Selecione a data e o profissional');
+      // O módulo anterior pode não ser atendido pelo novo profissional
+      serviceSelect.value = '';
 
       if (!professionalId) {
         resetServices();
         return;
       }
 
-      fetch(`/api/servicos?professional_id=${encodeURIComponent(professionalId)}`)
-        .then(response => response.json())
+      getJSON(`/api/servicos?professional_id=${encodeURIComponent(professionalId)}`)
         .then(data => {
           const services = data.services || [];
           serviceSelect.innerHTML = '';
@@ -56,6 +114,7 @@ document.addEventListener('DOMContentLoaded', function () {
               const opt = document.createElement('option');
               opt.value = s.id;
               opt.textContent = s.name;
+              opt.dataset.duration = s.duration_slots || 1;
               serviceSelect.appendChild(opt);
             });
 
@@ -69,56 +128,275 @@ document.addEventListener('DOMContentLoaded', function () {
     });
   }
 
+  const weekView = document.getElementById('week-view');
+  const weekDays = weekView ? weekView.querySelector('.week-view-days') : null;
+  const WEEKDAYS = ['dom', 'seg', 'ter', 'qua', 'qui', 'sex', 'sáb'];
+
+  // Última resposta de /api/disponibilidade (7 dias de um profissional,
+  // já considerando a agenda dele e a duração do módulo escolhido)
+  let week = null;
+
+  function parseDate(value) {
+    const match = /^(\d{2})\/(\d{2})\/(\d{4})$/.exec(value);
+    if (!match) return null;
+    const d = new Date(Number(match[3]), Number(match[2]) - 1, Number(match[1]));
+    return isNaN(d.getTime()) ? null : d;
+  }
+
+  function formatDate(d) {
+    const dd = String(d.getDate()).padStart(2, '0');
+    const mm = String(d.getMonth() + 1).padStart(2, '0');
+    return `${dd}/${mm}/${d.getFullYear()}`;
+  }
+
+  function slotsFromMask(slots, mask) {
+    return slots.filter((slot, i) => (mask >> i) & 1);
+  }
+
+  // Horários livres já conhecidos pela semana carregada, ou null
+  function weekSlots(professionalId, serviceId, dateValue) {
+    if (!week || week.professionalId !== professionalId || week.serviceId !== serviceId) return null;
+    const data = week.data;
+    const dayIndex = data.dates.indexOf(dateValue);
+    if (dayIndex === -1 || data.free.length === 0) return null;
+    return slotsFromMask(data.slots, data.free[0][dayIndex]);
+  }
+
+  function renderWeek() {
+    if (!weekView || !weekDays) return;
+    weekDays.innerHTML = '';
+
+    if (!week || week.data.dates.length === 0 || week.data.free.length === 0) {
+      weekView.classList.add('d-none');
+      return;
+    }
+
+    const data = week.data;
+    const selected = dateInput ? dateInput.value.trim() : '';
+
+    data.dates.forEach((dateValue, i) => {
+      const free = slotsFromMask(data.slots, data.free[0][i]).length;
+      const d = parseDate(dateValue);
+      const btn = document.createElement('button');
+      btn.type = 'button';
+      btn.className = 'btn btn-sm ' + (dateValue === selected ? 'btn-primary' : 'btn-outline-light');
+      btn.disabled = free === 0;
+      btn.innerHTML = `${WEEKDAYS[d.getDay()]} ${dateValue.slice(0, 5)}<small></small>`;
+      btn.querySelector('small').textContent = free === 1 ? '1 livre' : `${free} livres`;
+      btn.addEventListener('click', function () {
+        dateInput.value = dateValue;
+        loadSlots();
+      });
+      weekDays.appendChild(btn);
+    });
+
+    weekView.classList.remove('d-none');
+  }
+
+  // Carrega os 7 dias a partir da data informada (ou de hoje) em uma única chamada
+  function loadWeek(professionalId, serviceId, dateValue) {
+    const start = parseDate(dateValue) || new Date();
+    const end = new Date(start);
+    end.setDate(end.getDate() + 6);
+
+    const params = new URLSearchParams({
+      start: formatDate(start),
+      end: formatDate(end),
+      professional_id: professionalId
+    });
+    if (serviceId) params.set('service_id', serviceId);
+
+    return fetchWithRetry(`/api/disponibilidade?${params.toString()}`)
+      .then(response => {
+        if (!response.ok) {
+          throw new Error(`HTTP ${response.status}`);
+        }
+        return response.json();
+      })
+      .then(data => {
+        week = { professionalId, serviceId, data };
+        renderWeek();
+      });
+  }
+
+  function fillTimes(slots) {
+    timeSelect.innerHTML = '';
+
+    if (slots.length === 0) {
+      const opt = document.createElement('option');
+      opt.value = '';
+      opt.textContent = 'Nenhum horário disponível para esta data/profissional';
+      timeSelect.appendChild(opt);
+      timeSelect.disabled = true;
+    } else {
+      const placeholder = document.createElement('option');
+      placeholder.value = '';
+      placeholder.textContent = 'Selecione um horário';
+      timeSelect.appendChild(placeholder);
+
+      slots.forEach(slot => {
+        const opt = document.createElement('option');
+        opt.value = slot;
+        opt.textContent = slot;
+        timeSelect.appendChild(opt);
+      });
+
+      timeSelect.disabled = false;
+    }
+  }
+
+  function daySlotsUrl(dateValue, professionalId, serviceId) {
+    const params = new URLSearchParams({
+      date: dateValue,
+      professional_id: professionalId
+    });
+    if (serviceId) params.set('service_id', serviceId);
+    return `/api/horarios?${params.toString()}`;
+  }
+
+  function fetchDaySlots(dateValue, professionalId, serviceId) {
+    return getJSON(daySlotsUrl(dateValue, professionalId, serviceId))
+      .then(data => fillTimes(data.slots || []));
+  }
+
+  // Horários ao vivo: /api/horarios/stream envia os horários livres da data
+  // e profissional escolhidos a cada agendamento ou cancelamento, por
+  // duração de módulo ("1", "2"...), sem novas consultas. Os eventos valem
+  // por processo do servidor: reservas feitas em outro worker não chegam
+  // pelo stream. Por isso, se ele passar mais que o intervalo de keep-alive
+  // (SSE_HEARTBEAT_SECONDS, em data-refresh-seconds) sem mensagens, os
+  // horários são buscados de novo em /api/horarios (304 se nada mudou).
+  let slotStream = null;
+  let slotQuery = null;
+  let slotRefreshTimer = null;
+  let lastSlotMessage = 0;
+  const slotRefreshMs = Number((timeSelect && timeSelect.dataset.refreshSeconds) || 15) * 1000;
+
+  function selectedDuration() {
+    const opt = serviceSelect ? serviceSelect.options[serviceSelect.selectedIndex] : null;
+    return (opt && opt.dataset.duration) || '1';
+  }
+
+  function stopWatchingSlots() {
+    if (slotStream) {
+      slotStream.close();
+      slotStream = null;
+    }
+    if (slotRefreshTimer) {
+      clearInterval(slotRefreshTimer);
+      slotRefreshTimer = null;
+    }
+    slotQuery = null;
+  }
+
+  function refreshIdleSlots(professionalId, dateValue) {
+    if (Date.now() - lastSlotMessage < slotRefreshMs) return;
+    lastSlotMessage = Date.now();
+    if (professionalSelect.value !== professionalId || dateInput.value.trim() !== dateValue) return;
+
+    const serviceId = serviceSelect ? serviceSelect.value : '';
+    getJSON(daySlotsUrl(dateValue, professionalId, serviceId))
+      .then(data => {
+        if (professionalSelect.value === professionalId && dateInput.value.trim() === dateValue) {
+          showSlots(data.slots || []);
+        }
+      })
+      .catch(() => {});
+  }
+
+  function watchSlots(professionalId, dateValue) {
+    const query = new URLSearchParams({ professional_id: professionalId, date: dateValue }).toString();
+    if (slotQuery === query) return;
+    stopWatchingSlots();
+    slotQuery = query;
+    lastSlotMessage = Date.now();
+    slotRefreshTimer = setInterval(() => refreshIdleSlots(professionalId, dateValue), slotRefreshMs);
+    if (!window.EventSource) return;
+
+    slotStream = new EventSource(`/api/horarios/stream?${query}`);
+    slotStream.onmessage = function (e) {
+      lastSlotMessage = Date.now();
+      applySlotState(JSON.parse(e.data));
+    };
+  }
+
+  function applySlotState(state) {
+    if (!timeSelect || !professionalSelect || !dateInput) return;
+    if (professionalSelect.value !== String(state.professional_id)) return;
+    if (dateInput.value.trim() !== state.date) return;
+    const slots = state.free[selectedDuration()];
+    if (!slots) return;
+
+    const serviceId = serviceSelect ? serviceSelect.value : '';
+    if (week && week.professionalId === professionalSelect.value && week.serviceId === serviceId) {
+      const dayIndex = week.data.dates.indexOf(state.date);
+      if (dayIndex !== -1 && week.data.free.length > 0) {
+        week.data.free[0][dayIndex] = slots.reduce(
+          (mask, slot) => mask | (1 << week.data.slots.indexOf(slot)), 0
+        );
+        renderWeek();
+      }
+    }
+
+    showSlots(slots);
+  }
+
+  // Atualiza a lista mantendo o horário escolhido, ou avisa se ele foi reservado
+  function showSlots(slots) {
+    const selected = timeSelect.value;
+    fillTimes(slots);
+    if (!selected) return;
+    if (slots.includes(selected)) {
+      timeSelect.value = selected;
+    } else if (slots.length > 0) {
+      timeSelect.options[0].textContent = `O horário ${selected} acabou de ser reservado. Escolha outro.`;
+    }
+  }
+
   function loadSlots() {
     if (!dateInput || !timeSelect || !professionalSelect) return;
 
     const dateValue = dateInput.value.trim();
     const professionalId = professionalSelect.value;
+    // Módulos com mais de um horário só aparecem onde cabem inteiros
+    const serviceId = serviceSelect ? serviceSelect.value : '';
 
     timeSelect.innerHTML = '';
 
+    if (!professionalId) {
+      week = null;
+      renderWeek();
+    }
+
     if (!dateValue || !professionalId) {
+      stopWatchingSlots();
       resetTimes('Selecione a data e o profissional');
       return;
     }
 
-    const params = new URLSearchParams({
-      date: dateValue,
-      professional_id: professionalId
-    });
+    if (parseDate(dateValue)) {
+      watchSlots(professionalId, dateValue);
+    }
 
-    fetch(`/api/horarios?${params.toString()}`)
-      .then(response => response.json())
-      .then(data => {
-        const slots = data.slots || [];
-        timeSelect.innerHTML = '';
-
-        if (slots.length === 0) {
-          const opt = document.createElement('option');
-          opt.value = '';
-          opt.textContent = 'Nenhum horário disponível para esta data/profissional';
-          timeSelect.appendChild(opt);
-          timeSelect.disabled = true;
-        } else {
-          const placeholder = document.createElement('option');
-          placeholder.value = '';
-          placeholder.textContent = 'Selecione um horário';
-          timeSelect.appendChild(placeholder);
-
-          slots.forEach(slot => {
-            const opt = document.createElement('option');
-            opt.value = slot;
-            opt.textContent = slot;
-            timeSelect.appendChild(opt);
-          });
+    // Data dentro da semana já carregada: não precisa ir ao servidor
+    const known = weekSlots(professionalId, serviceId, dateValue);
+    if (known) {
+      fillTimes(known);
+      renderWeek();
+      return;
+    }
 
-          timeSelect.disabled = false;
-        }
-      })
-      .catch(err => {
-        console.error('Erro ao carregar horários', err);
-        resetTimes('Erro ao carregar horários');
-      });
+    const request = weekView && parseDate(dateValue)
+      ? loadWeek(professionalId, serviceId, dateValue).then(() => {
+          const slots = weekSlots(professionalId, serviceId, dateValue);
+          return slots ? fillTimes(slots) : fetchDaySlots(dateValue, professionalId, serviceId);
+        })
+      : fetchDaySlots(dateValue, professionalId, serviceId);
+
+    request.catch(err => {
+      console.error('Erro ao carregar horários', err);
+      resetTimes('Erro ao carregar horários');
+    });
   }
 
   if (dateInput) {
@@ -135,6 +413,10 @@ document.addEventListener('DOMContentLoaded', function () {
     professionalSelect.addEventListener('change', loadSlots);
   }
 
+  if (serviceSelect) {
+    serviceSelect.addEventListener('change', loadSlots);
+  }
+
   // Estado inicial
   resetServices();
   resetTimes();
@@ -0,0 +1,65 @@
+"""
+Validação dos dados de um agendamento, usada pelo formulário /agendar e
+pela importação em lote (importer.py), para que ambos sigam as mesmas regras.
+"""
+from datetime import datetime
+
+
+def validate_booking(data, snapshot, slots):
+    """
+    Valida um dicionário com name, email, phone, date (dd/mm/aaaa), time,
+    professional_id e service_id.
+
+    Retorna (valores, None) com os campos convertidos e a duração do
+    serviço em slots, ou (None, mensagem) com o primeiro problema encontrado.
+    """
+    name = (data.get("name") or "").strip()
+    email = (data.get("email") or "").strip()
+    phone = (data.get("phone") or "").strip()
+    date_str = (data.get("date") or "").strip()
+    time_str = (data.get("time") or "").strip()
+    professional_id = (data.get("professional_id") or "").strip()
+    service_id = (data.get("service_id") or "").strip()
+
+    if not (name and date_str and time_str and professional_id and service_id):
+        return None, "Preencha nome, data, horário, profissional e módulo."
+
+    try:
+        appointment_date = datetime.strptime(date_str, "%d/%m/%Y").date()
+    except ValueError:
+        return None, "Data inválida. Use o formato dd/mm/aaaa."
+
+    if time_str not in slots:
+        return None, "Horário inválido."
+
+    try:
+        professional_id = int(professional_id)
+        service_id = int(service_id)
+    except ValueError:
+        return None, "Profissional ou módulo inválido."
+
+    # Verifica se o serviço realmente pertence ao profissional
+    if not snapshot.offers(professional_id, service_id):
+        return None, "Este profissional não atende o módulo selecionado."
+
+    # Agenda do profissional (horários semanais, folgas e feriados)
+    duration = snapshot.service_duration(service_id)
+    schedules = snapshot.schedules
+    if not schedules.fits(professional_id, appointment_date, time_str, duration):
+        if duration > 1 and schedules.fits(professional_id, appointment_date, time_str):
+            return None, (
+                f"O módulo selecionado ocupa {duration} horários seguidos, "
+                "que não cabem a partir deste horário."
+            )
+        return None, "O profissional não atende neste dia/horário."
+
+    return {
+        "name": name,
+        "email": email,
+        "phone": phone,
+        "appointment_date": appointment_date,
+        "time": time_str,
+        "professional_id": professional_id,
+        "service_id": service_id,
+        "duration_slots": duration,
+    }, None